@@ -16,6 +16,7 @@ from datetime import datetime, timedelta
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from core.llm_client import LLMClient
+from core.rate_limiter import PRIORITY_BACKGROUND
 
 # 提示词模板（升级提示词）
 # 历史记录：
@@ -72,9 +73,9 @@ def check_llm_env():
 
 # 用项目 LLMClient 统一接口调用大模型，自动用系统令牌
 def call_llm_extract(summary_prompt, raw_text):
-    llm = LLMClient()  # 自动读取环境变量和配置
+    llm = LLMClient(priority=PRIORITY_BACKGROUND)  # 自动读取环境变量和配置
     prompt = summary_prompt + "\n" + raw_text
-    return llm.get_response(prompt)
+    return llm.get_response(prompt, cacheable=True)
 
 def encode_and_merge_memA2B(memA_path, memB_file):
     """
@@ -14,6 +14,8 @@ from pathlib import Path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from core.llm_client import LLMClient
+from core.rate_limiter import PRIORITY_BACKGROUND
+from core.prompt_cache import invalidate_system_prompt
 
 # 提取极为重要信息的提示词
 A2C_EXTRACT_PROMPT = (
@@ -48,19 +50,19 @@ def check_llm_env():
         sys.exit(1)
 
 def call_llm_extract(summary_prompt, raw_text):
-    llm = LLMClient()
+    llm = LLMClient(priority=PRIORITY_BACKGROUND)
     if raw_text:
         prompt = summary_prompt + "\n" + raw_text
     else:
         prompt = summary_prompt
-    return llm.get_response(prompt)
+    return llm.get_response(prompt, cacheable=True)
 
 def call_llm_merge(merge_prompt):
     """
     专门用于合并内容的LLM调用函数
     """
-    llm = LLMClient()
-    return llm.get_response(merge_prompt)
+    llm = LLMClient(priority=PRIORITY_BACKGROUND)
+    return llm.get_response(merge_prompt, cacheable=True)
 
 def update_memC(memC_file, new_content):
     """
@@ -213,6 +215,8 @@ def encode_and_append_memA2C(memA_path, memC_file):
     new_important = call_llm_extract(A2C_EXTRACT_PROMPT, new_raw)
     # 用新内容整体覆盖 memC.txt
     update_memC(memC_file, new_important)
+    # 通知系统提示词缓存 memC 已改写
+    invalidate_system_prompt()
 
 def encode_a2c():
     """A2C编码主函数，返回是否成功"""
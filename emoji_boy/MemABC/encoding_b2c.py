@@ -13,6 +13,8 @@ from pathlib import Path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from core.llm_client import LLMClient
+from core.rate_limiter import PRIORITY_BACKGROUND
+from core.prompt_cache import invalidate_system_prompt
 
 # 从memB提炼人格线索的提示词
 B2C_EXTRACT_PROMPT = """你是一个模拟人脑潜意识生成的AI系统，你正在阅读一段结构化的长期记忆（memB），这些记忆来源于用户与我之间的互动。
@@ -75,17 +77,17 @@ def check_llm_env():
 
 def call_llm_extract(prompt, raw_text):
     """调用LLM提取线索"""
-    llm = LLMClient()
+    llm = LLMClient(priority=PRIORITY_BACKGROUND)
     if raw_text:
         full_prompt = prompt + "\n" + raw_text
     else:
         full_prompt = prompt
-    return llm.get_response(full_prompt)
+    return llm.get_response(full_prompt, cacheable=True)
 
 def call_llm_merge(merge_prompt):
     """调用LLM进行冥想式融合"""
-    llm = LLMClient()
-    return llm.get_response(merge_prompt)
+    llm = LLMClient(priority=PRIORITY_BACKGROUND)
+    return llm.get_response(merge_prompt, cacheable=True)
 
 def read_memB_content(memB_file):
     """读取memB内容，跳过头部标志"""
@@ -237,6 +239,8 @@ def b2c_meditation_process(memB_file, memC_file):
     
     # 进行冥想式记忆强化
     update_memC_with_meditation(memC_file, extracted_clues)
+    # 通知系统提示词缓存 memC 已改写
+    invalidate_system_prompt()
     
     print("🎉 B2C冥想程序完成！")
 
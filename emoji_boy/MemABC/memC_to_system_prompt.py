@@ -13,6 +13,8 @@ import argparse
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from core.llm_client import LLMClient
+from core.rate_limiter import PRIORITY_BACKGROUND
+from core.prompt_cache import invalidate_system_prompt
 
 # memC_to_system_prompt的核心提示词
 MEMC2SYSTEM_PROMPT_PROMPT = """你是一个顶级提示词工程师，擅长将类脑深层记忆（memC）转化为具有人格、情感与记忆感的系统提示词（System Prompt），以构建具备真实陪伴感、长期一致性人格的AI智能体。
@@ -79,10 +81,10 @@ def call_llm_generate(prompt: str) -> str:
     """调用LLM生成系统提示词"""
     try:
         # 使用LLMClient（与b2c相同）
-        llm = LLMClient()
+        llm = LLMClient(priority=PRIORITY_BACKGROUND)
         
         # 直接调用LLM，它会自动处理API配置
-        response = llm.get_response(prompt)
+        response = llm.get_response(prompt, cacheable=True)
         
         return response.strip()
         
@@ -161,6 +163,9 @@ def save_system_prompt(system_prompt: str, output_file: str):
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write(system_prompt)
         
+        # 通知系统提示词缓存 systemprompt.txt 已改写
+        invalidate_system_prompt()
+        
         print(f"✅ 系统提示词已保存到: {output_file}")
         
     except Exception as e:
@@ -0,0 +1,200 @@
+"""
+Code Validator - 生成代码的静态检查
+
+模仿人脑的"预演审查"：动手之前先在脑中过一遍，发现危险动作直接放弃。
+1. 一次遍历：解析为语法树后只遍历一次，节点类型、名称、属性和导入同时检查
+2. 白名单：只允许常见语句和表达式节点；内置函数只允许沙箱提供的安全函数；
+   import 只允许沙箱白名单中的模块
+3. 属性：禁止以下划线开头的属性（__class__、__globals__ 等），禁止帧/代码对象的内省属性，
+   以及白名单模块中转出的非白名单模块（如 platform.os、datetime.sys）
+4. 缓存：结论按代码哈希缓存，重复生成的代码无需再次检查
+
+白名单与沙箱（sandbox.py）的 ALLOWED_MODULES 和 SAFE_BUILTIN_NAMES 保持一致，
+静态检查拦截明显的越权代码，沙箱的受限环境和资源限制兜底。
+"""
+
+import ast
+import builtins
+import hashlib
+import importlib
+import logging
+import threading
+import types
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+try:
+    from .sandbox import ALLOWED_MODULES, SAFE_BUILTIN_NAMES
+except (ImportError, SystemError):
+    from brain_agent.sandbox import ALLOWED_MODULES, SAFE_BUILTIN_NAMES
+
+logger = logging.getLogger(__name__)
+
+
+# 允许的语法树节点（不含 class/with/global/async/yield 等生成代码用不到的结构）
+ALLOWED_NODES = (
+    ast.Module, ast.Expr, ast.Assign, ast.AugAssign, ast.AnnAssign, ast.Delete, ast.Pass,
+    ast.If, ast.For, ast.While, ast.Break, ast.Continue,
+    ast.FunctionDef, ast.Return, ast.Lambda, ast.arguments, ast.arg,
+    ast.Try, ast.ExceptHandler, ast.Raise, ast.Assert,
+    ast.Import, ast.ImportFrom, ast.alias,
+    ast.BoolOp, ast.BinOp, ast.UnaryOp, ast.Compare, ast.IfExp, ast.NamedExpr,
+    ast.Call, ast.keyword, ast.Constant, ast.JoinedStr, ast.FormattedValue,
+    ast.Name, ast.Attribute, ast.Subscript, ast.Slice, ast.Starred,
+    ast.List, ast.Tuple, ast.Set, ast.Dict,
+    ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp, ast.comprehension,
+    ast.expr_context, ast.operator, ast.boolop, ast.unaryop, ast.cmpop
+)
+
+# 帧、代码对象和生成器的内省属性，可借此访问调用方的全局环境
+INTROSPECTION_ATTRIBUTES = frozenset({
+    "f_globals", "f_locals", "f_builtins", "f_back", "f_code",
+    "gi_frame", "gi_code", "cr_frame", "cr_code", "ag_frame", "ag_code",
+    "tb_frame", "tb_next", "co_code", "co_consts"
+})
+
+
+def _reexported_modules() -> FrozenSet[str]:
+    """白名单模块中以公开属性转出的非白名单模块名（如 platform.os）"""
+    names = set()
+    for module_name in ALLOWED_MODULES:
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        for attr, value in vars(module).items():
+            if (not attr.startswith("_") and isinstance(value, types.ModuleType)
+                    and value.__name__.split(".")[0] not in ALLOWED_MODULES):
+                names.add(attr)
+    return frozenset(names)
+
+
+class CodeValidator:
+    """基于语法树白名单的生成代码检查器"""
+
+    def __init__(self, cache_size: int = 512, max_nodes: int = 5000):
+        """
+        初始化检查器
+
+        Args:
+            cache_size: 缓存的检查结论数
+            max_nodes: 允许的最大语法树节点数，超出时视为不安全
+        """
+        self.cache_size = cache_size
+        self.max_nodes = max_nodes
+
+        self.allowed_builtins = frozenset(SAFE_BUILTIN_NAMES) | {"print"}
+        # 不在安全列表中的内置名称（eval、open、getattr 等）
+        self.blocked_names = frozenset(name for name in dir(builtins) if name not in self.allowed_builtins)
+        self.blocked_attributes = INTROSPECTION_ATTRIBUTES | _reexported_modules()
+
+        self._lock = threading.Lock()
+        # 代码哈希 -> (是否安全, 原因)（按最近使用排序）
+        self._verdicts: "OrderedDict[str, Tuple[bool, str]]" = OrderedDict()
+        self._stats = {"validations": 0, "cache_hits": 0, "rejected": 0}
+
+    @staticmethod
+    def _hash(code: str) -> str:
+        return hashlib.blake2b(code.encode("utf-8"), digest_size=16).hexdigest()
+
+    def validate(self, code: str) -> Tuple[bool, str]:
+        """
+        检查代码是否安全
+
+        Args:
+            code: Python源码
+
+        Returns:
+            (是否安全, 不安全的原因；安全时为空字符串)
+        """
+        key = self._hash(code)
+        with self._lock:
+            verdict = self._verdicts.get(key)
+            if verdict is not None:
+                self._verdicts.move_to_end(key)
+                self._stats["cache_hits"] += 1
+                return verdict
+
+        verdict = self._check(code)
+
+        with self._lock:
+            self._stats["validations"] += 1
+            if not verdict[0]:
+                self._stats["rejected"] += 1
+            self._verdicts[key] = verdict
+            while len(self._verdicts) > self.cache_size:
+                self._verdicts.popitem(last=False)
+
+        if not verdict[0]:
+            logger.warning(f"生成代码未通过安全检查: {verdict[1]}")
+        return verdict
+
+    def is_safe(self, code: str) -> bool:
+        """检查代码是否安全（只返回结论）"""
+        return self.validate(code)[0]
+
+    def _check(self, code: str) -> Tuple[bool, str]:
+        """解析并一次遍历语法树，返回第一个违规项"""
+        try:
+            tree = ast.parse(code, mode="exec")
+        except (SyntaxError, ValueError) as e:
+            return False, f"语法错误: {e}"
+
+        count = 0
+        for node in ast.walk(tree):
+            count += 1
+            if count > self.max_nodes:
+                return False, "代码过长"
+
+            reason = self._check_node(node)
+            if reason:
+                return False, reason
+        return True, ""
+
+    def _check_node(self, node: ast.AST) -> Optional[str]:
+        """检查单个节点，违规时返回原因"""
+        if not isinstance(node, ALLOWED_NODES):
+            return f"不允许的语法: {type(node).__name__}"
+
+        if isinstance(node, ast.Name):
+            if node.id.startswith("__") or node.id in self.blocked_names:
+                return f"不允许的名称: {node.id}"
+        elif isinstance(node, ast.Attribute):
+            if node.attr.startswith("_") or node.attr in self.blocked_attributes:
+                return f"不允许的属性: {node.attr}"
+        elif isinstance(node, (ast.FunctionDef, ast.arg)):
+            name = node.name if isinstance(node, ast.FunctionDef) else node.arg
+            if name.startswith("__"):
+                return f"不允许的名称: {name}"
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name.split(".")[0] not in ALLOWED_MODULES:
+                    return f"不允许导入模块: {alias.name}"
+        elif isinstance(node, ast.ImportFrom):
+            if node.level or not node.module or node.module.split(".")[0] not in ALLOWED_MODULES:
+                return f"不允许导入模块: {node.module or '.'}"
+            for alias in node.names:
+                if alias.name == "*" or alias.name.startswith("_") or alias.name in self.blocked_attributes:
+                    return f"不允许导入名称: {node.module}.{alias.name}"
+        elif isinstance(node, ast.ExceptHandler):
+            if node.name and node.name.startswith("__"):
+                return f"不允许的名称: {node.name}"
+        return None
+
+    def clear(self):
+        """清空缓存的结论"""
+        with self._lock:
+            self._verdicts.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取检查统计信息"""
+        with self._lock:
+            stats = self._stats.copy()
+            stats["cached_verdicts"] = len(self._verdicts)
+        checks = stats["validations"] + stats["cache_hits"]
+        stats["cache_hit_rate"] = stats["cache_hits"] / checks if checks else 0.0
+        return stats
+
+
+# 全局代码检查器
+code_validator = CodeValidator()
@@ -12,8 +12,12 @@ Intent Engine - 类脑意图识别引擎
 import os
 import json
 import time
+import atexit
+import hashlib
 import requests
 import logging
+import threading
+from types import CodeType
 from typing import Dict, Any, List, Optional, Union
 from enum import Enum
 import re
@@ -21,13 +25,38 @@ from collections import OrderedDict
 
 try:
     from .plugin_registry import PluginRegistry, plugin_registry
+    from .local_classifier import LocalIntentClassifier, normalize_text
+    from .plugins.base_plugin import render_direct_answer
+    from .semantic_cache import SemanticCache
+    from .skill_store import SkillStore
+    from .sandbox import sandbox_pool
+    from .code_validator import code_validator
 except (ImportError, SystemError):
     from brain_agent.plugin_registry import PluginRegistry, plugin_registry
+    from brain_agent.local_classifier import LocalIntentClassifier, normalize_text
+    from brain_agent.plugins.base_plugin import render_direct_answer
+    from brain_agent.semantic_cache import SemanticCache
+    from brain_agent.skill_store import SkillStore
+    from brain_agent.sandbox import sandbox_pool
+    from brain_agent.code_validator import code_validator
+
+import config
+from core.http_transport import http_transport
+from core.resilience import resilience, CircuitOpenError
+from core.single_flight import single_flight
+from core.rate_limiter import rate_limiter
+from core.model_router import model_router, TASK_INTENT
+from core.context_manager import estimate_tokens
+from core.cancellation import CancellationToken, OperationCancelled, check_cancelled
+from core.deadline import Deadline, DeadlineExceeded
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 各阶段不能吞掉的异常：本轮预算耗尽、取消、端点熔断都需要交给 process_message 及其调用方处理
+PROPAGATED_ERRORS = (DeadlineExceeded, OperationCancelled, CircuitOpenError)
+
 
 class IntentType(Enum):
     """意图类型枚举 - 模仿人脑的认知分类"""
@@ -40,11 +69,33 @@ class IntentType(Enum):
     UNKNOWN = "unknown"        # 未知意图 - 未识别需求
 
 
+# 意图识别默认使用的API地址
+DEFAULT_INTENT_API_BASE = "https://ark.cn-beijing.volces.com/api/v3"
+
+# 各意图类型的认知关键词（与插件关键词一起构成本地分类器词表）
+INTENT_KEYWORDS = {
+    "search": ["搜索", "查找", "找", "帮我找", "如何", "怎么", "什么是", "最新", "新闻"],
+    "chat": ["你好", "谢谢", "再见", "拜拜", "早上好", "晚上好"],
+    "config": ["配置", "设置", "API", "base_url", "密钥"],
+    "help": ["帮助", "说明", "怎么用", "功能", "指南"],
+    "meditation": ["冥想", "编码", "A2B", "B2C", "记忆"],
+    "system": ["今天几号", "现在时间", "几点", "日期", "时间", "系统信息", "系统版本", "执行", "运行", "命令"],
+}
+
+# 记忆快照格式版本：记忆键的计算方式变化时递增，旧快照不再加载
+INTENT_CACHE_VERSION = 2
+
+
+# 可匹配的技能名称
+AVAILABLE_SKILLS = ["search_plugin", "chat_plugin", "config_plugin", "help_plugin", "meditation_plugin", "system_plugin"]
+
+
 class IntentEngine:
     """类脑意图识别引擎 - 模仿人脑的感知和认知系统"""
     
     def __init__(self, api_key: str = None, api_base: str = None, 
-                 cache_size: int = 100, cache_ttl: int = 300):
+                 cache_size: int = 100, cache_ttl: int = 300,
+                 fast_path_threshold: float = 0.75, cache_path: str = None):
         """
         初始化类脑意图识别引擎
         
@@ -53,16 +104,22 @@ class IntentEngine:
             api_base: API基础URL
             cache_size: 记忆容量（模拟人脑的记忆容量）
             cache_ttl: 记忆保持时间（模拟人脑的记忆衰减）
+            fast_path_threshold: 本地分类器直接判定意图所需的置信度（模拟人脑的条件反射）
+            cache_path: 记忆快照文件，退出时保存、启动时加载（仍按 cache_ttl 过期）
         """
         # 配置
         self.api_key = api_key or os.getenv("DOUBAO_API_KEY")
-        self.api_base = api_base or "https://ark.cn-beijing.volces.com/api/v3"
+        self.api_base = api_base or DEFAULT_INTENT_API_BASE
+        # 默认模型；每次请求由模型路由按上下文和近期延迟选择（见 core/model_router.py）
         self.model_name = "doubao-1-5-lite-32k-250115"
+        self.context_tokens = 32768
         
         # 请求配置
+        # timeout 为延迟样本不足时的默认超时，之后按端点延迟分位数自适应
         self.timeout = 10
         self.max_retries = 2
-        self.retry_delay = 1
+        # 本轮剩余预算低于该值（秒）时跳过后续阶段
+        self.min_stage_time = getattr(config, "TURN_MIN_STAGE_TIME", 0.5)
         
         # 类脑意图识别提示词
         self.intent_prompt = self._get_intent_prompt()
@@ -73,10 +130,39 @@ class IntentEngine:
         # 代码生成提示词
         self.code_generation_prompt = self._get_code_generation_prompt()
         
+        # 融合提示词：一次调用完成意图识别、技能匹配和代码生成
+        self.fused_prompt = self._get_fused_prompt()
+        self.fused_mode = True
+        
         # 类脑记忆机制 - 使用OrderedDict实现LRU记忆
         self.cache_size = cache_size
         self.cache_ttl = cache_ttl
         self.cache = OrderedDict()
+        self.cache_path = cache_path or os.path.join(os.path.expanduser("~/.emoji_assistant"), "intent_cache.json")
+        
+        # 联想记忆 - 说法相近（字符 n-gram 余弦相似度超过阈值）且本地分类器判定相同的输入复用已识别的意图
+        self.semantic_cache_enabled = True
+        self.semantic_cache = SemanticCache(capacity=256, threshold=0.85, ttl=cache_ttl)
+        
+        # 技能结晶 - 执行成功的生成代码按 (技能, 消息模板) 保存，同样的请求直接复用
+        self.skill_store_enabled = True
+        self.skill_store = SkillStore()
+        
+        # 沙箱 - 生成代码在预热的工作进程中执行，死循环或超限不会卡住对话线程
+        self.sandbox = sandbox_pool
+        
+        # 代码检查 - 语法树白名单一次遍历，结论按代码哈希缓存，重复的生成代码无需再次检查
+        self.code_validator = code_validator
+        
+        # 引擎在多个对话线程间共享，记忆与统计需要加锁
+        self._lock = threading.RLock()
+        
+        # 条件反射 - 本地快速意图分类器（首次使用时按当前技能词表构建）
+        self.fast_path_enabled = True
+        self.fast_path_threshold = fast_path_threshold
+        self._local_classifier = None
+        # 最近一次本地分类（消息, 结果）：同一轮的回忆探查与识别结果入库共用，不重复分类
+        self._last_classification = None
         
         # 行为模式统计
         self.stats = {
@@ -88,12 +174,22 @@ class IntentEngine:
             "api_errors": 0,
             "average_response_time": 0.0,
             "code_executions": 0,
-            "skill_matches": 0
+            "skill_matches": 0,
+            "fast_path_hits": 0,
+            "fused_calls": 0,
+            "fused_fallbacks": 0,
+            "deadline_downgrades": 0,
+            "direct_answers": 0,
+            "cache_restored": 0,
+            "crystallized_runs": 0
         }
         
         # 技能网络（原插件注册表）
         self.plugin_registry = plugin_registry
         
+        # 恢复上次退出时的记忆（模拟人脑的长期记忆）
+        self.load_cache()
+        
         logger.info("类脑意图识别引擎初始化成功")
     
     def _get_intent_prompt(self) -> str:
@@ -174,67 +270,322 @@ print("今天是：", today.strftime("%Y年%m月%d日"))
 
 请只返回Python代码，不要包含其他说明文字。"""
     
-    def recognize_intent(self, message: str) -> Dict[str, Any]:
+    def _get_fused_prompt(self) -> str:
+        """获取融合提示词（意图识别 + 技能匹配 + 代码生成）"""
+        return """你是一个模仿人脑认知过程的意图识别与技能规划助手。请一次性完成意图识别、技能匹配，并在需要时生成Python代码。
+
+意图类型：SEARCH（信息获取）、CHAT（社交交流）、CONFIG（系统配置）、HELP（帮助说明）、MEDITATION（冥想/记忆编码）、SYSTEM（时间、系统信息、命令执行）、UNKNOWN（无法识别）
+
+可用技能：search_plugin、chat_plugin、config_plugin、help_plugin、meditation_plugin、system_plugin；不需要技能时为NONE
+
+代码规则：只有当请求需要计算或获取实时信息（如时间、日期）时才生成代码；只使用Python标准库，代码简洁安全，用print()输出结果；否则code为空字符串。
+
+请严格按照以下JSON格式输出，不要包含任何其他内容：
+{"intent_type": "SEARCH|CHAT|CONFIG|HELP|MEDITATION|SYSTEM|UNKNOWN", "confidence": 0.0到1.0之间的数字, "skill_name": "技能名称或NONE", "search_query": "搜索意图时的查询词，否则为空字符串", "code": "Python代码或空字符串"}"""
+    
+    def recognize_intent(self, message: str, recall_only: bool = False,
+                         cancel_token: Optional[CancellationToken] = None,
+                         deadline: Optional[Deadline] = None, skip_recall: bool = False) -> Optional[Dict[str, Any]]:
         """
         类脑意图识别 - 模仿人脑的感知和认知过程
         
         Args:
             message: 用户输入信息
+            recall_only: 只进行记忆回忆和条件反射，不调用认知API
+            cancel_token: 取消令牌，取消时抛出 OperationCancelled
+            deadline: 本轮截止时间，认知API调用的超时和重试受其限制
+            skip_recall: 本轮已回忆过且未命中（见 probe_local），直接调用认知API，不重复回忆和统计命中
             
         Returns:
-            包含意图信息的字典
+            包含意图信息的字典；recall_only 模式下未能回忆时返回None
         """
         if not message or not message.strip():
             logger.warning("接收到空输入信息")
-            return self._get_fallback_result("")
+            return None if recall_only else self._get_fallback_result("")
         
         message = message.strip()
         start_time = time.time()
         
         try:
-            # 检查记忆缓存（模拟人脑的记忆回忆）
             cache_key = self._get_cache_key(message)
-            if cache_key in self.cache:
-                cached_result = self.cache[cache_key]
-                if time.time() - cached_result['timestamp'] < self.cache_ttl:
-                    self.stats["cache_hits"] += 1
-                    logger.debug(f"记忆命中: {message[:20]}...")
-                    return cached_result['result']
-                else:
-                    # 记忆衰减，删除
-                    del self.cache[cache_key]
-            
-            self.stats["total_requests"] += 1
-            
-            # 调用认知API进行意图识别
-            intent_result = self._call_intent_api(message)
-            
-            # 处理认知结果
-            result = self._process_intent_result(message, intent_result)
+            result = None
+            if not skip_recall:
+                # 检查记忆缓存（模拟人脑的记忆回忆）
+                with self._lock:
+                    cached_result = self.cache.get(cache_key)
+                    if cached_result is not None:
+                        if time.time() - cached_result['timestamp'] < self.cache_ttl:
+                            self.cache.move_to_end(cache_key)
+                            self.stats["total_requests"] += 1
+                            self.stats["cache_hits"] += 1
+                            logger.debug(f"记忆命中: {message[:20]}...")
+                            return self._recall_for(message, cached_result['result'])
+                        else:
+                            # 记忆衰减，删除
+                            del self.cache[cache_key]
+                
+                # 本地分类只做一次：联想回忆按其判定筛选记忆，条件反射按其置信度决定是否直接采用
+                classification = self._classify_locally(message)
+                label = classification["intent_type"] if classification else None
+                
+                # 联想回忆：没有完全相同的记忆时，复用说法相近的输入的意图
+                result = self._recall_similar(message, cache_key, label)
+                if result is not None:
+                    return result
+                
+                # 条件反射：明显的意图由本地分类器直接判定，无需调用认知API
+                result = self._recognize_locally(message, classification)
+            else:
+                label = None
             
-            # 存储到记忆（模拟人脑的记忆存储）
-            self._cache_result(cache_key, result)
+            if result is None:
+                if recall_only:
+                    return None
+                
+                # 调用认知API进行意图识别
+                intent_result = self._call_intent_api(message, cancel_token, deadline)
+                
+                # 处理认知结果
+                result = self._process_intent_result(message, intent_result)
             
-            # 更新行为模式统计
-            response_time = time.time() - start_time
-            self.stats["successful_recognitions"] += 1
-            self._update_average_response_time(response_time)
+            # 存储到记忆并更新行为模式统计
+            self._remember_intent(cache_key, result, start_time, label)
             
             logger.info(f"意图识别成功: {result.get('intent_type')} (置信度: {result.get('confidence', 0):.2f})")
             return result
             
+        except PROPAGATED_ERRORS:
+            with self._lock:
+                self.stats["total_requests"] += 1
+                self.stats["failed_recognitions"] += 1
+            raise
         except Exception as e:
-            self.stats["failed_recognitions"] += 1
+            with self._lock:
+                self.stats["total_requests"] += 1
+                self.stats["failed_recognitions"] += 1
             logger.error(f"意图识别失败: {e}")
-            return self._get_fallback_result(message)
+            return None if recall_only else self._get_fallback_result(message)
+    
+    def _remember_intent(self, cache_key: str, result: Dict[str, Any], start_time: float,
+                         label: Optional[str] = None):
+        """
+        存储识别结果到记忆（模拟人脑的记忆存储），并更新行为模式统计
+        
+        Args:
+            label: 本地分类器对该输入的判定（联想记忆的标签），未分类时在此补做
+        """
+        self._cache_result(cache_key, result)
+        if self.semantic_cache_enabled:
+            message = result.get("message", "")
+            if label is None:
+                label = self._local_label(message)
+            self.semantic_cache.put(message, result, label=label)
+        
+        with self._lock:
+            self.stats["total_requests"] += 1
+            self.stats["successful_recognitions"] += 1
+            self._update_average_response_time(time.time() - start_time)
     
-    def match_skill(self, message: str, intent_type: str) -> str:
+    def plan_fused(self, message: str, intent_data: Dict[str, Any] = None,
+                   cancel_token: Optional[CancellationToken] = None,
+                   deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+        """
+        融合规划 - 一次LLM调用同时完成意图识别、技能匹配和代码生成
+        
+        Args:
+            message: 用户消息
+            intent_data: 已回忆出的意图（来自记忆或条件反射），为None时由本次调用识别
+            cancel_token: 取消令牌
+            deadline: 本轮截止时间
+            
+        Returns:
+            包含 intent_data、skill_name、code 的字典；调用或解析失败时返回None
+        """
+        message = message.strip()
+        start_time = time.time()
+        with self._lock:
+            self.stats["fused_calls"] += 1
+        
+        plan = None
+        try:
+            hint = f"\n已识别意图: {intent_data['intent_type'].upper()}" if intent_data else ""
+            fused_result = self._call_llm_api(
+                f"{self.fused_prompt}\n\n用户输入: {message}{hint}\n\nJSON:", max_tokens=400,
+                cancel_token=cancel_token, deadline=deadline
+            )
+            plan = self._parse_fused_result(fused_result)
+        except PROPAGATED_ERRORS:
+            raise
+        except Exception as e:
+            logger.warning(f"融合规划调用失败: {e}")
+        
+        if plan is None:
+            with self._lock:
+                self.stats["fused_fallbacks"] += 1
+            logger.warning("融合规划结果无法解析，回退到分阶段处理")
+            return None
+        
+        if intent_data is None:
+            intent_data = self._build_intent_result(
+                message, plan["intent_type"], plan["confidence"], plan["search_query"]
+            )
+            intent_data["source"] = "fused"
+            self._remember_intent(self._get_cache_key(message), intent_data, start_time)
+        
+        if plan["skill_name"] != "NONE":
+            with self._lock:
+                self.stats["skill_matches"] += 1
+        
+        logger.info(f"融合规划完成: {intent_data['intent_type']} → {plan['skill_name']}")
+        return {
+            "intent_data": intent_data,
+            "skill_name": plan["skill_name"],
+            "code": plan["code"]
+        }
+    
+    def _parse_fused_result(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        解析融合规划的JSON结果
+        
+        Args:
+            text: LLM返回的文本
+            
+        Returns:
+            规范化后的规划结果，无法解析时返回None
+        """
+        payload = self._extract_json_object(text or "")
+        if not isinstance(payload, dict) or not payload.get("intent_type"):
+            return None
+        
+        intent_type = self._parse_intent_type(str(payload["intent_type"]))
+        
+        try:
+            confidence = min(max(float(payload.get("confidence")), 0.0), 1.0)
+        except (TypeError, ValueError):
+            confidence = None
+        
+        skill_name = str(payload.get("skill_name") or "NONE").strip().lower()
+        if skill_name not in AVAILABLE_SKILLS:
+            skill_name = "NONE"
+        
+        return {
+            "intent_type": intent_type,
+            "confidence": confidence,
+            "skill_name": skill_name,
+            "search_query": str(payload.get("search_query") or "").strip(),
+            "code": self._extract_code(str(payload.get("code") or ""))
+        }
+    
+    @staticmethod
+    def _extract_json_object(text: str) -> Optional[Any]:
+        """从LLM输出中提取第一个完整的JSON对象（容忍代码块包裹、前后说明文字和尾逗号）"""
+        fenced = re.match(r'\s*```(?:json)?\s*(.*?)\s*```\s*$', text, re.DOTALL)
+        if fenced:
+            text = fenced.group(1)
+        
+        start = text.find('{')
+        while start != -1:
+            depth = 0
+            in_string = False
+            escaped = False
+            for index in range(start, len(text)):
+                char = text[index]
+                if in_string:
+                    if escaped:
+                        escaped = False
+                    elif char == '\\':
+                        escaped = True
+                    elif char == '"':
+                        in_string = False
+                elif char == '"':
+                    in_string = True
+                elif char == '{':
+                    depth += 1
+                elif char == '}':
+                    depth -= 1
+                    if depth == 0:
+                        candidate = text[start:index + 1]
+                        for attempt in (candidate, re.sub(r',\s*([}\]])', r'\1', candidate)):
+                            try:
+                                return json.loads(attempt)
+                            except json.JSONDecodeError:
+                                continue
+                        break
+            start = text.find('{', start + 1)
+        
+        return None
+    
+    def _get_local_classifier(self) -> LocalIntentClassifier:
+        """获取本地意图分类器，词表由认知关键词和所有技能的关键词组成"""
+        with self._lock:
+            if self._local_classifier is None:
+                vocabularies = {intent: list(words) for intent, words in INTENT_KEYWORDS.items()}
+                for plugin in self.plugin_registry.get_all_plugins():
+                    for intent in plugin.get_intent_types():
+                        vocabularies.setdefault(intent, []).extend(plugin.get_keywords())
+                
+                self._local_classifier = LocalIntentClassifier(
+                    vocabularies, threshold=self.fast_path_threshold
+                )
+            return self._local_classifier
+    
+    def _classify_locally(self, message: str) -> Optional[Dict[str, Any]]:
+        """本地分类器的判定结果，分类失败时返回None"""
+        last = self._last_classification
+        if last is not None and last[0] == message:
+            return last[1]
+        try:
+            classification = self._get_local_classifier().classify(message)
+        except Exception as e:
+            logger.warning(f"本地意图分类失败: {e}")
+            return None
+        self._last_classification = (message, classification)
+        return classification
+    
+    def _local_label(self, message: str) -> Optional[str]:
+        """本地分类器判定的意图类型（联想记忆的标签）"""
+        if not message:
+            return None
+        classification = self._classify_locally(message)
+        return classification["intent_type"] if classification else None
+    
+    def _recognize_locally(self, message: str, classification: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        本地快速意图识别
+        
+        Args:
+            message: 用户输入信息
+            classification: 本地分类器对该输入的判定（见 _classify_locally）
+            
+        Returns:
+            置信度足够时返回意图结果，否则返回None交给认知API
+        """
+        if not self.fast_path_enabled or classification is None or not classification["fast_path"]:
+            return None
+        
+        with self._lock:
+            self.stats["fast_path_hits"] += 1
+        
+        logger.debug(f"条件反射命中: {classification['intent_type']} ({classification['confidence']:.2f}, "
+                     f"证据: {classification['evidence']})")
+        return {
+            "intent_type": classification["intent_type"],
+            "confidence": classification["confidence"],
+            "message": message,
+            "timestamp": time.time(),
+            "source": "local"
+        }
+    
+    def match_skill(self, message: str, intent_type: str, cancel_token: Optional[CancellationToken] = None,
+                    deadline: Optional[Deadline] = None) -> str:
         """
         技能匹配 - 根据意图选择最合适的技能
         
         Args:
             message: 用户消息
             intent_type: 意图类型
+            cancel_token: 取消令牌
+            deadline: 本轮截止时间
             
         Returns:
             技能名称或NONE
@@ -243,30 +594,35 @@ print("今天是：", today.strftime("%Y年%m月%d日"))
             # 构建技能匹配请求
             skill_prompt = f"{self.skill_matching_prompt}\n\n用户消息: {message}\n意图类型: {intent_type}\n\n请选择最合适的技能:"
             
-            skill_result = self._call_llm_api(skill_prompt, max_tokens=20)
+            skill_result = self._call_llm_api(skill_prompt, max_tokens=20, cancel_token=cancel_token, deadline=deadline)
             skill_name = skill_result.strip().lower()
             
             # 验证技能名称
-            available_skills = ["search_plugin", "chat_plugin", "config_plugin", "help_plugin", "meditation_plugin", "system_plugin"]
-            if skill_name in available_skills:
-                self.stats["skill_matches"] += 1
+            if skill_name in AVAILABLE_SKILLS:
+                with self._lock:
+                    self.stats["skill_matches"] += 1
                 logger.info(f"技能匹配成功: {skill_name}")
                 return skill_name
             else:
                 logger.info(f"无需技能匹配，直接回答")
                 return "NONE"
                 
+        except PROPAGATED_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"技能匹配失败: {e}")
             return "NONE"
     
-    def generate_code(self, message: str, skill_name: str) -> str:
+    def generate_code(self, message: str, skill_name: str, cancel_token: Optional[CancellationToken] = None,
+                      deadline: Optional[Deadline] = None) -> str:
         """
         代码生成 - 根据用户请求生成可执行的Python代码
         
         Args:
             message: 用户消息
             skill_name: 技能名称
+            cancel_token: 取消令牌
+            deadline: 本轮截止时间
             
         Returns:
             生成的Python代码
@@ -275,180 +631,255 @@ print("今天是：", today.strftime("%Y年%m月%d日"))
             # 构建代码生成请求
             code_prompt = f"{self.code_generation_prompt}\n\n用户请求: {message}\n技能: {skill_name}\n\n请生成Python代码:"
             
-            code_result = self._call_llm_api(code_prompt, max_tokens=200)
-            
-            # 提取代码块
-            code_match = re.search(r'```python\s*(.*?)\s*```', code_result, re.DOTALL)
-            if code_match:
-                code = code_match.group(1).strip()
-            else:
-                # 如果没有代码块标记，直接使用结果
-                code = code_result.strip()
+            code_result = self._call_llm_api(code_prompt, max_tokens=200, cancel_token=cancel_token, deadline=deadline)
+            code = self._extract_code(code_result)
             
             logger.info(f"代码生成成功: {len(code)} 字符")
             return code
             
+        except PROPAGATED_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"代码生成失败: {e}")
             return ""
     
-    def execute_code(self, code: str) -> Dict[str, Any]:
+    @staticmethod
+    def _extract_code(text: str) -> str:
+        """提取代码块，没有代码块标记时直接使用原文"""
+        code_match = re.search(r'```python\s*(.*?)\s*```', text, re.DOTALL)
+        if code_match:
+            return code_match.group(1).strip()
+        return text.strip()
+    
+    def execute_code(self, code: str, compiled: Optional[CodeType] = None) -> Dict[str, Any]:
         """
-        执行代码 - 安全执行生成的Python代码
+        执行代码 - 在沙箱工作进程中执行生成的Python代码（受CPU、内存和超时限制）
         
         Args:
             code: Python代码
+            compiled: 技能结晶中已编译的代码对象，提供时工作进程跳过编译
             
         Returns:
             执行结果
         """
-        try:
-            # 安全检查
-            if not self._is_safe_code(code):
-                return {
-                    "success": False,
-                    "error": "代码包含不安全操作",
-                    "output": ""
-                }
-            
-            # 创建安全的执行环境
-            import io
-            import sys
-            from contextlib import redirect_stdout
-            
-            # 捕获输出
-            output_buffer = io.StringIO()
-            
-            # 创建安全的全局环境，只允许安全的函数
-            safe_globals = {
-                "__builtins__": {
-                    "print": print,
-                    "len": len,
-                    "str": str,
-                    "int": int,
-                    "float": float,
-                    "list": list,
-                    "dict": dict,
-                    "tuple": tuple,
-                    "set": set,
-                    "bool": bool,
-                    "type": type,
-                    "isinstance": isinstance,
-                    "range": range,
-                    "enumerate": enumerate,
-                    "zip": zip,
-                    "map": map,
-                    "filter": filter,
-                    "sum": sum,
-                    "max": max,
-                    "min": min,
-                    "abs": abs,
-                    "round": round,
-                    "sorted": sorted,
-                    "reversed": reversed,
-                    "any": any,
-                    "all": all,
-                    "chr": chr,
-                    "ord": ord,
-                    "hex": hex,
-                    "oct": oct,
-                    "bin": bin,
-                    "pow": pow,
-                    "divmod": divmod,
-                    "hash": hash,
-                    "id": id,
-                    "repr": repr,
-                    "ascii": ascii,
-                    "format": format,
-                    "vars": vars,
-                    "dir": dir,
-                    "getattr": getattr,
-                    "hasattr": hasattr,
-                    "callable": callable,
-                    "issubclass": issubclass,
-                    "super": super,
-                    "property": property,
-                    "staticmethod": staticmethod,
-                    "classmethod": classmethod,
-                    "compile": compile,
-                    "eval": eval,
-                    "exec": exec,
-                    "__import__": __import__
-                }
-            }
-            
-            with redirect_stdout(output_buffer):
-                exec(code, safe_globals, {})
-            
-            output = output_buffer.getvalue().strip()
-            self.stats["code_executions"] += 1
-            
+        # 安全检查：结晶程序同样检查（可能来自检查器引入前或被改动过的持久化文件），结论按代码哈希缓存
+        safe, reason = self.code_validator.validate(code)
+        if not safe:
             return {
-                "success": True,
-                "output": output,
-                "code": code
+                "success": False,
+                "error": f"代码包含不安全操作: {reason}",
+                "output": ""
             }
-            
-        except Exception as e:
+        
+        execution_result = self.sandbox.run(code, compiled)
+        if not execution_result["success"]:
             return {
                 "success": False,
-                "error": str(e),
+                "error": execution_result.get("error", "执行失败"),
                 "output": ""
             }
-    
-    def _is_safe_code(self, code: str) -> bool:
-        """检查代码安全性"""
-        dangerous_patterns = [
-            r'import\s+os\s*$',
-            r'import\s+subprocess',
-            r'import\s+sys\s*$',
-            r'os\.',
-            r'subprocess\.',
-            r'sys\.',
-            r'open\s*\(',
-            r'file\s*\(',
-            r'input\s*\(',
-            r'raw_input\s*\(',
-            r'globals\s*\(',
-            r'locals\s*\(',
-            r'setattr\s*\(',
-            r'delattr\s*\(',
-            r'__\w+__\s*\(',
-            r'__\w+__\s*=',
-            r'__\w+__\s*\.',
-        ]
         
-        for pattern in dangerous_patterns:
-            if re.search(pattern, code, re.MULTILINE | re.IGNORECASE):
-                return False
+        with self._lock:
+            self.stats["code_executions"] += 1
         
-        return True
+        return {
+            "success": True,
+            "output": execution_result["output"],
+            "code": code
+        }
     
-    def process_message(self, message: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
+    def process_message(self, message: str, context: Dict[str, Any] = None,
+                        cancel_token: Optional[CancellationToken] = None,
+                        deadline: Optional[Deadline] = None,
+                        probe: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         处理用户消息（类脑感知-认知-执行循环）
         
         Args:
             message: 用户输入信息
             context: 上下文信息
+            cancel_token: 取消令牌；各阶段开始前检查，取消时抛出 OperationCancelled
+            deadline: 本轮截止时间；剩余预算不足以完成某个阶段时跳过后续阶段，降级为普通聊天
+            probe: 本轮已做过的本地探查（probe_local 的结果），提供时不再重复回忆和尝试直接回答
             
         Returns:
             Dict: 处理结果
         """
         start_time = time.time()
+        if cancel_token is not None:
+            # 技能模块通过上下文获取取消令牌
+            context = dict(context or {}, cancel_token=cancel_token)
         
-        # 感知阶段：识别意图
-        intent_data = self.recognize_intent(message)
-        intent_type = intent_data.get("intent_type", "unknown")
+        try:
+            return self._run_pipeline(message, context, cancel_token, deadline, start_time, probe)
+        except DeadlineExceeded as e:
+            with self._lock:
+                self.stats["deadline_downgrades"] += 1
+            logger.warning(f"意图处理超出本轮预算，降级为普通聊天: {e}")
+            return self._get_downgraded_result(message, start_time, str(e))
+    
+    def probe_local(self, message: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        本地探查：仅用记忆和条件反射识别意图，并尝试由技能模块在本地直接回答（不发起任何网络请求）
         
-        # 认知阶段：技能匹配
-        skill_name = self.match_skill(message, intent_type)
+        结果可传给 process_message，同一轮不再重复回忆（也不重复统计记忆/条件反射命中）。
+        
+        Args:
+            message: 用户输入信息
+            context: 上下文信息
+            
+        Returns:
+            Dict: message、intent_data（未能回忆时为None）、
+            direct_result（response_type 为 final_answer 的处理结果，无法直接回答时为None）
+        """
+        start_time = time.time()
+        recalled_intent = self.recognize_intent(message, recall_only=True)
+        return {
+            "message": message,
+            "intent_data": recalled_intent,
+            "direct_result": self._answer_directly(message, recalled_intent, context, start_time)
+        }
+    
+    def try_direct_answer(self, message: str, context: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
+        """
+        仅用记忆和条件反射识别意图，并由技能模块在本地直接回答（不发起任何网络请求）
+        
+        Returns:
+            response_type 为 final_answer 的处理结果；无法直接回答时返回None
+        """
+        return self.probe_local(message, context)["direct_result"]
+    
+    def _answer_directly(self, message: str, intent_data: Optional[Dict[str, Any]],
+                         context: Optional[Dict[str, Any]], start_time: float) -> Optional[Dict[str, Any]]:
+        """技能模块能直接给出完整回答（如时间、系统信息）时执行并构建最终结果，否则返回None"""
+        if not intent_data:
+            return None
+        
+        intent_data = dict(intent_data, user_message=message)
+        plugin = self.plugin_registry.find_direct_answer_plugin(intent_data)
+        if plugin is None:
+            return None
+        
+        plugin_result = self.plugin_registry.execute_plugin(plugin, intent_data, context)
+        answer = render_direct_answer(plugin_result)
+        if answer is None:
+            return None
+        
+        with self._lock:
+            self.stats["direct_answers"] += 1
+            self.stats["plugin_executions"] += 1
+        logger.info(f"技能模块 {plugin.name} 直接回答，跳过LLM调用")
+        return {
+            "success": True,
+            "intent_data": intent_data,
+            "skill_name": plugin.name,
+            "message": message,
+            "pipeline": "direct",
+            "response_type": "final_answer",
+            "response": answer,
+            "data": plugin_result.get("data", {}),
+            "timestamp": time.time(),
+            "processing_time": time.time() - start_time
+        }
+    
+    def _run_crystallized(self, message: str, intent_data: Optional[Dict[str, Any]],
+                          start_time: float) -> Optional[Dict[str, Any]]:
+        """执行技能结晶中的程序；没有可复用的程序或执行失败（程序随即失效）时返回None"""
+        if not self.skill_store_enabled:
+            return None
+        
+        program = self.skill_store.find(message)
+        if program is None:
+            return None
+        
+        execution_result = self.execute_code(program["code"], program["compiled"])
+        if not execution_result["success"]:
+            logger.warning(f"结晶程序执行失败，重新生成: {execution_result.get('error')}")
+            self.skill_store.invalidate(program["skill_name"], message)
+            return None
+        
+        if not intent_data:
+            intent_data = self._build_intent_result(message, self._parse_intent_type(program["intent_type"]))
+        
+        with self._lock:
+            self.stats["crystallized_runs"] += 1
+            self.stats["plugin_executions"] += 1
+        logger.info(f"复用结晶程序: {program['skill_name']}，跳过代码生成")
+        
+        result = {
+            "success": True,
+            "intent_data": dict(intent_data, user_message=message),
+            "skill_name": program["skill_name"],
+            "message": message,
+            "pipeline": "crystallized",
+            "response_type": "skill_execution",
+            "timestamp": time.time(),
+            "processing_time": time.time() - start_time
+        }
+        result.update(execution_result)
+        result["response"] = execution_result["output"]
+        return result
+    
+    def _check_budget(self, deadline: Optional[Deadline], stage: str):
+        """剩余预算不足以开始该阶段时抛出 DeadlineExceeded"""
+        if deadline is not None:
+            deadline.check(stage, self.min_stage_time)
+    
+    def _run_pipeline(self, message: str, context: Optional[Dict[str, Any]],
+                      cancel_token: Optional[CancellationToken], deadline: Optional[Deadline],
+                      start_time: float, probe: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """感知 → 认知 → 执行，各阶段开始前检查取消令牌和剩余预算"""
+        # 记忆/条件反射先行：技能模块能在本地给出完整回答时无需任何LLM调用（调用方已探查过时复用其结果）
+        if probe is None or probe.get("message") != message:
+            probe = self.probe_local(message, context)
+        if probe["direct_result"] is not None:
+            return probe["direct_result"]
+        recalled_intent = probe["intent_data"]
+        
+        # 技能结晶：同样的请求之前执行成功过时直接复用程序，跳过规划和代码生成
+        check_cancelled(cancel_token)
+        crystallized_result = self._run_crystallized(message, recalled_intent, start_time)
+        if crystallized_result is not None:
+            return crystallized_result
+        
+        plan = None
+        if self.fused_mode:
+            # 融合模式：再用一次LLM调用完成技能匹配和代码生成
+            self._check_budget(deadline, "融合规划")
+            plan = self.plan_fused(message, recalled_intent, cancel_token, deadline)
+        
+        if plan is not None:
+            intent_data = plan["intent_data"]
+            skill_name = plan["skill_name"]
+            code = plan["code"]
+        else:
+            # 分阶段模式（或融合结果解析失败）
+            # 感知阶段：识别意图
+            self._check_budget(deadline, "意图识别")
+            intent_data = recalled_intent or self.recognize_intent(
+                message, cancel_token=cancel_token, deadline=deadline, skip_recall=True
+            )
+            intent_type = intent_data.get("intent_type", "unknown")
+            
+            # 认知阶段：技能匹配
+            check_cancelled(cancel_token)
+            self._check_budget(deadline, "技能匹配")
+            skill_name = self.match_skill(message, intent_type, cancel_token, deadline)
+            code = None
+        
+        # 认知API识别出的意图同样先尝试由技能模块直接回答，跳过代码生成和最终的LLM润色
+        if intent_data is not recalled_intent:
+            direct_result = self._answer_directly(message, intent_data, context, start_time)
+            if direct_result is not None:
+                return direct_result
+        intent_data = dict(intent_data, user_message=message)
         
         result = {
             "success": False,
             "intent_data": intent_data,
             "skill_name": skill_name,
             "message": message,
+            "pipeline": "fused" if plan is not None else "staged",
             "timestamp": time.time(),
             "processing_time": time.time() - start_time
         }
@@ -464,8 +895,12 @@ print("今天是：", today.strftime("%Y年%m月%d日"))
             # 需要技能处理
             result["response_type"] = "skill_execution"
             
-            # 生成代码
-            code = self.generate_code(message, skill_name)
+            # 生成代码（融合模式下已随规划一并返回）
+            if code is None:
+                self._check_budget(deadline, "代码生成")
+                code = self.generate_code(message, skill_name, cancel_token, deadline)
+            check_cancelled(cancel_token)
+            self._check_budget(deadline, "技能执行")
             if code:
                 # 执行代码
                 execution_result = self.execute_code(code)
@@ -474,6 +909,8 @@ print("今天是：", today.strftime("%Y年%m月%d日"))
                 if execution_result["success"]:
                     result["success"] = True
                     result["response"] = execution_result["output"]
+                    if self.skill_store_enabled:
+                        self.skill_store.put(skill_name, message, code, intent_data.get("intent_type", "unknown"))
                 else:
                     result["response"] = f"执行失败: {execution_result['error']}"
             else:
@@ -481,21 +918,35 @@ print("今天是：", today.strftime("%Y年%m月%d日"))
                 plugin_result = self.plugin_registry.execute_intent(intent_data, context)
                 result.update(plugin_result)
                 result["response"] = plugin_result.get("message", "处理失败")
+                answer = render_direct_answer(plugin_result)
+                if answer is not None:
+                    result["response_type"] = "final_answer"
+                    result["response"] = answer
         
         # 更新统计
-        self.stats["plugin_executions"] += 1
+        with self._lock:
+            self.stats["plugin_executions"] += 1
         
         logger.info(f"类脑处理完成: {result['success']}")
         return result
     
-    def _call_llm_api(self, prompt: str, max_tokens: int = 100) -> str:
+    def _call_llm_api(self, prompt: str, max_tokens: int = 100,
+                      cancel_token: Optional[CancellationToken] = None,
+                      deadline: Optional[Deadline] = None) -> str:
         """调用LLM API"""
         if not self.api_key:
             raise ValueError("API密钥未设置，请设置DOUBAO_API_KEY环境变量")
         
+        url = f"{self.api_base}/chat/completions"
+        route = model_router.route(
+            self.model_name, url, prompt, task=TASK_INTENT,
+            required_tokens=estimate_tokens(prompt) + max_tokens, default_context=self.context_tokens,
+            latency_budget=deadline.remaining() if deadline is not None else None
+        )
+        
         # 构建请求数据
         data = {
-            "model": self.model_name,
+            "model": route["model"],
             "messages": [
                 {"role": "user", "content": prompt}
             ],
@@ -509,62 +960,81 @@ print("今天是：", today.strftime("%Y年%m月%d日"))
             "Content-Type": "application/json"
         }
         
-        for attempt in range(self.max_retries):
+        def _send(timeout: float):
+            rate_limiter.acquire(url, cancel_token=cancel_token)
+            start_time = time.time()
             try:
-                response = requests.post(
-                    f"{self.api_base}/chat/completions",
-                    json=data,
-                    headers=headers,
-                    timeout=self.timeout
+                response = http_transport.post(
+                    url, cancel_token=cancel_token, json=data, headers=headers, timeout=timeout
                 )
                 response.raise_for_status()
-                
-                result = response.json()
-                return result["choices"][0]["message"]["content"].strip()
-                
+                model_router.record_latency(data["model"], time.time() - start_time)
+                return response.json()
             except requests.exceptions.RequestException as e:
-                self.stats["api_errors"] += 1
-                logger.warning(f"LLM API调用尝试 {attempt + 1} 失败: {e}")
-                
-                if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay * (attempt + 1))
-                else:
-                    raise Exception(f"LLM API调用失败，已重试{self.max_retries}次: {e}")
+                with self._lock:
+                    self.stats["api_errors"] += 1
+                logger.warning(f"LLM API调用失败: {e}")
+                raise
+        
+        # 指数退避重试；端点熔断时直接快速失败；相同请求正在进行时直接等待其结果
+        try:
+            result = single_flight.do(
+                single_flight.make_key(url=url, data=data),
+                lambda: resilience.call(url, _send, default_timeout=self.timeout, max_retries=self.max_retries,
+                                        cancel_token=cancel_token, deadline=deadline),
+                cancel_token=cancel_token
+            )
+        except CircuitOpenError:
+            raise
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"LLM API调用失败，已重试{self.max_retries}次: {e}")
+        
+        return result["choices"][0]["message"]["content"].strip()
     
-    def _call_intent_api(self, message: str) -> str:
+    def _call_intent_api(self, message: str, cancel_token: Optional[CancellationToken] = None,
+                         deadline: Optional[Deadline] = None) -> str:
         """调用认知API进行意图识别"""
-        return self._call_llm_api(self.intent_prompt + f"\n\n用户输入: {message}\n\n意图类型:", max_tokens=10)
+        return self._call_llm_api(
+            self.intent_prompt + f"\n\n用户输入: {message}\n\n意图类型:", max_tokens=10,
+            cancel_token=cancel_token, deadline=deadline
+        )
     
     def _process_intent_result(self, message: str, intent_text: str) -> Dict[str, Any]:
         """处理认知识别结果"""
         try:
             # 解析意图类型
             intent_type = self._parse_intent_type(intent_text)
-            
-            # 计算认知置信度
-            confidence = self._calculate_confidence(message, intent_type)
-            
-            # 提取搜索查询（如果是搜索意图）
-            search_query = ""
-            if intent_type == IntentType.SEARCH:
-                search_query = self._extract_search_query(message)
-            
-            result = {
-                "intent_type": intent_type.value,
-                "confidence": confidence,
-                "message": message,
-                "timestamp": time.time()
-            }
-            
-            if search_query:
-                result["search_query"] = search_query
-            
-            return result
+            return self._build_intent_result(message, intent_type)
             
         except Exception as e:
             logger.error(f"处理认知结果时出错: {e}")
             return self._get_fallback_result(message)
     
+    def _build_intent_result(self, message: str, intent_type: IntentType,
+                             confidence: float = None, search_query: str = None) -> Dict[str, Any]:
+        """构建意图结果（缺省的置信度和搜索查询由本地规则补全）"""
+        # 计算认知置信度
+        if confidence is None:
+            confidence = self._calculate_confidence(message, intent_type)
+        
+        # 提取搜索查询（如果是搜索意图）
+        if intent_type != IntentType.SEARCH:
+            search_query = ""
+        elif not search_query:
+            search_query = self._extract_search_query(message)
+        
+        result = {
+            "intent_type": intent_type.value,
+            "confidence": confidence,
+            "message": message,
+            "timestamp": time.time()
+        }
+        
+        if search_query:
+            result["search_query"] = search_query
+        
+        return result
+    
     def _parse_intent_type(self, intent_text: str) -> IntentType:
         """解析意图类型"""
         intent_text = intent_text.strip().upper()
@@ -586,36 +1056,10 @@ print("今天是：", today.strftime("%Y年%m月%d日"))
         """计算认知置信度"""
         confidence = 0.5  # 基础置信度
         
-        # 根据关键词匹配调整置信度
-        if intent_type == IntentType.SEARCH:
-            search_keywords = ["搜索", "查找", "找", "帮我找", "如何", "怎么", "什么是", "最新", "新闻"]
-            if any(keyword in message for keyword in search_keywords):
-                confidence += 0.3
-        
-        elif intent_type == IntentType.CHAT:
-            chat_keywords = ["你好", "谢谢", "再见", "拜拜", "早上好", "晚上好"]
-            if any(keyword in message for keyword in chat_keywords):
-                confidence += 0.3
-        
-        elif intent_type == IntentType.CONFIG:
-            config_keywords = ["配置", "设置", "API", "base_url", "密钥"]
-            if any(keyword in message for keyword in config_keywords):
-                confidence += 0.3
-        
-        elif intent_type == IntentType.HELP:
-            help_keywords = ["帮助", "说明", "怎么用", "功能", "指南"]
-            if any(keyword in message for keyword in help_keywords):
-                confidence += 0.3
-        
-        elif intent_type == IntentType.MEDITATION:
-            meditation_keywords = ["冥想", "编码", "A2B", "B2C", "记忆"]
-            if any(keyword in message for keyword in meditation_keywords):
-                confidence += 0.3
-        
-        elif intent_type == IntentType.SYSTEM:
-            system_keywords = ["今天几号", "现在时间", "几点", "日期", "时间", "系统信息", "系统版本", "执行", "运行", "命令"]
-            if any(keyword in message for keyword in system_keywords):
-                confidence += 0.3
+        # 根据关键词匹配调整置信度（关键词自动机单次扫描所有意图词表）
+        keyword_hits = self._get_local_classifier().keyword_hits(message)
+        if keyword_hits.get(intent_type.value):
+            confidence += 0.3
         
         return min(confidence, 1.0)  # 确保不超过1.0
     
@@ -633,25 +1077,95 @@ print("今天是：", today.strftime("%Y年%m月%d日"))
         return query if query else message
     
     def _get_cache_key(self, message: str) -> str:
-        """生成记忆键"""
-        return f"intent:{hash(message)}"
+        """
+        生成记忆键：规范化输入的内容哈希，跨进程稳定，可随快照持久化
+        
+        与联想记忆、技能结晶使用同一个规范化函数（normalize_text），三者对"同一输入"的判断一致；
+        规范化后为空（如纯标点）时退回去除首尾空白的原文。
+        """
+        text = normalize_text(message) or message.strip()
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+        return f"intent:{digest}"
+    
+    def _recall_similar(self, message: str, cache_key: str, label: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        从联想记忆中找出说法最相近的输入，相似度超过阈值时复用其意图
+        
+        Args:
+            label: 本地分类器对本次输入的判定，只联想判定相同的记忆
+            
+        Returns:
+            意图结果（附带 semantic_similarity）；没有足够相近的记忆时返回None
+        """
+        if not self.semantic_cache_enabled:
+            return None
+        
+        recalled = self.semantic_cache.lookup(message, label)
+        if recalled is None:
+            return None
+        
+        cached_result, similarity = recalled
+        result = self._recall_for(message, cached_result)
+        result["semantic_similarity"] = round(similarity, 3)
+        # 写入精确记忆，相同输入下次直接命中
+        self._cache_result(cache_key, result)
+        
+        with self._lock:
+            self.stats["total_requests"] += 1
+            self.stats["cache_hits"] += 1
+        logger.debug(f"联想记忆命中: {message[:20]}... (相似度: {similarity:.2f})")
+        return result
+    
+    def _recall_for(self, message: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        把回忆出的意图套用到本次输入
+        
+        规范化后相同的输入（如仅标点、大小写不同）共享记忆，
+        返回副本并按本次输入重新填写消息和搜索查询，后续阶段对结果的修改不会写回记忆。
+        """
+        recalled = dict(result, message=message)
+        if recalled.get("search_query"):
+            recalled["search_query"] = self._extract_search_query(message)
+        return recalled
     
     def _cache_result(self, cache_key: str, result: Dict[str, Any]):
         """存储到记忆"""
-        # 实现LRU记忆机制
-        if cache_key in self.cache:
-            # 移动到末尾（最近使用）
-            self.cache.move_to_end(cache_key)
-        else:
-            # 检查记忆容量
-            if len(self.cache) >= self.cache_size:
-                # 移除最旧的记忆
-                self.cache.popitem(last=False)
-        
-        # 添加新记忆
-        self.cache[cache_key] = {
-            "result": result,
-            "timestamp": time.time()
+        with self._lock:
+            # 实现LRU记忆机制
+            if cache_key in self.cache:
+                # 移动到末尾（最近使用）
+                self.cache.move_to_end(cache_key)
+            else:
+                # 检查记忆容量
+                if len(self.cache) >= self.cache_size:
+                    # 移除最旧的记忆
+                    self.cache.popitem(last=False)
+            
+            # 添加新记忆
+            self.cache[cache_key] = {
+                "result": result,
+                "timestamp": time.time()
+            }
+    
+    def _get_downgraded_result(self, message: str, start_time: float, reason: str) -> Dict[str, Any]:
+        """预算不足时的降级结果：按普通聊天处理，不携带执行结果"""
+        return {
+            "success": True,
+            "intent_data": {
+                "intent_type": IntentType.CHAT.value,
+                "confidence": 0.0,
+                "message": message,
+                "timestamp": time.time(),
+                "downgraded": True
+            },
+            "skill_name": "NONE",
+            "message": message,
+            "pipeline": "downgraded",
+            "response_type": "direct_answer",
+            "response": "",
+            "error": reason,
+            "timestamp": time.time(),
+            "processing_time": time.time() - start_time
         }
     
     def _get_fallback_result(self, message: str) -> Dict[str, Any]:
@@ -675,7 +1189,8 @@ print("今天是：", today.strftime("%Y年%m月%d日"))
     
     def get_stats(self) -> Dict[str, Any]:
         """获取行为模式统计信息"""
-        stats = self.stats.copy()
+        with self._lock:
+            stats = self.stats.copy()
         
         # 计算记忆命中率
         if stats["total_requests"] > 0:
@@ -683,12 +1198,39 @@ print("今天是：", today.strftime("%Y年%m月%d日"))
         else:
             stats["cache_hit_rate"] = 0.0
         
-        # 计算成功率
-        if stats["total_requests"] > 0:
-            stats["success_rate"] = stats["successful_recognitions"] / stats["total_requests"]
+        # 计算成功率（仅统计未命中记忆、实际发起识别的请求）
+        recognition_requests = stats["total_requests"] - stats["cache_hits"]
+        if recognition_requests > 0:
+            stats["success_rate"] = stats["successful_recognitions"] / recognition_requests
         else:
             stats["success_rate"] = 0.0
         
+        # 计算融合规划回退率
+        if stats["fused_calls"] > 0:
+            stats["fused_fallback_rate"] = stats["fused_fallbacks"] / stats["fused_calls"]
+        else:
+            stats["fused_fallback_rate"] = 0.0
+        
+        # 计算条件反射（本地快速通道）命中率
+        if recognition_requests > 0:
+            stats["fast_path_hit_rate"] = stats["fast_path_hits"] / recognition_requests
+        else:
+            stats["fast_path_hit_rate"] = 0.0
+        
+        # 相同请求合并统计（与聊天请求共享）
+        stats["single_flight"] = single_flight.get_stats()
+        
+        # 技能结晶与沙箱统计
+        stats["skill_store"] = self.skill_store.get_stats()
+        stats["sandbox"] = self.sandbox.get_stats()
+        stats["code_validator"] = self.code_validator.get_stats()
+        
+        # 联想记忆统计（命中同时计入 cache_hits）
+        stats["semantic_cache"] = self.semantic_cache.get_stats()
+        
+        # 模型路由统计（与聊天请求共享）
+        stats["model_router"] = model_router.get_stats()
+        
         # 添加记忆信息
         stats["cache_size"] = len(self.cache)
         stats["cache_max_size"] = self.cache_size
@@ -697,9 +1239,102 @@ print("今天是：", today.strftime("%Y年%m月%d日"))
     
     def clear_cache(self):
         """清空记忆"""
-        self.cache.clear()
+        with self._lock:
+            self.cache.clear()
+        self.semantic_cache.clear()
         logger.info("记忆已清空")
     
+    def save_cache(self) -> int:
+        """
+        把未过期的记忆保存为快照（先写临时文件再替换，避免写到一半损坏）
+        
+        Returns:
+            保存的记忆条数
+        """
+        now = time.time()
+        with self._lock:
+            entries = [
+                {"key": key, "result": value["result"], "timestamp": value["timestamp"]}
+                for key, value in self.cache.items()
+                if now - value["timestamp"] < self.cache_ttl
+            ]
+        
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": INTENT_CACHE_VERSION, "saved_at": now, "entries": entries},
+                          f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"保存记忆快照失败: {e}")
+            return 0
+        
+        logger.info(f"已保存 {len(entries)} 条记忆快照")
+        return len(entries)
+    
+    def load_cache(self) -> int:
+        """
+        加载记忆快照，跳过已过期的记忆和旧版本快照
+        
+        Returns:
+            恢复的记忆条数
+        """
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            logger.warning(f"加载记忆快照失败: {e}")
+            return 0
+        
+        if not isinstance(snapshot, dict) or snapshot.get("version") != INTENT_CACHE_VERSION:
+            logger.info("记忆快照版本不匹配，已忽略")
+            return 0
+        
+        now = time.time()
+        entries = [
+            entry for entry in snapshot.get("entries", [])
+            if isinstance(entry, dict) and "key" in entry and isinstance(entry.get("result"), dict)
+            and now - entry.get("timestamp", 0) < self.cache_ttl
+        ]
+        # 按时间顺序恢复，超出容量时只保留最近的记忆
+        entries.sort(key=lambda entry: entry["timestamp"])
+        entries = entries[-self.cache_size:] if self.cache_size > 0 else []
+        
+        with self._lock:
+            for entry in entries:
+                if entry["key"] not in self.cache:
+                    self.cache[entry["key"]] = {"result": entry["result"], "timestamp": entry["timestamp"]}
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            self.stats["cache_restored"] += len(entries)
+        
+        # 按记忆中的原始输入重建联想记忆
+        for entry in entries:
+            message = entry["result"].get("message")
+            if message:
+                self.semantic_cache.put(message, entry["result"], entry["timestamp"], label=self._local_label(message))
+        
+        logger.info(f"已恢复 {len(entries)} 条记忆快照")
+        return len(entries)
+    
+    def update_config(self, api_key: str = None, api_base: str = None):
+        """
+        更新API配置，保留记忆缓存与统计信息
+        
+        Args:
+            api_key: API密钥
+            api_base: API基础URL
+        """
+        with self._lock:
+            if api_key:
+                self.api_key = api_key
+            if api_base:
+                self.api_base = api_base
+        logger.info("类脑意图识别引擎配置已更新")
+    
     def test_connection(self) -> Dict[str, Any]:
         """测试认知API连接"""
         start_time = time.time()
@@ -727,8 +1362,62 @@ print("今天是：", today.strftime("%Y年%m月%d日"))
     
     def register_plugin(self, plugin) -> bool:
         """注册技能"""
-        return self.plugin_registry.register_plugin(plugin)
+        registered = self.plugin_registry.register_plugin(plugin)
+        
+        # 技能词表变化，下次使用时重建本地分类器
+        with self._lock:
+            self._local_classifier = None
+            self._last_classification = None
+        return registered
     
     def get_available_plugins(self) -> List[Dict[str, Any]]:
         """获取可用技能列表"""
-        return self.plugin_registry.list_plugins() 
\ No newline at end of file
+        return self.plugin_registry.list_plugins() 
+
+
+# 进程级共享的意图引擎
+_shared_engine: Optional[IntentEngine] = None
+_shared_engine_lock = threading.Lock()
+
+
+def _register_builtin_plugins(engine: IntentEngine):
+    """向引擎的技能网络注册尚未注册的内置技能"""
+    try:
+        from .plugins import get_all_plugins
+    except (ImportError, SystemError):
+        from brain_agent.plugins import get_all_plugins
+    
+    for plugin in get_all_plugins():
+        if engine.plugin_registry.get_plugin(plugin.name) is None:
+            engine.register_plugin(plugin)
+
+
+def get_intent_engine(api_key: str = None, api_base: str = None) -> IntentEngine:
+    """
+    获取进程级共享的意图引擎
+    
+    首次调用时创建引擎并注册内置技能，之后所有对话轮次和线程复用同一实例，
+    记忆缓存与统计信息在整个会话期间持续有效；配置变化时就地更新。
+    
+    Args:
+        api_key: API密钥
+        api_base: API基础URL
+        
+    Returns:
+        IntentEngine: 共享的意图引擎实例
+    """
+    global _shared_engine
+    
+    with _shared_engine_lock:
+        if _shared_engine is None:
+            _shared_engine = IntentEngine(api_key=api_key, api_base=api_base)
+            # 退出时保存记忆快照，下次启动直接复用
+            atexit.register(_shared_engine.save_cache)
+            # 预先创建沙箱工作进程，首次执行生成代码时无需等待进程启动
+            _shared_engine.sandbox.warm_up()
+            _register_builtin_plugins(_shared_engine)
+        elif ((api_key and api_key != _shared_engine.api_key) or
+              (api_base and api_base != _shared_engine.api_base)):
+            _shared_engine.update_config(api_key=api_key, api_base=api_base)
+        
+        return _shared_engine
@@ -0,0 +1,346 @@
+"""
+Local Classifier - 本地快速意图分类器
+
+模仿人脑的"条件反射"：对明显的输入不经过深度思考（LLM调用）直接作出反应。
+1. 关键词自动机：Aho-Corasick 自动机一次扫描即可命中所有意图/技能关键词
+2. 线性模型：基于字符 n-gram 哈希特征的 softmax 线性分类器，启动时用种子样本训练
+3. 置信度门控：模型置信度超过阈值、领先第二名足够多，且有充分的关键词证据时才走快速通道，其余交给LLM
+   关键词证据：整句就是已知说法（关键词或种子样本，忽略句末语气词），关键词覆盖了句子的大部分，
+   或命中至少两个互不重叠的关键词。单个关键词出现在长句中（如"时间过得真快啊"）不算
+"""
+
+import math
+import re
+import unicodedata
+import zlib
+from collections import deque
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+
+
+# 种子样本：补充关键词之外的典型说法，用于训练线性模型
+SEED_EXAMPLES = {
+    "search": [
+        "搜索Python教程", "帮我查找最新新闻", "什么是量子计算", "如何学习机器学习",
+        "帮我找一下附近的餐厅", "search python tutorial"
+    ],
+    "chat": [
+        "你好", "你好，好烦。", "谢谢你", "晚安啦", "早上好呀", "我今天很开心",
+        "有点难过", "再见", "哈哈你真可爱", "hello there", "我今天心情不好", "陪我聊聊天"
+    ],
+    "config": [
+        "设置API密钥", "配置系统参数", "修改base_url", "我想换一个模型配置"
+    ],
+    "help": [
+        "帮助", "怎么用这个助手", "有哪些功能", "查看使用说明", "给我一份使用指南"
+    ],
+    "meditation": [
+        "开始冥想", "执行A2B编码", "做一次B2C冥想", "整理一下记忆", "开始记忆编码"
+    ],
+    "system": [
+        "今天几号", "今天是几号", "现在几点了", "现在时间", "今天星期几", "系统信息",
+        "查看系统版本", "执行pwd命令"
+    ],
+    "unknown": [
+        "2345和872哪个大", "帮我计算1+1等于多少", "嗯", "写一首诗", "翻译这句话"
+    ]
+}
+
+# 句末语气词，判断整句是否为已知说法时忽略
+_TRAILING_PARTICLES = "啊呀呢吗吧啦哦嘛哈"
+
+_PUNCTUATION_RE = re.compile(r"[\s\W_]+", re.UNICODE)
+
+
+def normalize_text(text: str) -> str:
+    """归一化文本：全角转半角、大小写折叠、去除空白和标点"""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return _PUNCTUATION_RE.sub("", text)
+
+
+class KeywordAutomaton:
+    """Aho-Corasick 多模式匹配自动机"""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[str, str]]] = [[]]
+        self._built = True
+
+    def add(self, keyword: str, label: str):
+        """
+        添加关键词
+
+        Args:
+            keyword: 关键词
+            label: 关键词所属标签（意图类型）
+        """
+        keyword = unicodedata.normalize("NFKC", keyword).casefold().strip()
+        if not keyword:
+            return
+
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+
+        if (keyword, label) not in self._output[state]:
+            self._output[state].append((keyword, label))
+        self._built = False
+
+    def build(self):
+        """构建失败指针（BFS）"""
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                candidate = self._goto[fail].get(char, 0)
+                self._fail[next_state] = candidate if candidate != next_state else 0
+                self._output[next_state] = self._output[next_state] + [
+                    item for item in self._output[self._fail[next_state]]
+                    if item not in self._output[next_state]
+                ]
+
+        self._built = True
+
+    def find_all(self, text: str) -> List[Tuple[int, str, str]]:
+        """
+        单次扫描查找所有命中的关键词
+
+        Args:
+            text: 待匹配文本
+
+        Returns:
+            List[Tuple]: (起始位置, 关键词, 标签) 列表
+        """
+        if not self._built:
+            self.build()
+
+        text = unicodedata.normalize("NFKC", text).casefold()
+        matches = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for keyword, label in self._output[state]:
+                start = index - len(keyword) + 1
+                if self._is_word_match(text, start, index + 1, keyword):
+                    matches.append((start, keyword, label))
+        return matches
+
+    @staticmethod
+    def _is_word_match(text: str, start: int, end: int, keyword: str) -> bool:
+        """英文关键词需要完整单词匹配，避免 "hi" 命中 "this" """
+        if not keyword.isascii() or not keyword[0].isalpha():
+            return True
+        before = text[start - 1] if start > 0 else " "
+        after = text[end] if end < len(text) else " "
+        return not (before.isascii() and before.isalnum()) and not (after.isascii() and after.isalnum())
+
+
+class LocalIntentClassifier:
+    """本地意图分类器：关键词自动机 + 字符 n-gram 线性模型"""
+
+    def __init__(self, vocabularies: Dict[str, Iterable[str]], threshold: float = 0.75,
+                 fast_path_intents: Iterable[str] = ("system", "chat", "help", "meditation"),
+                 min_margin: float = 0.4, min_coverage: float = 0.75,
+                 feature_dim: int = 4096, ngram_range: Tuple[int, int] = (1, 3),
+                 epochs: int = 30, learning_rate: float = 0.5):
+        """
+        初始化并训练分类器
+
+        Args:
+            vocabularies: 意图类型 -> 关键词列表
+            threshold: 走快速通道所需的最低置信度
+            fast_path_intents: 允许本地直接判定的意图类型
+            min_margin: 走快速通道时最高置信度需领先第二名的差值
+            min_coverage: 单个关键词作为证据时需覆盖的句子比例（去除标点后按字符计）
+            feature_dim: 哈希特征维度
+            ngram_range: 字符 n-gram 范围
+            epochs: 训练轮数
+            learning_rate: 学习率
+        """
+        self.threshold = threshold
+        self.fast_path_intents = set(fast_path_intents)
+        self.min_margin = min_margin
+        self.min_coverage = min_coverage
+        self.feature_dim = feature_dim
+        self.ngram_range = ngram_range
+
+        self.vocabularies = {label: sorted(set(words)) for label, words in vocabularies.items()}
+        self.labels = sorted(set(self.vocabularies) | set(SEED_EXAMPLES))
+
+        self.automaton = KeywordAutomaton()
+        for label, words in self.vocabularies.items():
+            for word in words:
+                self.automaton.add(word, label)
+        self.automaton.build()
+
+        # 已知的整句说法（归一化并去除句末语气词）-> 意图类型
+        self.phrases: Dict[str, str] = {}
+        for label, words in self.vocabularies.items():
+            for word in words:
+                self.phrases.setdefault(self._phrase_key(word), label)
+        for label, examples in SEED_EXAMPLES.items():
+            for example in examples:
+                self.phrases[self._phrase_key(example)] = label
+
+        self.weights: Dict[str, Dict[int, float]] = {label: {} for label in self.labels}
+        self.bias: Dict[str, float] = {label: 0.0 for label in self.labels}
+        self._train(epochs, learning_rate)
+
+    @staticmethod
+    def _phrase_key(text: str) -> str:
+        return normalize_text(text).rstrip(_TRAILING_PARTICLES)
+
+    def _keyword_evidence(self, message: str, label: str, matches: List[Tuple[int, str, str]]) -> Optional[str]:
+        """
+        判断关键词证据是否足以支持直接判定为该意图
+
+        Returns:
+            "phrase"（整句为已知说法）、"coverage"（关键词覆盖大部分句子）、
+            "multi"（多个互不重叠的关键词）；证据不足时返回None
+        """
+        phrase = self._phrase_key(message)
+        if phrase and self.phrases.get(phrase) == label:
+            return "phrase"
+
+        spans = sorted((start, start + len(keyword)) for start, keyword, hit_label in matches if hit_label == label)
+        if not spans:
+            return None
+
+        # 互不重叠的关键词数（贪心选取，"几点"与"几点了"只算一个）与覆盖的字符数
+        covered, distinct, last_end = set(), 0, -1
+        for start, end in sorted(spans, key=lambda span: span[1]):
+            covered.update(range(start, end))
+            if start >= last_end:
+                distinct += 1
+                last_end = end
+
+        length = len(normalize_text(message)) or 1
+        if len(covered) / length >= self.min_coverage:
+            return "coverage"
+        if distinct >= 2:
+            return "multi"
+        return None
+
+    def keyword_hits(self, message: str) -> Dict[str, int]:
+        """
+        单次扫描统计各意图的关键词命中数
+
+        Args:
+            message: 用户消息
+
+        Returns:
+            Dict: 意图类型 -> 命中次数
+        """
+        hits: Dict[str, int] = {}
+        for _, _, label in self.automaton.find_all(message):
+            hits[label] = hits.get(label, 0) + 1
+        return hits
+
+    def _extract_features(self, message: str, hits: Optional[Dict[str, int]] = None) -> Dict[int, float]:
+        """提取哈希化的字符 n-gram 特征与关键词命中特征"""
+        text = normalize_text(message)
+        features: Dict[int, float] = {}
+
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            for i in range(len(text) - n + 1):
+                index = zlib.crc32(text[i:i + n].encode("utf-8")) % self.feature_dim
+                features[index] = features.get(index, 0.0) + 1.0
+
+        if hits is None:
+            hits = self.keyword_hits(message)
+        for label, count in hits.items():
+            index = zlib.crc32(f"kw:{label}".encode("utf-8")) % self.feature_dim
+            features[index] = features.get(index, 0.0) + 2.0 * count
+
+        # L2 归一化，避免长文本主导得分
+        norm = math.sqrt(sum(value * value for value in features.values())) or 1.0
+        return {index: value / norm for index, value in features.items()}
+
+    def _scores(self, features: Dict[int, float]) -> Dict[str, float]:
+        """计算 softmax 概率"""
+        logits = {}
+        for label in self.labels:
+            weights = self.weights[label]
+            logits[label] = self.bias[label] + sum(
+                weights.get(index, 0.0) * value for index, value in features.items()
+            )
+
+        max_logit = max(logits.values())
+        exps = {label: math.exp(logit - max_logit) for label, logit in logits.items()}
+        total = sum(exps.values())
+        return {label: value / total for label, value in exps.items()}
+
+    def _train(self, epochs: int, learning_rate: float):
+        """用关键词和种子样本训练 softmax 线性模型（确定性SGD）"""
+        samples = []
+        for label, words in self.vocabularies.items():
+            samples.extend((word, label) for word in words)
+        for label, examples in SEED_EXAMPLES.items():
+            samples.extend((example, label) for example in examples)
+
+        dataset = [(self._extract_features(text), label) for text, label in samples]
+        for epoch in range(epochs):
+            rate = learning_rate / (1 + epoch * 0.1)
+            for features, label in dataset:
+                probabilities = self._scores(features)
+                for candidate in self.labels:
+                    gradient = probabilities[candidate] - (1.0 if candidate == label else 0.0)
+                    if abs(gradient) < 1e-6:
+                        continue
+                    weights = self.weights[candidate]
+                    for index, value in features.items():
+                        weights[index] = weights.get(index, 0.0) - rate * gradient * value
+                    self.bias[candidate] -= rate * gradient * 0.1
+
+    def classify(self, message: str) -> Dict[str, Any]:
+        """
+        对消息进行本地分类
+
+        Args:
+            message: 用户消息
+
+        Returns:
+            Dict: 包含 intent_type、confidence、margin（领先第二名的差值）、keyword_hits、
+            evidence（关键词证据类型）、fast_path（是否可直接采用）
+        """
+        matches = self.automaton.find_all(message)
+        hits: Dict[str, int] = {}
+        for _, _, label in matches:
+            hits[label] = hits.get(label, 0) + 1
+
+        probabilities = self._scores(self._extract_features(message, hits))
+        ranked = sorted(probabilities, key=probabilities.get, reverse=True)
+        intent_type = ranked[0]
+        confidence = probabilities[intent_type]
+        margin = confidence - (probabilities[ranked[1]] if len(ranked) > 1 else 0.0)
+
+        evidence = None
+        if intent_type in self.fast_path_intents and confidence >= self.threshold and margin >= self.min_margin:
+            evidence = self._keyword_evidence(message, intent_type, matches)
+
+        return {
+            "intent_type": intent_type,
+            "confidence": confidence,
+            "margin": margin,
+            "keyword_hits": hits,
+            "evidence": evidence,
+            "fast_path": evidence is not None
+        }
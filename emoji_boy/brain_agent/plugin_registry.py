@@ -3,11 +3,15 @@ Plugin Registry - 技能网络系统
 
 负责管理所有技能模块的注册、查找、启用/禁用和执行。
 模仿人脑的技能网络，提供技能生命周期管理和执行统计功能。
+
+查找技能时不再逐个调用 can_handle：声明了 static_dispatch 的技能按元数据
+（intent_types、triggers）预先编入分派表，每种意图类型对应一个按优先级排好的技能列表，
+只在注册/注销/启用/禁用时重建；未声明的技能仍在查找时调用 can_handle 判断。
 """
 
 import time
 import logging
-from typing import Dict, Any, List, Optional, Type
+from typing import Dict, Any, List, Optional, Tuple, Type
 try:
     from .plugins.base_plugin import BasePlugin, PluginPriority
 except (ImportError, SystemError):
@@ -32,6 +36,13 @@ class PluginRegistry:
             "plugin_usage": {}  # 记录每个技能的使用次数
         }
         
+        # 分派表：意图类型 -> 按优先级排序的技能；触发词技能和动态判断技能单独列出
+        self._dispatch_table: Dict[str, List[BasePlugin]] = {}
+        self._trigger_plugins: List[Tuple[BasePlugin, Tuple[str, ...]]] = []
+        self._dynamic_plugins: List[BasePlugin] = []
+        self._dispatch_rank: Dict[str, int] = {}
+        self._dispatch_rebuilds = 0
+        
         logger.info("技能网络系统初始化完成")
     
     def register_plugin(self, plugin: BasePlugin) -> bool:
@@ -55,6 +66,7 @@ class PluginRegistry:
         
         self._plugins[plugin.name] = plugin
         self._execution_stats["plugin_usage"][plugin.name] = 0
+        self._rebuild_dispatch_table()
         
         logger.info(f"技能模块 {plugin.name} 注册成功 (优先级: {plugin.priority.name})")
         return True
@@ -91,6 +103,7 @@ class PluginRegistry:
             del self._plugins[plugin_name]
             if plugin_name in self._execution_stats["plugin_usage"]:
                 del self._execution_stats["plugin_usage"][plugin_name]
+            self._rebuild_dispatch_table()
             
             logger.info(f"技能模块 {plugin_name} 注销成功")
             return True
@@ -128,6 +141,53 @@ class PluginRegistry:
         """
         return [plugin for plugin in self._plugins.values() if plugin.is_enabled()]
     
+    def _rebuild_dispatch_table(self):
+        """按启用技能的元数据重建分派表（优先级高的在前，同优先级按注册顺序）"""
+        ordered = sorted(self.get_enabled_plugins(), key=lambda p: p.priority.value, reverse=True)
+        
+        dispatch_table: Dict[str, List[BasePlugin]] = {}
+        trigger_plugins: List[Tuple[BasePlugin, Tuple[str, ...]]] = []
+        dynamic_plugins: List[BasePlugin] = []
+        for plugin in ordered:
+            if not plugin.uses_static_dispatch():
+                dynamic_plugins.append(plugin)
+                continue
+            for intent_type in plugin.get_intent_types():
+                dispatch_table.setdefault(intent_type, []).append(plugin)
+            triggers = tuple(keyword.lower() for keyword in plugin.get_triggers() if keyword)
+            if triggers:
+                trigger_plugins.append((plugin, triggers))
+        
+        # 整体替换，查找线程不会看到重建到一半的表
+        self._dispatch_table = dispatch_table
+        self._trigger_plugins = trigger_plugins
+        self._dynamic_plugins = dynamic_plugins
+        self._dispatch_rank = {plugin.name: rank for rank, plugin in enumerate(ordered)}
+        self._dispatch_rebuilds += 1
+    
+    def _match_plugins(self, intent_data: Dict[str, Any]) -> List[BasePlugin]:
+        """按分派表、触发词和动态判断查找能处理意图的技能，按优先级排序"""
+        matched = list(self._dispatch_table.get(intent_data.get("intent_type", ""), ()))
+        
+        if self._trigger_plugins:
+            user_message = str(intent_data.get("user_message", "")).lower()
+            if user_message:
+                for plugin, triggers in self._trigger_plugins:
+                    if plugin not in matched and any(keyword in user_message for keyword in triggers):
+                        matched.append(plugin)
+        
+        for plugin in self._dynamic_plugins:
+            try:
+                if plugin.can_handle(intent_data):
+                    matched.append(plugin)
+            except Exception as e:
+                logger.warning(f"技能模块 {plugin.name} 检查意图时出错: {e}")
+        
+        if len(matched) > 1:
+            rank = self._dispatch_rank
+            matched.sort(key=lambda p: rank.get(p.name, len(rank)))
+        return matched
+    
     def find_plugins_for_intent(self, intent_data: Dict[str, Any]) -> List[BasePlugin]:
         """
         查找能处理指定意图的技能模块
@@ -138,19 +198,7 @@ class PluginRegistry:
         Returns:
             List[BasePlugin]: 能处理的技能模块列表，按优先级排序
         """
-        suitable_plugins = []
-        
-        for plugin in self.get_enabled_plugins():
-            try:
-                if plugin.can_handle(intent_data):
-                    suitable_plugins.append(plugin)
-                    logger.debug(f"技能模块 {plugin.name} 可以处理意图: {intent_data.get('intent_type')}")
-            except Exception as e:
-                logger.warning(f"技能模块 {plugin.name} 检查意图时出错: {e}")
-                continue
-        
-        # 按优先级排序（高优先级在前）
-        suitable_plugins.sort(key=lambda p: p.priority.value, reverse=True)
+        suitable_plugins = self._match_plugins(intent_data)
         
         if suitable_plugins:
             logger.info(f"找到 {len(suitable_plugins)} 个技能模块处理意图: {intent_data.get('intent_type')}")
@@ -159,6 +207,24 @@ class PluginRegistry:
         
         return suitable_plugins
     
+    def find_direct_answer_plugin(self, intent_data: Dict[str, Any]) -> Optional[BasePlugin]:
+        """
+        查找能在本地直接给出完整回答的技能模块
+        
+        Args:
+            intent_data: 意图数据（含 user_message）
+            
+        Returns:
+            Optional[BasePlugin]: 优先级最高的可直接回答的技能模块，没有时返回None
+        """
+        for plugin in self._match_plugins(intent_data):
+            try:
+                if plugin.can_answer_directly(intent_data):
+                    return plugin
+            except Exception as e:
+                logger.warning(f"技能模块 {plugin.name} 检查直接回答时出错: {e}")
+        return None
+    
     def execute_plugin(self, plugin: BasePlugin, intent_data: Dict[str, Any], 
                       context: Dict[str, Any] = None) -> Dict[str, Any]:
         """
@@ -172,6 +238,11 @@ class PluginRegistry:
         Returns:
             Dict: 执行结果
         """
+        # 本轮已被取消时不再执行技能模块
+        cancel_token = (context or {}).get("cancel_token")
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        
         start_time = time.time()
         self._execution_stats["total_executions"] += 1
         
@@ -254,6 +325,7 @@ class PluginRegistry:
         plugin = self.get_plugin(plugin_name)
         if plugin:
             plugin.enable()
+            self._rebuild_dispatch_table()
             logger.info(f"技能模块 {plugin_name} 已启用")
             return True
         else:
@@ -273,6 +345,7 @@ class PluginRegistry:
         plugin = self.get_plugin(plugin_name)
         if plugin:
             plugin.disable()
+            self._rebuild_dispatch_table()
             logger.info(f"技能模块 {plugin_name} 已禁用")
             return True
         else:
@@ -304,6 +377,14 @@ class PluginRegistry:
         stats["plugin_count"] = len(self._plugins)
         stats["enabled_plugin_count"] = len(self.get_enabled_plugins())
         
+        # 分派表
+        stats["dispatch"] = {
+            "intent_types": {intent_type: [p.name for p in plugins] for intent_type, plugins in self._dispatch_table.items()},
+            "trigger_plugins": [plugin.name for plugin, _ in self._trigger_plugins],
+            "dynamic_plugins": [plugin.name for plugin in self._dynamic_plugins],
+            "rebuilds": self._dispatch_rebuilds
+        }
+        
         # 最常用的技能模块
         if stats["plugin_usage"]:
             most_used = max(stats["plugin_usage"].items(), key=lambda x: x[1])
@@ -343,6 +424,7 @@ class PluginRegistry:
         """清空所有技能模块"""
         self._plugins.clear()
         self._execution_stats["plugin_usage"].clear()
+        self._rebuild_dispatch_table()
         logger.info("所有技能模块已清空")
     
     def reload_plugin(self, plugin_name: str) -> bool:
@@ -378,10 +460,14 @@ class PluginRegistry:
         Returns:
             BasePlugin: 技能模块实例，如果不存在返回None
         """
-        for plugin in self.get_enabled_plugins():
+        plugins = self._dispatch_table.get(intent_type)
+        if plugins:
+            return plugins[0]
+        
+        # 未声明分派元数据的技能仍用 can_handle 判断
+        test_intent = {"intent_type": intent_type}
+        for plugin in self._dynamic_plugins:
             try:
-                # 创建测试意图数据
-                test_intent = {"intent_type": intent_type}
                 if plugin.can_handle(test_intent):
                     return plugin
             except Exception:
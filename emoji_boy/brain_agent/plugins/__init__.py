@@ -6,7 +6,7 @@ Brain Agent Plugins - 插件系统
 """
 
 # 插件基类
-from .base_plugin import BasePlugin, PluginPriority
+from .base_plugin import BasePlugin, PluginPriority, ANSWER_FINAL, ANSWER_TEMPLATE, render_direct_answer
 
 # 内置插件
 from .search_plugin import SearchPlugin
@@ -21,6 +21,9 @@ __all__ = [
     # 基类
     "BasePlugin",
     "PluginPriority",
+    "ANSWER_FINAL",
+    "ANSWER_TEMPLATE",
+    "render_direct_answer",
     
     # 内置插件
     "SearchPlugin",
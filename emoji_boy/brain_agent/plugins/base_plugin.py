@@ -4,11 +4,48 @@ Base Plugin - 插件基类
 所有技能插件都应该继承这个基类，实现统一的接口。
 """
 
+import random
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Union
 from enum import Enum
 
 
+# 插件结果的回答方式（结果中的 answer_mode 字段）
+# final：message 已是完整回答，直接返回给用户，不再请求LLM润色
+# template：按 template 渲染 data 作为回答（可带人设语气），渲染失败时使用 message
+ANSWER_FINAL = "final"
+ANSWER_TEMPLATE = "template"
+
+
+def render_direct_answer(result: Dict[str, Any]) -> Optional[str]:
+    """
+    获取插件结果中可直接回复用户的文本
+
+    Args:
+        result: 插件处理结果
+
+    Returns:
+        回答文本；结果未标记为直接回答或执行失败时返回None
+    """
+    if not result.get("success"):
+        return None
+
+    mode = result.get("answer_mode")
+    if mode == ANSWER_TEMPLATE:
+        template = result.get("template")
+        if isinstance(template, (list, tuple)):
+            template = random.choice(template) if template else None
+        if template:
+            try:
+                return template.format(**result.get("data", {}))
+            except (KeyError, IndexError, ValueError):
+                pass
+        return result.get("message") or None
+    if mode == ANSWER_FINAL:
+        return result.get("message") or None
+    return None
+
+
 class PluginPriority(Enum):
     """插件优先级"""
     LOW = 1
@@ -40,7 +77,11 @@ class BasePlugin(ABC):
             "author": "Emoji Boy Team",
             "tags": [],
             "dependencies": [],
-            "config_schema": {}
+            "config_schema": {},
+            "intent_types": [],  # 插件处理的意图类型
+            "keywords": [],  # 触发插件的关键词，供本地意图分类器使用
+            "triggers": [],  # 用户消息包含这些关键词时，无论意图类型都由插件处理
+            "static_dispatch": False  # can_handle 完全等价于 intent_types + triggers 时设为 True，由技能网络按分派表查找
         }
     
     @abstractmethod
@@ -70,10 +111,65 @@ class BasePlugin(ABC):
         """
         pass
     
+    def can_answer_directly(self, intent_data: Dict[str, Any]) -> bool:
+        """
+        判断插件能否在本地直接给出完整回答（如时间、系统信息）
+
+        返回 True 时意图引擎会优先执行该插件，结果标记为 final/template 时跳过代码生成和最终的LLM调用。
+
+        Args:
+            intent_data: 意图识别结果（含 user_message）
+
+        Returns:
+            bool: 是否能直接回答
+        """
+        return False
+
+    @staticmethod
+    def direct_answer(message: str, data: Dict[str, Any] = None,
+                      template: Union[str, List[str]] = None) -> Dict[str, Any]:
+        """
+        构建可直接回复用户的成功结果
+
+        Args:
+            message: 完整回答（无模板或模板渲染失败时使用）
+            data: 结构化数据，供模板渲染
+            template: 人设语气的本地模板（多个时随机选择），占位符为 data 的键
+
+        Returns:
+            Dict: 处理结果
+        """
+        result = {
+            "success": True,
+            "message": message,
+            "data": data or {},
+            "answer_mode": ANSWER_FINAL
+        }
+        if template:
+            result["answer_mode"] = ANSWER_TEMPLATE
+            result["template"] = template
+        return result
+
     def get_help(self) -> str:
         """获取插件帮助信息"""
         return f"{self.name}: {self.description}"
     
+    def get_intent_types(self) -> List[str]:
+        """获取插件处理的意图类型"""
+        return list(self.metadata.get("intent_types", []))
+    
+    def get_keywords(self) -> List[str]:
+        """获取插件的触发关键词"""
+        return list(self.metadata.get("keywords", []))
+    
+    def get_triggers(self) -> List[str]:
+        """获取无论意图类型都会触发插件的消息关键词"""
+        return list(self.metadata.get("triggers", []))
+    
+    def uses_static_dispatch(self) -> bool:
+        """是否按元数据（intent_types + triggers）分派；否则每次调用 can_handle 判断"""
+        return bool(self.metadata.get("static_dispatch", False))
+    
     def get_config_schema(self) -> Dict[str, Any]:
         """获取配置模式"""
         return self.metadata.get("config_schema", {})
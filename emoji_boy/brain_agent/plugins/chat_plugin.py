@@ -32,6 +32,17 @@ class ChatPlugin(BasePlugin):
             }
         })
         
+        # 聊天关键词（问候、告别、感谢、情感表达）
+        self.chat_keywords = [
+            '你好', '嗨', 'hello', 'hi', '早上好', '下午好', '晚上好',
+            '再见', '拜拜', 'goodbye', 'bye', '晚安',
+            '谢谢', '感谢', 'thank', 'thanks',
+            '开心', '高兴', '快乐', '难过', '伤心', '悲伤', '生气', '愤怒'
+        ]
+        self.metadata["intent_types"] = ["chat"]
+        self.metadata["keywords"] = self.chat_keywords
+        self.metadata["static_dispatch"] = True
+        
         # 问候语模板
         self.greetings = {
             "hello": [
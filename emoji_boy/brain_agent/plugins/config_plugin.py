@@ -38,6 +38,9 @@ class ConfigPlugin(BasePlugin):
             '配置', '设置', 'API', 'base_url', 'api_key', '参数',
             'config', 'settings', 'parameter', 'setup'
         ]
+        self.metadata["intent_types"] = ["config"]
+        self.metadata["keywords"] = self.config_keywords
+        self.metadata["static_dispatch"] = True
         
         # 配置文件路径
         self.config_file = "config.json"
@@ -36,6 +36,9 @@ class HelpPlugin(BasePlugin):
             '帮助', '说明', '怎么用', '功能', 'help', 'support',
             '指南', '手册', '教程', 'guide', 'manual', 'tutorial'
         ]
+        self.metadata["intent_types"] = ["help"]
+        self.metadata["keywords"] = self.help_keywords
+        self.metadata["static_dispatch"] = True
         
         # 帮助内容
         self.help_content = self._init_help_content()
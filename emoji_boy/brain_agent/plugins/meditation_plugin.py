@@ -38,6 +38,9 @@ class MeditationPlugin(BasePlugin):
             '冥想', '编码', 'A2B', 'B2C', '记忆', 'meditation', 'encoding',
             '记忆编码', '自动编码', '手动编码'
         ]
+        self.metadata["intent_types"] = ["meditation"]
+        self.metadata["keywords"] = self.meditation_keywords
+        self.metadata["static_dispatch"] = True
         
         # 获取MemABC路径
         self.memabc_path = self._get_memabc_path()
@@ -37,6 +37,9 @@ class SearchPlugin(BasePlugin):
             '如何', '怎么', '什么是', '最新', '新闻', '信息',
             'search', 'find', 'look for', 'help me find'
         ]
+        self.metadata["intent_types"] = ["search"]
+        self.metadata["keywords"] = self.search_keywords
+        self.metadata["static_dispatch"] = True
     
     def can_handle(self, intent_data: Dict[str, Any]) -> bool:
         """判断是否能处理该意图"""
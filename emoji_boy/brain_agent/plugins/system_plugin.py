@@ -19,6 +19,22 @@ except (ImportError, SystemError):
     from brain_agent.plugins.base_plugin import BasePlugin, PluginPriority
 
 
+# 明确询问当前时间/日期的句式；只有这类问题才由本地直接回答。
+# 单独出现"时间""日期""周几"等词的闲聊（如"时间过得真快啊""周几去爬山比较好"）仍交给LLM
+TIME_QUESTION_PATTERNS = [
+    re.compile(r"(现在|当前|此刻|今天|今日)(是|的)?(几点|几号|几月几[号日]|星期几|周几|礼拜几)"),
+    re.compile(r"几点(了|钟|啦)"),
+    re.compile(r"(现在|当前|此刻|今天|今日)(是|的)?(什么|啥)?(时间|日期|时候)(是)?(多少|什么|啥)?[?？吗呢啊呀。.!！~]*$"),
+]
+
+# 明确请求查看本机系统信息的句式（整句只包含请求词和系统信息关键词）
+SYSTEM_INFO_QUESTION_PATTERN = re.compile(
+    r"^(请|帮我|麻烦)?(查看|查询|查|看看|看一下|显示|告诉我|获取)?(一下)?(我的|本机|这台电脑的|电脑的|当前)?"
+    r"(系统信息|系统版本|操作系统|平台信息|cpu信息|内存信息|磁盘信息|网络信息)"
+    r"(是什么|是多少|有哪些)?[?？吗呢啊呀。.!！~]*$"
+)
+
+
 class SystemPlugin(BasePlugin):
     """系统命令执行插件"""
     
@@ -42,6 +58,25 @@ class SystemPlugin(BasePlugin):
             "CPU信息", "内存信息", "磁盘信息", "网络信息"
         ]
         
+        # 命令执行关键词
+        self.command_keywords = ["执行", "运行", "命令", "cmd", "shell"]
+        
+        # 时间查询的人设语气回答模板（随机选用），占位符对应 _handle_time_query 返回的 data
+        self.time_answer_templates = [
+            "喵~ 今天是 {date} {weekday}，现在是 {time} 哦 🕐",
+            "小喵看了一眼钟：{date} {weekday}，{time} 😺",
+            "现在是 {date} {weekday} {time}，要好好安排时间呀 ⏰"
+        ]
+        
+        # 插件元数据
+        self.metadata.update({
+            "tags": ["system", "time", "command"],
+            "intent_types": ["system"],
+            "keywords": self.time_keywords + self.system_keywords + self.command_keywords,
+            "triggers": self.time_keywords + self.system_keywords,
+            "static_dispatch": True
+        })
+        
         # 安全命令白名单
         self.safe_commands = {
             "date": "获取系统时间",
@@ -73,6 +108,20 @@ class SystemPlugin(BasePlugin):
         
         return False
     
+    def can_answer_directly(self, intent_data: Dict[str, Any]) -> bool:
+        """
+        明确的时间和系统信息问题在本地即可得到完整答案
+
+        只包含关键词的闲聊和命令执行（输出需要LLM整理）仍交给LLM回复。
+        """
+        user_message = intent_data.get("user_message", "").strip()
+        if self._is_command_execution(user_message):
+            return False
+        if self._is_time_question(user_message):
+            return True
+        # handle 优先按时间查询处理，含时间关键词的系统信息问题不直接回答
+        return self._is_system_info_question(user_message) and not self._is_time_query(user_message)
+    
     def handle(self, intent_data: Dict[str, Any], context: Dict[str, Any] = None) -> Dict[str, Any]:
         """处理系统相关请求"""
         user_message = intent_data.get("user_message", "")
@@ -105,6 +154,14 @@ class SystemPlugin(BasePlugin):
         """判断是否是时间查询"""
         return any(keyword in message for keyword in self.time_keywords)
     
+    def _is_time_question(self, message: str) -> bool:
+        """判断是否是明确询问当前时间/日期的问题"""
+        return any(pattern.search(message) for pattern in TIME_QUESTION_PATTERNS)
+    
+    def _is_system_info_question(self, message: str) -> bool:
+        """判断是否是明确请求查看系统信息的问题"""
+        return bool(SYSTEM_INFO_QUESTION_PATTERN.match(message.replace(" ", "").lower()))
+    
     def _is_system_info_query(self, message: str) -> bool:
         """判断是否是系统信息查询"""
         return any(keyword in message for keyword in self.system_keywords)
@@ -112,8 +169,7 @@ class SystemPlugin(BasePlugin):
     def _is_command_execution(self, message: str) -> bool:
         """判断是否是命令执行请求"""
         # 检查是否包含命令执行关键词
-        command_keywords = ["执行", "运行", "命令", "cmd", "shell"]
-        return any(keyword in message for keyword in command_keywords)
+        return any(keyword in message for keyword in self.command_keywords)
     
     def _handle_time_query(self) -> Dict[str, Any]:
         """处理时间查询"""
@@ -140,17 +196,17 @@ class SystemPlugin(BasePlugin):
         # 尝试获取系统时间命令结果
         system_time = self._get_system_time()
         
-        return {
-            "success": True,
-            "message": f"📅 今天是 {date_str} {weekday_cn_str}\n🕐 现在时间是 {time_str}",
-            "data": {
+        return self.direct_answer(
+            f"📅 今天是 {date_str} {weekday_cn_str}\n🕐 现在时间是 {time_str}",
+            data={
                 "date": date_str,
                 "time": time_str,
                 "weekday": weekday_cn_str,
                 "system_time": system_time,
                 "timestamp": now.timestamp()
-            }
-        }
+            },
+            template=self.time_answer_templates
+        )
     
     def _handle_system_info_query(self) -> Dict[str, Any]:
         """处理系统信息查询"""
@@ -179,11 +235,7 @@ class SystemPlugin(BasePlugin):
             info_text += f"• Python版本: {system_info['python_version']}\n"
             info_text += f"• 主机名: {system_info['hostname']}"
             
-            return {
-                "success": True,
-                "message": info_text,
-                "data": system_info
-            }
+            return self.direct_answer(info_text, data=system_info)
             
         except Exception as e:
             return {
@@ -0,0 +1,334 @@
+"""
+Sandbox - 生成代码的隔离执行池
+
+模仿人脑的"想象演练"：在与现实隔离的地方先试一试，出了问题也不影响本体。
+1. 预热进程池：启动时预先创建若干工作进程，执行时无需每次启动解释器
+2. 资源限制：每次执行受 CPU 时间（RLIMIT_CPU）、内存（RLIMIT_AS）和墙钟超时限制，
+   死循环或超时的工作进程被直接终止并替换，不会卡住对话线程
+3. 受限环境：只暴露安全的内置函数，import 仅允许白名单中的标准库模块
+4. 回收：工作进程执行 max_runs 次或崩溃后替换为新进程
+
+输出通过管道返回。无法创建子进程的平台退化为在守护线程中执行，仍受墙钟超时保护（无法终止）。
+"""
+
+import atexit
+import builtins
+import io
+import logging
+import marshal
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+from multiprocessing.connection import Connection
+from types import CodeType
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+# 生成代码允许导入的标准库模块
+ALLOWED_MODULES = frozenset({
+    "math", "cmath", "random", "statistics", "decimal", "fractions",
+    "datetime", "time", "calendar", "zoneinfo",
+    "json", "re", "string", "textwrap", "unicodedata",
+    "itertools", "functools", "collections", "operator", "heapq", "bisect",
+    "platform"
+})
+
+# 生成代码可用的内置函数（不含 eval/exec/compile/open/getattr 等可绕过限制的函数）
+SAFE_BUILTIN_NAMES = (
+    "len", "str", "int", "float", "complex", "list", "dict", "tuple", "set", "frozenset", "bool",
+    "bytes", "type", "isinstance", "issubclass", "range", "enumerate", "zip", "map", "filter", "iter", "next",
+    "sum", "max", "min", "abs", "round", "sorted", "reversed", "any", "all", "chr", "ord", "hex", "oct",
+    "bin", "pow", "divmod", "hash", "repr", "ascii", "format", "callable", "slice",
+    "Exception", "ValueError", "TypeError", "KeyError", "IndexError", "ZeroDivisionError", "ArithmeticError",
+    "StopIteration"
+)
+
+# 单次执行返回的最大输出字符数
+MAX_OUTPUT_CHARS = 10000
+
+
+def _safe_import(name, globals=None, locals=None, fromlist=(), level=0):
+    """只允许导入白名单中的模块"""
+    if level != 0 or name.split(".")[0] not in ALLOWED_MODULES:
+        raise ImportError(f"不允许导入模块: {name}")
+    return builtins.__import__(name, globals, locals, fromlist, level)
+
+
+def build_safe_globals(output: io.StringIO) -> Dict[str, Any]:
+    """
+    构建执行生成代码的全局环境
+
+    Args:
+        output: print 的输出缓冲；不替换全局 sys.stdout，退化为线程执行时不影响主程序的输出
+    """
+    def _print(*args, **kwargs):
+        kwargs["file"] = output
+        builtins.print(*args, **kwargs)
+
+    safe_builtins = {name: getattr(builtins, name) for name in SAFE_BUILTIN_NAMES}
+    safe_builtins["print"] = _print
+    safe_builtins["__import__"] = _safe_import
+    return {"__builtins__": safe_builtins, "__name__": "__sandbox__"}
+
+
+def run_code(code: Any) -> Dict[str, Any]:
+    """
+    在受限环境中执行代码并捕获标准输出
+
+    Args:
+        code: 源码或已编译的代码对象
+
+    Returns:
+        Dict: success、output，失败时附带 error
+    """
+    output_buffer = io.StringIO()
+    try:
+        exec(code, build_safe_globals(output_buffer), {})
+    except MemoryError:
+        return {"success": False, "error": "代码执行超出内存限制", "output": ""}
+    except Exception as e:
+        return {"success": False, "error": str(e), "output": output_buffer.getvalue()[:MAX_OUTPUT_CHARS].strip()}
+    return {"success": True, "output": output_buffer.getvalue()[:MAX_OUTPUT_CHARS].strip()}
+
+
+def _worker_main(reader: Connection, writer: Connection, cpu_seconds: int, memory_bytes: int):
+    """工作进程主循环：从管道接收代码，在资源限制下执行并返回结果"""
+    # Ctrl+C 由主进程处理，工作进程随主进程退出
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if resource is not None and memory_bytes:
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+        except (ValueError, OSError):
+            pass
+
+    while True:
+        try:
+            kind, payload = reader.recv()
+        except (EOFError, OSError):
+            return
+
+        if resource is not None and cpu_seconds:
+            # CPU 时间是累计值：每次执行前把软限制设为已用时间 + 本次额度，超出时进程收到 SIGXCPU 退出
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            used = int(usage.ru_utime + usage.ru_stime) + 1
+            try:
+                resource.setrlimit(resource.RLIMIT_CPU, (used + cpu_seconds, resource.RLIM_INFINITY))
+            except (ValueError, OSError):
+                pass
+
+        try:
+            code = marshal.loads(payload) if kind == "marshal" else compile(payload, "<generated>", "exec")
+        except Exception as e:
+            result = {"success": False, "error": f"代码无法编译: {e}", "output": ""}
+        else:
+            result = run_code(code)
+
+        try:
+            writer.send(result)
+        except (EOFError, OSError):
+            return
+
+
+class _Worker:
+    """
+    一个工作进程及其管道
+
+    工作进程直接以脚本方式运行本文件（只依赖标准库），不导入 brain_agent 包，
+    也不像 multiprocessing 的 spawn/forkserver 那样在子进程中重新执行主程序模块。
+    """
+
+    def __init__(self, cpu_seconds: int, memory_bytes: int):
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), str(cpu_seconds), str(memory_bytes)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, close_fds=True
+        )
+        self.writer = Connection(os.dup(self.process.stdin.fileno()), readable=False)
+        self.reader = Connection(os.dup(self.process.stdout.fileno()), writable=False)
+        self.process.stdin.close()
+        self.process.stdout.close()
+        self.runs = 0
+
+    def kill(self):
+        for conn in (self.writer, self.reader):
+            try:
+                conn.close()
+            except OSError:
+                pass
+        if self.process.poll() is None:
+            self.process.kill()
+        try:
+            self.process.wait(1)
+        except subprocess.TimeoutExpired:
+            pass
+
+
+class SandboxPool:
+    """预热的沙箱工作进程池"""
+
+    def __init__(self, size: int = 2, max_runs: int = 50, timeout: float = 5.0,
+                 cpu_seconds: int = 2, memory_mb: int = 512):
+        """
+        初始化沙箱池（首次执行或 warm_up 时才创建进程）
+
+        Args:
+            size: 工作进程数
+            max_runs: 工作进程执行多少次后替换
+            timeout: 单次执行的墙钟超时（秒）
+            cpu_seconds: 单次执行的 CPU 时间上限（秒）
+            memory_mb: 工作进程的地址空间上限（MB）
+        """
+        self.size = size
+        self.max_runs = max_runs
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_mb * 1024 * 1024
+
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        # 进程间管道依赖 POSIX 文件描述符，其他平台退化为线程执行
+        self._available = os.name == "posix"
+        self._closed = False
+
+        self._stats = {
+            "executions": 0,
+            "failures": 0,
+            "timeouts": 0,
+            "crashes": 0,
+            "recycled": 0,
+            "fallback_executions": 0
+        }
+
+    def _spawn(self) -> _Worker:
+        return _Worker(self.cpu_seconds, self.memory_bytes)
+
+    def _ensure_started(self) -> bool:
+        """创建工作进程；无法创建时标记为不可用并退化为线程执行"""
+        with self._lock:
+            if self._started or not self._available or self._closed:
+                return self._available and not self._closed
+            try:
+                for _ in range(self.size):
+                    self._idle.put(self._spawn())
+            except Exception as e:
+                logger.warning(f"沙箱进程池创建失败，退化为线程执行: {e}")
+                self._available = False
+                return False
+            self._started = True
+            atexit.register(self.shutdown)
+            logger.info(f"沙箱进程池已就绪: {self.size} 个工作进程")
+            return True
+
+    def warm_up(self):
+        """在后台预先创建工作进程"""
+        threading.Thread(target=self._ensure_started, name="sandbox-warmup", daemon=True).start()
+
+    def _replace(self, worker: _Worker, reason: str):
+        """终止工作进程并补充一个新进程"""
+        worker.kill()
+        with self._lock:
+            self._stats[reason] += 1
+            if self._closed:
+                return
+        try:
+            self._idle.put(self._spawn())
+        except Exception as e:
+            logger.warning(f"沙箱工作进程补充失败: {e}")
+
+    def run(self, code: str, compiled: Optional[CodeType] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        在沙箱中执行代码
+
+        Args:
+            code: 源码
+            compiled: 已编译的代码对象（如技能结晶），提供时工作进程跳过编译
+            timeout: 墙钟超时（秒），默认为 self.timeout
+
+        Returns:
+            Dict: success、output，失败时附带 error
+        """
+        timeout = timeout or self.timeout
+        if not self._ensure_started():
+            return self._run_in_thread(compiled if compiled is not None else code, timeout)
+
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                self._stats["timeouts"] += 1
+            return {"success": False, "error": "沙箱繁忙，代码未执行", "output": ""}
+
+        payload: Tuple[str, Any] = ("marshal", marshal.dumps(compiled)) if compiled is not None else ("source", code)
+        try:
+            worker.writer.send(payload)
+            if not worker.reader.poll(timeout):
+                self._replace(worker, "timeouts")
+                return {"success": False, "error": f"代码执行超时（{timeout:.0f}s）", "output": ""}
+            result = worker.reader.recv()
+        except (EOFError, OSError):
+            # 超出 CPU/内存限制的进程被系统终止
+            self._replace(worker, "crashes")
+            return {"success": False, "error": "代码执行超出资源限制，已终止", "output": ""}
+
+        worker.runs += 1
+        with self._lock:
+            self._stats["executions"] += 1
+            if not result.get("success"):
+                self._stats["failures"] += 1
+        if worker.runs >= self.max_runs:
+            self._replace(worker, "recycled")
+        else:
+            self._idle.put(worker)
+        return result
+
+    def _run_in_thread(self, code: Any, timeout: float) -> Dict[str, Any]:
+        """退化模式：在守护线程中执行，超时后放弃等待（线程无法终止）"""
+        with self._lock:
+            self._stats["fallback_executions"] += 1
+        holder: Dict[str, Any] = {}
+        thread = threading.Thread(target=lambda: holder.update(run_code(code)), name="sandbox-fallback", daemon=True)
+        thread.start()
+        thread.join(timeout)
+        if thread.is_alive():
+            with self._lock:
+                self._stats["timeouts"] += 1
+            return {"success": False, "error": f"代码执行超时（{timeout:.0f}s）", "output": ""}
+        return holder
+
+    def shutdown(self):
+        """终止所有工作进程"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                break
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取沙箱统计信息"""
+        with self._lock:
+            stats = self._stats.copy()
+        stats["size"] = self.size
+        stats["idle_workers"] = self._idle.qsize()
+        stats["mode"] = "process" if self._available else "thread"
+        return stats
+
+
+# 全局沙箱池
+sandbox_pool = SandboxPool()
+
+
+if __name__ == "__main__":
+    # 工作进程入口：python sandbox.py <cpu_seconds> <memory_bytes>，标准输入/输出作为管道
+    _worker_main(Connection(0, writable=False), Connection(1, readable=False), int(sys.argv[1]), int(sys.argv[2]))
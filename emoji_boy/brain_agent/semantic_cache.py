@@ -0,0 +1,227 @@
+"""
+Semantic Cache - 近似语义记忆
+
+模仿人脑的"联想回忆"：没见过完全相同的话，但听过意思相近的说法时直接联想出意图。
+1. 向量化：字符 n-gram 哈希特征（与本地分类器相同的归一化），L2 归一化后余弦相似度即点积
+2. 检索：所有记忆向量存放在一个矩阵中，一次矩阵-向量乘法找出最相近的记忆
+3. 标签：记忆可附带标签（本地分类器的判定），检索时只在标签相同的记忆中联想，
+   字面相近但意思不同的说法（"现在几点了" / "现在几度了"）不会互相命中
+4. 容量：固定容量的 LRU 淘汰，过期的记忆视为不存在
+
+NumPy 可用时使用稠密矩阵做向量化检索；未安装时退回纯 Python 稀疏点积，行为一致。
+"""
+
+import math
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from .local_classifier import normalize_text
+except (ImportError, SystemError):
+    from brain_agent.local_classifier import normalize_text
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def embed_text(text: str, feature_dim: int, ngram_range: Tuple[int, int] = (1, 2)) -> Dict[int, float]:
+    """
+    把文本编码为 L2 归一化的稀疏哈希 n-gram 向量
+
+    Args:
+        text: 文本
+        feature_dim: 哈希特征维度
+        ngram_range: 字符 n-gram 范围
+
+    Returns:
+        Dict: 特征下标 -> 权重；归一化后为空文本时返回空字典
+    """
+    text = normalize_text(text)
+    features: Dict[int, float] = {}
+
+    low, high = ngram_range
+    for n in range(low, high + 1):
+        for i in range(len(text) - n + 1):
+            index = zlib.crc32(text[i:i + n].encode("utf-8")) % feature_dim
+            features[index] = features.get(index, 0.0) + 1.0
+
+    norm = math.sqrt(sum(value * value for value in features.values())) or 1.0
+    return {index: value / norm for index, value in features.items()}
+
+
+class SemanticCache:
+    """按字符 n-gram 余弦相似度检索的 LRU 记忆"""
+
+    def __init__(self, capacity: int = 256, threshold: float = 0.85, ttl: Optional[float] = None,
+                 feature_dim: int = 2048, ngram_range: Tuple[int, int] = (1, 2)):
+        """
+        初始化语义记忆
+
+        Args:
+            capacity: 记忆容量
+            threshold: 采用最相近记忆所需的最低余弦相似度；只差语气词、标点的说法在 0.85 以上，
+                只改动一两个关键字的说法（换地点、换对象）通常低于 0.8
+            ttl: 记忆有效期（秒），为None时不过期
+            feature_dim: 哈希特征维度
+            ngram_range: 字符 n-gram 范围；单字 + 双字在短中文句子上区分度最好
+        """
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl = ttl
+        self.feature_dim = feature_dim
+        self.ngram_range = ngram_range
+
+        self._lock = threading.Lock()
+        # 归一化文本 -> 记忆所在的行（按最近使用排序）
+        self._rows: "OrderedDict[str, int]" = OrderedDict()
+        self._free: List[int] = list(range(capacity - 1, -1, -1))
+        self._keys: List[Optional[str]] = [None] * capacity
+        self._values: List[Any] = [None] * capacity
+        self._labels: List[Optional[str]] = [None] * capacity
+        self._timestamps: List[float] = [0.0] * capacity
+
+        if np is not None:
+            self._matrix = np.zeros((capacity, feature_dim), dtype=np.float32)
+            self._valid = np.zeros(capacity, dtype=bool)
+        else:
+            self._vectors: List[Dict[int, float]] = [{} for _ in range(capacity)]
+
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def _write_row(self, row: int, vector: Dict[int, float]):
+        if np is not None:
+            self._matrix[row] = 0.0
+            if vector:
+                self._matrix[row, list(vector)] = list(vector.values())
+            self._valid[row] = True
+        else:
+            self._vectors[row] = vector
+
+    def _release_row(self, key: str):
+        """释放一条记忆所在的行"""
+        row = self._rows.pop(key)
+        self._keys[row] = None
+        self._values[row] = None
+        self._labels[row] = None
+        if np is not None:
+            self._valid[row] = False
+        else:
+            self._vectors[row] = {}
+        self._free.append(row)
+
+    def _nearest(self, vector: Dict[int, float], label: Optional[str] = None) -> Tuple[int, float]:
+        """返回最相近的有效行及其相似度（指定标签时只比较标签相同的行）；没有记忆时行号为 -1"""
+        if not self._rows:
+            return -1, 0.0
+
+        if np is not None:
+            query = np.zeros(self.feature_dim, dtype=np.float32)
+            query[list(vector)] = list(vector.values())
+            scores = self._matrix @ query
+            scores[~self._valid] = -1.0
+            if label is not None:
+                scores[[row for row in self._rows.values() if self._labels[row] != label]] = -1.0
+            row = int(np.argmax(scores))
+            if scores[row] < 0:
+                return -1, 0.0
+            return row, float(scores[row])
+
+        best_row, best_score = -1, -1.0
+        for row in self._rows.values():
+            if label is not None and self._labels[row] != label:
+                continue
+            stored = self._vectors[row]
+            if len(stored) < len(vector):
+                score = sum(value * vector.get(index, 0.0) for index, value in stored.items())
+            else:
+                score = sum(value * stored.get(index, 0.0) for index, value in vector.items())
+            if score > best_score:
+                best_row, best_score = row, score
+        return best_row, best_score
+
+    def _purge_expired(self, now: float):
+        """移除过期的记忆"""
+        if self.ttl is None:
+            return
+        expired = [key for key, row in self._rows.items() if now - self._timestamps[row] >= self.ttl]
+        for key in expired:
+            self._release_row(key)
+
+    def lookup(self, message: str, label: Optional[str] = None) -> Optional[Tuple[Any, float]]:
+        """
+        联想最相近的记忆
+
+        Args:
+            message: 用户消息
+            label: 本次消息的标签；指定时只在标签相同的记忆中联想
+
+        Returns:
+            (记忆的值, 相似度)；没有足够相近的记忆时返回None
+        """
+        vector = embed_text(message, self.feature_dim, self.ngram_range)
+        with self._lock:
+            self._purge_expired(time.time())
+            row, score = self._nearest(vector, label) if vector else (-1, 0.0)
+            if row < 0 or score < self.threshold:
+                self._stats["misses"] += 1
+                return None
+
+            self._rows.move_to_end(self._keys[row])
+            self._stats["hits"] += 1
+            return self._values[row], score
+
+    def put(self, message: str, value: Any, timestamp: Optional[float] = None, label: Optional[str] = None):
+        """
+        存入记忆；相同（归一化后）的消息覆盖原记忆，容量已满时淘汰最久未使用的记忆
+
+        Args:
+            message: 用户消息
+            value: 记忆的值
+            timestamp: 记忆形成的时间（如从快照恢复时），默认为现在
+            label: 消息的标签（见 lookup）
+        """
+        key = normalize_text(message)
+        vector = embed_text(message, self.feature_dim, self.ngram_range)
+        if not key or not vector or self.capacity <= 0:
+            return
+
+        with self._lock:
+            if key in self._rows:
+                row = self._rows[key]
+                self._rows.move_to_end(key)
+            else:
+                if not self._free:
+                    self._purge_expired(time.time())
+                if not self._free:
+                    self._release_row(next(iter(self._rows)))
+                    self._stats["evictions"] += 1
+                row = self._free.pop()
+                self._rows[key] = row
+                self._keys[row] = key
+                self._write_row(row, vector)
+            self._values[row] = value
+            self._labels[row] = label
+            self._timestamps[row] = timestamp if timestamp is not None else time.time()
+
+    def clear(self):
+        """清空记忆"""
+        with self._lock:
+            for key in list(self._rows):
+                self._release_row(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取联想统计信息"""
+        with self._lock:
+            stats = self._stats.copy()
+            stats["size"] = len(self._rows)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["capacity"] = self.capacity
+        stats["threshold"] = self.threshold
+        stats["backend"] = "numpy" if np is not None else "python"
+        return stats
@@ -0,0 +1,250 @@
+"""
+Skill Store - 技能结晶
+
+模仿人脑的"程序性记忆"：第一次做一件事需要思考（代码生成），做过并成功后形成固定程序，
+下次遇到同样的请求直接执行，不再思考。
+1. 键：(技能名称, 归一化的消息模板)；生成的代码常内嵌消息中的数字等字面量，模板不抽象数字
+2. 值：通过安全检查并执行成功的代码及其编译后的代码对象，执行时跳过编译
+3. 失效：执行失败时立即遗忘，下次重新生成
+4. 持久化：源码保存在 ~/.emoji_assistant/skill_store.json，启动时重新编译；
+   变更后延迟合并写入（save_delay 秒内的多次变更只写一次），进程退出时写入未保存的变更
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from types import CodeType
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from .local_classifier import normalize_text
+except (ImportError, SystemError):
+    from brain_agent.local_classifier import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+class SkillStore:
+    """已验证的生成程序库"""
+
+    def __init__(self, capacity: int = 200, store_path: Optional[str] = None, save_delay: float = 5.0):
+        """
+        初始化技能结晶库
+
+        Args:
+            capacity: 最多保存的程序数，超出时淘汰最久未使用的程序
+            store_path: 持久化文件路径；为空字符串时不持久化
+            save_delay: 变更后延迟写入的秒数，期间的多次变更合并为一次写入
+        """
+        self.capacity = capacity
+        self.save_delay = save_delay
+        self.store_path = (store_path if store_path is not None
+                           else os.path.join(os.path.expanduser("~/.emoji_assistant"), "skill_store.json"))
+
+        self._lock = threading.RLock()
+        # (技能名称, 模板) -> 程序（按最近使用排序）
+        self._programs: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "stored": 0, "invalidated": 0}
+        # 延迟写入：有未保存的变更时安排一次写入
+        self._dirty = False
+        self._save_timer: Optional[threading.Timer] = None
+        self._save_lock = threading.Lock()
+
+        self._load()
+        if self.store_path:
+            atexit.register(self.flush)
+
+    @staticmethod
+    def make_template(message: str) -> str:
+        """消息模板：全角/半角统一、大小写折叠、去除空白和标点"""
+        return normalize_text(message)
+
+    @staticmethod
+    def _compile(code: str, skill_name: str) -> CodeType:
+        return compile(code, f"<skill:{skill_name}>", "exec")
+
+    def find(self, message: str, skill_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        查找可复用的程序
+
+        Args:
+            message: 用户消息
+            skill_name: 技能名称；为None时返回该模板最近使用的程序（技能尚未匹配时）
+
+        Returns:
+            程序（skill_name、template、code、compiled、intent_type 等）；没有时返回None
+        """
+        template = self.make_template(message)
+        with self._lock:
+            if skill_name is not None:
+                key = (skill_name, template)
+                program = self._programs.get(key)
+            else:
+                key, program = next(
+                    ((k, p) for k, p in reversed(self._programs.items()) if k[1] == template), (None, None)
+                )
+
+            if program is None:
+                self._stats["misses"] += 1
+                return None
+
+            self._programs.move_to_end(key)
+            program["hits"] += 1
+            program["last_used"] = time.time()
+            self._stats["hits"] += 1
+            return program
+
+    def put(self, skill_name: str, message: str, code: str, intent_type: str = "unknown") -> bool:
+        """
+        保存执行成功的程序
+
+        Args:
+            skill_name: 技能名称
+            message: 用户消息
+            code: 已通过安全检查并执行成功的代码
+            intent_type: 意图类型，复用时无需重新识别
+
+        Returns:
+            是否保存成功
+        """
+        template = self.make_template(message)
+        if not template or not code:
+            return False
+
+        key = (skill_name, template)
+        with self._lock:
+            existing = self._programs.get(key)
+            if existing is not None and existing["code"] == code:
+                # 同样的程序已经结晶：保留命中计数，不重复编译和写入
+                self._programs.move_to_end(key)
+                existing["last_used"] = time.time()
+                return True
+
+        try:
+            compiled = self._compile(code, skill_name)
+        except SyntaxError:
+            return False
+
+        now = time.time()
+        with self._lock:
+            self._programs[key] = {
+                "skill_name": skill_name,
+                "template": template,
+                "code": code,
+                "compiled": compiled,
+                "intent_type": intent_type,
+                "hits": 0,
+                "created_at": now,
+                "last_used": now
+            }
+            self._programs.move_to_end(key)
+            while len(self._programs) > self.capacity:
+                self._programs.popitem(last=False)
+            self._stats["stored"] += 1
+            self._schedule_save()
+
+        logger.info(f"技能结晶: {skill_name} ← {template[:20]}")
+        return True
+
+    def invalidate(self, skill_name: str, message: str) -> bool:
+        """
+        遗忘执行失败的程序
+
+        Returns:
+            是否存在并已删除
+        """
+        with self._lock:
+            program = self._programs.pop((skill_name, self.make_template(message)), None)
+            if program is None:
+                return False
+            self._stats["invalidated"] += 1
+            self._schedule_save()
+
+        logger.info(f"技能结晶失效: {skill_name} ← {program['template'][:20]}")
+        return True
+
+    def clear(self):
+        """清空所有程序"""
+        with self._lock:
+            self._programs.clear()
+            self._schedule_save()
+
+    def list_programs(self) -> List[Dict[str, Any]]:
+        """列出已保存的程序（不含代码对象），最近使用的在前"""
+        with self._lock:
+            return [
+                {key: value for key, value in program.items() if key != "compiled"}
+                for program in reversed(self._programs.values())
+            ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取技能结晶统计信息"""
+        with self._lock:
+            stats = self._stats.copy()
+            stats["size"] = len(self._programs)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["capacity"] = self.capacity
+        return stats
+
+    def flush(self):
+        """立即写入未保存的变更（退出时调用）"""
+        # 写入串行进行，较早的快照不会覆盖较新的
+        with self._save_lock:
+            with self._lock:
+                if self._save_timer is not None:
+                    self._save_timer.cancel()
+                    self._save_timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                programs = self.list_programs()[::-1]
+            self._save(programs)
+
+    def _schedule_save(self):
+        """标记有未保存的变更，save_delay 秒后合并写入（调用方持有锁）"""
+        if not self.store_path:
+            return
+        self._dirty = True
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(self.save_delay, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _save(self, programs: List[Dict[str, Any]]):
+        """持久化程序源码（先写临时文件再替换，避免写到一半损坏）"""
+        try:
+            os.makedirs(os.path.dirname(self.store_path), exist_ok=True)
+            tmp_path = f"{self.store_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"programs": programs}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.store_path)
+        except OSError as e:
+            logger.warning(f"保存技能结晶失败: {e}")
+
+    def _load(self):
+        """加载持久化的程序并重新编译，无法编译的程序丢弃"""
+        if not self.store_path:
+            return
+        try:
+            with open(self.store_path, "r", encoding="utf-8") as f:
+                programs = json.load(f).get("programs", [])
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"加载技能结晶失败: {e}")
+            return
+
+        for program in programs[-self.capacity:]:
+            try:
+                key = (program["skill_name"], program["template"])
+                program["compiled"] = self._compile(program["code"], program["skill_name"])
+            except (KeyError, TypeError, SyntaxError, ValueError):
+                continue
+            program.setdefault("intent_type", "unknown")
+            program.setdefault("hits", 0)
+            self._programs[key] = program
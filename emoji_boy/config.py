@@ -27,6 +27,60 @@ WINDOW_POSITION = "bottom_right"  # 窗口位置
 
 
 
+# 网络配置
+HTTP_POOL_CONNECTIONS = 4  # 每个端点缓存的连接池数量
+HTTP_POOL_MAXSIZE = 10  # 每个连接池保持的最大keep-alive连接数
+LLM_RETRY_BASE_DELAY = 0.5  # 指数退避基数（秒），实际等待在 [0, 基数*2^n] 内随机
+LLM_RETRY_MAX_DELAY = 8.0  # 单次退避上限（秒）
+LLM_MIN_TIMEOUT = 5.0  # 自适应超时下限（秒）
+LLM_MAX_TIMEOUT = 60.0  # 自适应超时上限（秒）
+CIRCUIT_FAILURE_THRESHOLD = 5  # 端点连续失败多少次后熔断
+CIRCUIT_RECOVERY_TIMEOUT = 30.0  # 熔断冷却时间（秒），之后放行一个探测请求
+LLM_SPECULATIVE_RESPONSE = True  # 意图处理期间并行生成普通聊天回复
+TURN_DEADLINE = 8.0  # 单轮对话的时间预算（秒），0 表示不限时；意图各阶段超出预算时跳过，降级为普通聊天
+TURN_REPLY_RESERVE = 3.0  # 为最终回复保留的预算（秒），意图处理最多使用 TURN_DEADLINE - TURN_REPLY_RESERVE
+TURN_MIN_STAGE_TIME = 0.5  # 意图处理单个阶段至少需要的剩余预算（秒），不足时跳过该阶段
+
+# 多端点负载均衡：当前配置的 api_base/api_key 之外的其他端点或密钥（与当前API类型相同）
+# 每项形如 {"api_base": "...", "api_key": "...", "model_name": "可选", "weight": 1.0, "rpm": 60}
+LLM_ENDPOINTS: list = []
+LLM_HEDGE_REQUESTS = True  # 请求超过该端点p95延迟仍未返回时，向另一端点发送对冲请求，先返回者胜出
+LLM_HEDGE_MIN_DELAY = 0.5  # 发送对冲请求前的最短等待（秒）
+
+# 模型路由：按意图类型、消息长度、所需上下文和近期延迟为每次请求选择档位
+# standard 为客户端配置的模型；其他档位的 model 为空或 api_base 与请求地址不符时不启用
+# 默认不配置其他档位，所有请求都使用客户端配置的模型。需要时填入账号下已开通的模型，例如：
+#   "fast": {"model": "doubao-1-5-lite-32k-250115", ...}、"long": {"model": "doubao-1-5-pro-256k-250115", ...}
+# context_tokens 为该档位组装上下文的预算，cost 为相对 standard 的单价（用于统计节省）
+LLM_ROUTER_ENABLED = True
+LLM_MODEL_TIERS = {
+    "fast": {"model": "", "context_tokens": 4096, "cost": 0.4,
+             "api_base": "https://ark.cn-beijing.volces.com"},
+    "standard": {"cost": 1.0},
+    "long": {"model": "", "context_tokens": 128000, "cost": 6.0,
+             "api_base": "https://ark.cn-beijing.volces.com"},
+}
+LLM_ROUTER_SHORT_MESSAGE_TOKENS = 64  # 不超过该token数的闲聊消息使用快速档位
+LLM_ROUTER_SLOW_LATENCY = 6.0  # 模型近期延迟超过该值（秒）时改用其他可用档位
+
+# 客户端限流：按端点的令牌桶，桌面程序与记忆编码子进程共享
+LLM_RATE_LIMIT_ENABLED = True
+LLM_RATE_LIMIT_RATE = 2.0  # 每秒补充的请求令牌数
+LLM_RATE_LIMIT_BURST = 10  # 令牌桶容量（允许的突发请求数）
+LLM_RATE_LIMIT_RESERVE = 3  # 为交互请求保留的令牌数，后台请求不能动用
+LLM_BACKGROUND_LATENCY_THRESHOLD = 8.0  # 近期对话延迟超过该值（秒）时后台请求退避
+LLM_BACKGROUND_BACKOFF = 5.0  # 后台请求为对话让路时的退避时长（秒）
+
+# 响应缓存配置（仅用于 temperature=0 或显式声明可缓存的调用）
+RESPONSE_CACHE_MEMORY_SIZE = 128  # 内存LRU条目数
+RESPONSE_CACHE_MAX_ENTRIES = 2000  # 磁盘缓存最大条目数
+RESPONSE_CACHE_TTL = 7 * 24 * 3600  # 缓存有效期（秒）
+
+# 上下文预算配置
+LLM_CONTEXT_TOKENS = 4096  # 单次请求的上下文token预算（提示词 + 回复）
+LLM_CONTEXT_PRIORITIES = {"system": 0, "message": 1, "memory": 2, "summary": 3, "history": 4}  # 数字越小越优先装入预算
+CONVERSATION_SUMMARY_MAX_CHARS = 800  # 滚动对话摘要的最大字数
+
 # 日志配置
 LOG_LEVEL = "INFO"  # DEBUG, INFO, WARNING, ERROR
 LOG_FILE = "emoji_assistant.log"
@@ -0,0 +1,195 @@
+"""
+异步HTTP传输模块 - 供 asyncio 事件循环使用的LLM请求传输层
+
+安装了 aiohttp 时，每个事件循环共享一个带连接池的 ClientSession，一个循环即可
+驱动大量并发请求；未安装时回退到 asyncio.to_thread + 同步共享连接池，接口保持一致。
+"""
+
+import asyncio
+from typing import Dict, Any, AsyncIterator, Optional
+
+import requests
+
+import config
+from .cancellation import CancellationToken
+from .http_transport import http_transport
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+# 可重试的传输层异常
+if aiohttp is not None:
+    TRANSPORT_ERRORS = (requests.exceptions.RequestException, asyncio.TimeoutError, aiohttp.ClientError)
+else:
+    TRANSPORT_ERRORS = (requests.exceptions.RequestException, asyncio.TimeoutError)
+
+_END = object()
+
+
+class AsyncHTTPTransport:
+    """异步HTTP传输层"""
+
+    def __init__(self, limit: int = None, limit_per_host: int = None):
+        """
+        初始化传输层
+
+        Args:
+            limit: 每个事件循环的最大并发连接数
+            limit_per_host: 每个端点的最大并发连接数
+        """
+        self.limit = limit or getattr(config, "HTTP_ASYNC_LIMIT", 100)
+        self.limit_per_host = limit_per_host or getattr(config, "HTTP_POOL_MAXSIZE", 10)
+
+        # 事件循环 -> ClientSession（aiohttp 会话不能跨事件循环使用）
+        self._sessions: Dict[asyncio.AbstractEventLoop, Any] = {}
+
+        self._stats = {
+            "total_requests": 0,
+            "failed_requests": 0,
+            "stream_requests": 0
+        }
+
+    @property
+    def backend(self) -> str:
+        """当前使用的传输后端"""
+        return "aiohttp" if aiohttp is not None else "thread"
+
+    def _get_session(self):
+        """获取当前事件循环共享的会话（不存在则创建）"""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            # 清理已关闭事件循环遗留的会话
+            for stale_loop in [item for item in self._sessions if item.is_closed()]:
+                del self._sessions[stale_loop]
+
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+            session = aiohttp.ClientSession(connector=connector)
+            self._sessions[loop] = session
+        return session
+
+    async def post_json(self, url: str, headers: Dict[str, str], json: Dict[str, Any],
+                        timeout: float) -> Any:
+        """
+        发送POST请求并解析JSON响应
+
+        Args:
+            url: 请求地址
+            headers: 请求头
+            json: 请求体
+            timeout: 超时时间（秒）
+
+        Returns:
+            解析后的JSON对象
+        """
+        self._stats["total_requests"] += 1
+        try:
+            if aiohttp is None:
+                response = await self._post_in_thread(url, headers=headers, json=json, timeout=timeout)
+                response.raise_for_status()
+                return response.json()
+
+            async with self._get_session().post(
+                url, headers=headers, json=json, timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                response.raise_for_status()
+                return await response.json(content_type=None)
+
+        except TRANSPORT_ERRORS:
+            self._stats["failed_requests"] += 1
+            raise
+
+    async def stream_lines(self, url: str, headers: Dict[str, str], json: Dict[str, Any],
+                           timeout: float) -> AsyncIterator[str]:
+        """
+        发送POST请求并逐行读取流式响应
+
+        timeout 限制建立连接和相邻两次读取之间的间隔，不限制整个流的时长。
+
+        Args:
+            url: 请求地址
+            headers: 请求头
+            json: 请求体
+            timeout: 超时时间（秒）
+
+        Yields:
+            去除换行符的响应行
+        """
+        self._stats["total_requests"] += 1
+        self._stats["stream_requests"] += 1
+
+        if aiohttp is None:
+            async for line in self._stream_lines_in_thread(url, headers, json, timeout):
+                yield line
+            return
+
+        client_timeout = aiohttp.ClientTimeout(total=None, connect=timeout, sock_read=timeout)
+        try:
+            async with self._get_session().post(
+                url, headers=headers, json=json, timeout=client_timeout
+            ) as response:
+                response.raise_for_status()
+                async for raw_line in response.content:
+                    yield raw_line.decode("utf-8", errors="replace").rstrip("\r\n")
+        except TRANSPORT_ERRORS:
+            self._stats["failed_requests"] += 1
+            raise
+
+    async def _stream_lines_in_thread(self, url: str, headers: Dict[str, str], json: Dict[str, Any],
+                                      timeout: float) -> AsyncIterator[str]:
+        """未安装 aiohttp 时，在线程中通过同步连接池读取流式响应"""
+        try:
+            response = await self._post_in_thread(url, headers=headers, json=json, timeout=timeout, stream=True)
+            response.raise_for_status()
+        except TRANSPORT_ERRORS:
+            self._stats["failed_requests"] += 1
+            raise
+
+        try:
+            lines = response.iter_lines(decode_unicode=True)
+            while True:
+                line = await asyncio.to_thread(next, lines, _END)
+                if line is _END:
+                    break
+                yield line
+        except asyncio.CancelledError:
+            # 读取线程阻塞在套接字上，关闭套接字使其立即退出
+            http_transport.abort(response)
+            raise
+        finally:
+            response.close()
+
+    @staticmethod
+    async def _post_in_thread(url: str, **kwargs) -> requests.Response:
+        """
+        在线程中通过同步连接池发送请求
+
+        任务被取消（如对冲失败方、被丢弃的推测回复）时取消请求令牌，
+        关闭请求使用的连接，而不是让线程继续等待响应。
+        """
+        token = CancellationToken()
+        try:
+            return await asyncio.to_thread(http_transport.post, url, cancel_token=token, **kwargs)
+        except asyncio.CancelledError:
+            token.cancel("请求任务已取消")
+            raise
+
+    async def close(self):
+        """关闭当前事件循环的会话"""
+        session: Optional[Any] = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取传输统计"""
+        stats = self._stats.copy()
+        stats["backend"] = self.backend
+        stats["active_sessions"] = sum(1 for session in self._sessions.values() if not session.closed)
+        return stats
+
+
+# 全局异步HTTP传输实例
+async_transport = AsyncHTTPTransport()
@@ -0,0 +1,161 @@
+"""
+取消模块 - 协作式取消正在进行的对话轮次
+
+界面关闭对话框或发送新消息时取消令牌，令牌沿调用链（LLMClient → 意图引擎 → 技能网络 → HTTP传输）传递：
+各阶段在开始前检查令牌，等待中的HTTP请求立即返回，流式响应在下一个片段处中断并关闭连接。
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+
+class OperationCancelled(BaseException):
+    """
+    操作已被取消
+
+    与 asyncio.CancelledError 一样继承 BaseException，
+    不会被各处“失败时降级”的 except Exception 吞掉而继续执行后续阶段。
+    """
+
+
+class CancellationToken:
+    """线程安全的取消令牌"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: Dict[int, Callable[[], None]] = {}
+        self._next_handle = 0
+        self.reason = ""
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已取消"""
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "操作已取消"):
+        """取消令牌并执行已注册的回调（重复取消无效果）"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"⚠️ 取消回调执行失败: {e}")
+
+    def raise_if_cancelled(self):
+        """已取消时抛出 OperationCancelled"""
+        if self._event.is_set():
+            raise OperationCancelled(self.reason)
+
+    def register(self, callback: Callable[[], None]) -> Optional[int]:
+        """
+        注册取消回调（如关闭连接），已取消时立即执行
+
+        Returns:
+            回调句柄，用于 unregister；已取消时返回None
+        """
+        with self._lock:
+            if not self._event.is_set():
+                handle = self._next_handle
+                self._next_handle += 1
+                self._callbacks[handle] = callback
+                return handle
+        callback()
+        return None
+
+    def unregister(self, handle: Optional[int]):
+        """移除取消回调"""
+        if handle is None:
+            return
+        with self._lock:
+            self._callbacks.pop(handle, None)
+
+    def sleep(self, seconds: float):
+        """可被取消的等待"""
+        if self._event.wait(seconds):
+            raise OperationCancelled(self.reason)
+
+    def wait_future(self, future: "Future[T]") -> T:
+        """
+        等待 Future 完成，期间被取消时立即抛出 OperationCancelled（Future 本身继续在后台运行）
+
+        Returns:
+            Future 的结果
+        """
+        waker: Future = Future()
+        handle = self.register(lambda: waker.done() or waker.set_result(None))
+        try:
+            wait([future, waker], return_when=FIRST_COMPLETED)
+        finally:
+            self.unregister(handle)
+        if not future.done():
+            raise OperationCancelled(self.reason)
+        return future.result()
+
+
+def child_token(parent: Optional[CancellationToken]) -> CancellationToken:
+    """
+    创建子令牌：父令牌取消时子令牌随之取消，子令牌可单独取消而不影响父令牌
+    （如丢弃推测请求时只中断推测请求本身）
+    """
+    child = CancellationToken()
+    if parent is not None:
+        handle = parent.register(lambda: child.cancel(parent.reason))
+        child.register(lambda: parent.unregister(handle))
+    return child
+
+
+def check_cancelled(token: Optional[CancellationToken]):
+    """令牌存在且已取消时抛出 OperationCancelled"""
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+def cancellable_sleep(seconds: float, token: Optional[CancellationToken] = None):
+    """等待指定时间，令牌被取消时提前抛出 OperationCancelled"""
+    if token is None:
+        time.sleep(seconds)
+    else:
+        token.sleep(seconds)
+
+
+async def await_cancellable(awaitable: Awaitable[T], token: Optional[CancellationToken] = None) -> T:
+    """
+    在事件循环中等待协程，令牌被取消时取消该协程（中断其中的请求）并抛出 OperationCancelled
+
+    Returns:
+        协程的结果
+    """
+    if token is None:
+        return await awaitable
+    task = asyncio.ensure_future(awaitable)
+    loop = asyncio.get_running_loop()
+    # 令牌可能在其他线程（界面线程）中被取消
+    handle = token.register(lambda: loop.call_soon_threadsafe(task.cancel))
+    try:
+        return await task
+    except asyncio.CancelledError:
+        if token.cancelled:
+            raise OperationCancelled(token.reason) from None
+        raise
+    finally:
+        token.unregister(handle)
+
+
+async def acancellable_sleep(seconds: float, token: Optional[CancellationToken] = None):
+    """cancellable_sleep 的 asyncio 版本，等待期间不占用线程"""
+    check_cancelled(token)
+    await await_cancellable(asyncio.sleep(seconds), token)
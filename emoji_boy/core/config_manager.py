@@ -4,7 +4,7 @@
 
 import os
 import json
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional
 
 
 class ConfigManager:
@@ -97,6 +97,17 @@ class ConfigManager:
             'model_name': os.environ.get('EMOJI_MODEL_NAME', '')
         }
     
+    def get_endpoints(self) -> List[Dict[str, Any]]:
+        """
+        获取配置文件中的额外端点列表（"endpoints" 字段）
+        
+        Returns:
+            端点配置列表，每项包含 api_base, api_key，可选 model_name, weight, rpm
+        """
+        file_config = self.load_config() or {}
+        endpoints = file_config.get('endpoints') or []
+        return [endpoint for endpoint in endpoints if isinstance(endpoint, dict)]
+    
     def has_valid_config(self) -> bool:
         """
         检查是否有有效的配置
@@ -106,7 +117,7 @@ class ConfigManager:
         """
         # 先尝试从文件加载
         file_config = self.load_config()
-        if file_config and all(file_config.values()):
+        if file_config and all(file_config.get(key) for key in ('api_type', 'api_key', 'api_base', 'model_name')):
             return True
         
         # 再检查环境变量
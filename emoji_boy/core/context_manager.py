@@ -0,0 +1,278 @@
+"""
+上下文管理模块 - 按token预算组装系统提示词、潜意识记忆和对话历史
+
+使用离线近似分词器估算token数（中日韩文字按字计数，英文/数字按约4字符一个token），
+再按优先级把各部分装入预算：高优先级先分配，可截断的部分截断到剩余预算，
+对话历史从最近一轮开始整轮装入，装不下的旧轮次被丢弃。
+"""
+
+import math
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+
+
+# 近似分词：CJK 单字 / 字母数字串 / 空白 / 其他单个符号
+_TOKEN_PIECE_RE = re.compile(
+    r"[぀-ヿ㐀-䶿一-鿿豈-﫿가-힯]"
+    r"|[A-Za-z0-9]+"
+    r"|\s+"
+    r"|.",
+    re.DOTALL
+)
+
+# 截断标记
+TRUNCATION_MARK = "\n…（内容过长，已省略）…\n"
+
+
+def _piece_tokens(piece: str) -> int:
+    """估算单个片段的token数"""
+    if piece.isspace():
+        return 0
+    if piece.isascii() and piece.isalnum():
+        return math.ceil(len(piece) / 4)
+    return 1
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    离线估算文本的token数
+
+    Args:
+        text: 文本
+
+    Returns:
+        估算的token数
+    """
+    if not text:
+        return 0
+    return sum(_piece_tokens(piece) for piece in _TOKEN_PIECE_RE.findall(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, keep: str = "head") -> str:
+    """
+    把文本截断到不超过 max_tokens 个token
+
+    Args:
+        text: 文本
+        max_tokens: token上限
+        keep: "head" 保留开头；"middle" 保留开头和结尾、省略中间
+
+    Returns:
+        截断后的文本（未超出时原样返回）
+    """
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    available = max_tokens - estimate_tokens(TRUNCATION_MARK)
+    if available <= 0:
+        return ""
+
+    pieces = _TOKEN_PIECE_RE.findall(text)
+    if keep == "middle":
+        head = _take_pieces(pieces, available - available // 2)
+        tail = _take_pieces(list(reversed(pieces)), available // 2)
+        return "".join(head) + TRUNCATION_MARK + "".join(reversed(tail))
+
+    return "".join(_take_pieces(pieces, available)) + TRUNCATION_MARK
+
+
+def _take_pieces(pieces: List[str], max_tokens: int) -> List[str]:
+    """按顺序取片段，直到达到token上限"""
+    taken = []
+    used = 0
+    for piece in pieces:
+        cost = _piece_tokens(piece)
+        if used + cost > max_tokens:
+            break
+        taken.append(piece)
+        used += cost
+    return taken
+
+
+class ContextManager:
+    """按token预算和优先级组装请求上下文"""
+
+    # 默认优先级：数字越小越先分配预算
+    DEFAULT_PRIORITIES = {"system": 0, "message": 1, "memory": 2, "summary": 3, "history": 4}
+
+    def __init__(self, max_context_tokens: int = None, priorities: Dict[str, int] = None,
+                 message_overhead: int = 4):
+        """
+        初始化上下文管理器
+
+        Args:
+            max_context_tokens: 上下文总预算（提示词 + 回复）
+            priorities: 各部分（system/message/memory/summary/history）的优先级
+            message_overhead: 每条消息的格式开销（role 等）
+        """
+        self.max_context_tokens = max_context_tokens or getattr(config, "LLM_CONTEXT_TOKENS", 4096)
+        self.priorities = dict(self.DEFAULT_PRIORITIES)
+        self.priorities.update(priorities or getattr(config, "LLM_CONTEXT_PRIORITIES", {}) or {})
+        self.message_overhead = message_overhead
+
+    def count_message_tokens(self, message: Dict[str, str]) -> int:
+        """估算单条消息（含格式开销）的token数"""
+        return estimate_tokens(message.get("content", "")) + self.message_overhead
+
+    def required_tokens(self, system_prompt: str, memory: str, message: str, completion_tokens: int = 0,
+                        summary: str = "") -> int:
+        """
+        估算不截断时所需的上下文（不含对话历史：历史本就按预算从最早的轮次丢弃）
+
+        Returns:
+            系统提示词、潜意识、摘要、当前消息与回复预留的token总数
+        """
+        texts = (system_prompt, memory, summary, message)
+        return sum(estimate_tokens(text or "") for text in texts) + self.message_overhead * 3 + completion_tokens
+
+    def pack(self, system_prompt: str, memory: str, history: List[Dict[str, str]], message: str,
+             completion_tokens: int = 0, memory_header: str = "# 潜意识记忆", summary: str = "",
+             max_context_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """
+        在预算内组装上下文
+
+        Args:
+            system_prompt: AI灵魂（系统提示词）
+            memory: 潜意识记忆（memC），拼接在系统提示词之后
+            history: 对话历史（按时间顺序，user/assistant 交替）
+            message: 当前用户消息
+            completion_tokens: 为模型回复预留的token数
+            memory_header: 潜意识记忆的标题
+            summary: 早先对话的滚动摘要（作为单独一条消息注入）
+            max_context_tokens: 本次请求的上下文预算（如路由到长上下文模型时），默认为 self.max_context_tokens
+
+        Returns:
+            Dict: system（组装后的系统提示词）、summary（摘要）、history（保留的历史）、
+                  message（当前消息）、usage（token用量）
+        """
+        budget = max((max_context_tokens or self.max_context_tokens) - completion_tokens, 0)
+        # 系统提示词和当前消息各带一条消息的格式开销
+        remaining = budget - self.message_overhead * 2
+
+        texts = {"system": system_prompt or "", "message": message or "", "memory": memory or "",
+                 "summary": summary or ""}
+        keep_modes = {"system": "head", "message": "middle", "memory": "head", "summary": "middle"}
+        # 潜意识拼接在系统提示词之后需要标题；摘要单独成为一条消息
+        prefix_tokens = {
+            "memory": estimate_tokens(f"\n\n{memory_header}\n"),
+            "summary": self.message_overhead
+        }
+
+        packed: Dict[str, Any] = {"system": "", "memory": "", "summary": "", "message": "", "history": []}
+        usage: Dict[str, Any] = {"system": 0, "memory": 0, "summary": 0, "message": 0, "history": 0,
+                                 "dropped_history_messages": 0, "truncated": []}
+
+        for part in sorted(self.priorities, key=self.priorities.get):
+            if part == "history":
+                packed["history"], used = self._fit_history(history, remaining)
+                usage["dropped_history_messages"] = len(history) - len(packed["history"])
+            elif part in texts:
+                extra = prefix_tokens.get(part, 0) if texts[part] else 0
+                fitted, used = self._fit_text(texts[part], remaining - extra, keep_modes[part])
+                if fitted:
+                    used += extra
+                if fitted != texts[part]:
+                    usage["truncated"].append(part)
+                packed[part] = fitted
+            else:
+                continue
+
+            usage[part] = used
+            remaining -= used
+
+        system = packed["system"]
+        if packed["memory"]:
+            system = f"{system}\n\n{memory_header}\n{packed['memory']}"
+
+        usage["prompt_tokens"] = budget - remaining
+        usage["completion_budget"] = completion_tokens
+        usage["budget"] = budget
+        return {
+            "system": system,
+            "summary": packed["summary"],
+            "history": packed["history"],
+            "message": packed["message"],
+            "usage": usage
+        }
+
+    @staticmethod
+    def _fit_text(text: str, available: int, keep: str) -> Tuple[str, int]:
+        """把文本装入剩余预算，返回（文本, 占用token数）"""
+        fitted = truncate_to_tokens(text or "", max(available, 0), keep)
+        return fitted, estimate_tokens(fitted)
+
+    def _fit_history(self, history: List[Dict[str, str]], available: int) -> Tuple[List[Dict[str, str]], int]:
+        """从最近一轮开始整轮装入历史，返回（保留的历史, 占用token数）"""
+        kept: List[List[Dict[str, str]]] = []
+        used = 0
+
+        index = len(history)
+        while index > 0:
+            # 以 user 消息为一轮的开始，保证 user/assistant 成对保留
+            start = index - 1
+            while start > 0 and history[start].get("role") != "user":
+                start -= 1
+            turn = history[start:index]
+            cost = sum(self.count_message_tokens(item) for item in turn)
+            if used + cost > available:
+                break
+            kept.append(turn)
+            used += cost
+            index = start
+
+        return [item for turn in reversed(kept) for item in turn], used
+
+
+class TokenUsageTracker:
+    """记录每次请求的token用量"""
+
+    def __init__(self):
+        self.last_request: Optional[Dict[str, Any]] = None
+        self._stats = {
+            "requests": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "truncated_requests": 0,
+            "dropped_history_messages": 0
+        }
+
+    def record_prompt(self, usage: Dict[str, Any]):
+        """记录一次请求的提示词用量（估算值）"""
+        self.last_request = dict(usage)
+        self._stats["requests"] += 1
+        self._stats["prompt_tokens"] += usage.get("prompt_tokens", 0)
+        self._stats["dropped_history_messages"] += usage.get("dropped_history_messages", 0)
+        if usage.get("truncated"):
+            self._stats["truncated_requests"] += 1
+
+    def record_completion(self, completion_text: str = "", provider_usage: Optional[Dict[str, Any]] = None):
+        """
+        记录回复用量，服务端返回 usage 时以服务端数据为准
+
+        Args:
+            completion_text: 回复文本（用于估算）
+            provider_usage: 服务端返回的 usage 字段
+        """
+        if provider_usage and provider_usage.get("completion_tokens") is not None:
+            completion_tokens = provider_usage["completion_tokens"]
+        else:
+            completion_tokens = estimate_tokens(completion_text)
+
+        self._stats["completion_tokens"] += completion_tokens
+        if self.last_request is not None:
+            self.last_request["completion_tokens"] = completion_tokens
+            if provider_usage and provider_usage.get("prompt_tokens") is not None:
+                self.last_request["provider_prompt_tokens"] = provider_usage["prompt_tokens"]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取用量统计"""
+        stats = self._stats.copy()
+        stats["average_prompt_tokens"] = (
+            stats["prompt_tokens"] / stats["requests"] if stats["requests"] else 0.0
+        )
+        stats["last_request"] = self.last_request
+        return stats
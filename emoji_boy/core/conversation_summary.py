@@ -0,0 +1,199 @@
+"""
+对话摘要模块 - 把移出历史窗口的对话折叠进滚动摘要
+
+被淘汰的对话轮次交给后台线程，与已有摘要合并成一段紧凑的新摘要并按会话持久化，
+不阻塞对话请求。请求时摘要作为单独一条消息注入，长会话的请求体积保持恒定。
+"""
+
+import json
+import os
+import queue
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+import config
+
+
+# 滚动摘要提示词
+SUMMARY_PROMPT = """请把以下新增对话合并进已有的对话摘要，生成一份新的摘要。
+
+要求：
+1. 以"我"（AI）的第一人称视角叙述
+2. 保留用户的身份信息、偏好、情绪变化、约定事项和尚未结束的话题
+3. 删除寒暄、重复和无关紧要的内容
+4. 不超过{max_chars}字，只输出摘要本身，不要输出任何格式头
+
+已有摘要：
+{summary}
+
+新增对话：
+{turns}"""
+
+
+class ConversationSummarizer:
+    """按会话持久化的滚动对话摘要"""
+
+    def __init__(self, session_id: str, summarize_fn: Callable[[str], str],
+                 storage_dir: str = None, max_chars: int = None):
+        """
+        初始化摘要器并加载该会话已有的摘要
+
+        Args:
+            session_id: 会话标识
+            summarize_fn: 摘要函数，输入提示词返回摘要文本，失败时抛出异常
+            storage_dir: 摘要存储目录
+            max_chars: 摘要最大字数
+        """
+        self.session_id = session_id
+        self.summarize_fn = summarize_fn
+        self.max_chars = max_chars or getattr(config, "CONVERSATION_SUMMARY_MAX_CHARS", 800)
+
+        storage_dir = storage_dir or os.path.join(os.path.expanduser("~/.emoji_assistant"), "sessions")
+        safe_id = re.sub(r"[^\w.-]", "_", session_id)
+        self.path = os.path.join(storage_dir, f"{safe_id}.summary.json")
+
+        self._summary = ""
+        self._folded_messages = 0
+        # 清空摘要时递增，丢弃清空前已开始的折叠结果
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[List[Dict[str, str]]]" = queue.Queue()
+        self._worker = None
+
+        self._stats = {
+            "folds": 0,
+            "failures": 0
+        }
+
+        self._load()
+
+    @property
+    def summary(self) -> str:
+        """当前摘要"""
+        with self._lock:
+            return self._summary
+
+    def submit(self, messages: List[Dict[str, str]]):
+        """
+        提交被移出历史窗口的消息，由后台线程折叠进摘要
+
+        Args:
+            messages: 被淘汰的消息列表
+        """
+        if not messages:
+            return
+
+        self._queue.put(list(messages))
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name=f"summary-{self.session_id}", daemon=True
+                )
+                self._worker.start()
+
+    def wait(self):
+        """等待已提交的消息全部折叠完成"""
+        self._queue.join()
+
+    def reset(self):
+        """清空摘要（例如用户清空对话历史时）"""
+        with self._lock:
+            self._summary = ""
+            self._folded_messages = 0
+            self._generation += 1
+            self._save()
+
+    def _run(self):
+        """后台线程：依次折叠提交的消息，积压时合并为一批处理"""
+        while True:
+            batches = [self._queue.get()]
+            while True:
+                try:
+                    batches.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._fold([message for batch in batches for message in batch])
+            finally:
+                for _ in batches:
+                    self._queue.task_done()
+
+    def _fold(self, messages: List[Dict[str, str]]):
+        """把一批消息与已有摘要合并"""
+        turns = self._format_turns(messages)
+        with self._lock:
+            previous = self._summary
+            generation = self._generation
+
+        try:
+            summary = self.summarize_fn(SUMMARY_PROMPT.format(
+                max_chars=self.max_chars, summary=previous or "（暂无）", turns=turns
+            )).strip()
+            if not summary:
+                raise ValueError("摘要为空")
+        except Exception as e:
+            self._stats["failures"] += 1
+            print(f"⚠️ 对话摘要生成失败: {e}，使用摘录方式保留")
+            summary = f"{previous}\n{turns}".strip()
+
+        # 超长时保留最近的内容
+        if len(summary) > self.max_chars:
+            summary = summary[-self.max_chars:]
+
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._summary = summary
+            self._folded_messages += len(messages)
+            self._stats["folds"] += 1
+            self._save()
+
+    @staticmethod
+    def _format_turns(messages: List[Dict[str, str]]) -> str:
+        """把消息格式化为对话文本"""
+        names = {"user": "用户", "assistant": "我"}
+        return "\n".join(
+            f"{names.get(message.get('role'), message.get('role'))}: {message.get('content', '')}"
+            for message in messages
+        )
+
+    def _load(self):
+        """加载该会话已持久化的摘要"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._summary = data.get("summary", "")
+            self._folded_messages = data.get("folded_messages", 0)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 加载对话摘要失败: {e}")
+
+    def _save(self):
+        """持久化摘要（先写临时文件再替换，避免写到一半损坏）"""
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "session_id": self.session_id,
+                    "summary": self._summary,
+                    "folded_messages": self._folded_messages,
+                    "updated_at": time.time()
+                }, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ 保存对话摘要失败: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取摘要统计信息"""
+        with self._lock:
+            stats = self._stats.copy()
+            stats["summary_chars"] = len(self._summary)
+            stats["folded_messages"] = self._folded_messages
+        stats["session_id"] = self.session_id
+        stats["pending_batches"] = self._queue.qsize()
+        return stats
@@ -0,0 +1,69 @@
+"""
+截止时间模块 - 单轮对话的时间预算
+
+一轮对话依次经过意图识别、技能匹配、代码生成、插件执行和最终回复，
+每个阶段各自的超时与重试叠加起来最坏可达数分钟。轮次开始时创建一个 Deadline，
+各阶段按剩余预算裁剪超时、决定是否重试，剩余预算不足以完成的阶段直接跳过（降级为普通聊天）。
+"""
+
+import time
+from typing import Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """剩余预算不足以完成该阶段"""
+
+
+class Deadline:
+    """截止时间"""
+
+    def __init__(self, budget: float, min_timeout: float = 0.0, expires_at: Optional[float] = None):
+        """
+        Args:
+            budget: 预算（秒）
+            min_timeout: 单次请求超时的下限；为 0 时预算用完即不再发出请求，
+                大于 0 时（如最终回复）每次尝试至少保留该超时，预算只限制重试
+            expires_at: 到期时刻（time.monotonic），默认为现在 + budget
+        """
+        self.budget = budget
+        self.min_timeout = min_timeout
+        self.started_at = time.monotonic()
+        self.expires_at = expires_at if expires_at is not None else self.started_at + budget
+
+    def remaining(self) -> float:
+        """剩余预算（秒）"""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        """预算是否已用完"""
+        return time.monotonic() >= self.expires_at
+
+    def elapsed(self) -> float:
+        """已用时间（秒）"""
+        return time.monotonic() - self.started_at
+
+    def reserve(self, seconds: float) -> "Deadline":
+        """提前 seconds 到期的子预算，为后续阶段（如最终回复）保留时间"""
+        return Deadline(max(self.budget - seconds, 0.0), expires_at=self.expires_at - seconds)
+
+    def check(self, stage: str, min_time: float = 0.0):
+        """
+        剩余预算不足以开始该阶段时抛出 DeadlineExceeded
+
+        Args:
+            stage: 阶段名称（用于日志）
+            min_time: 阶段至少需要的时间（秒）
+        """
+        available = max(self.remaining(), self.min_timeout)
+        if available <= 0 or available < min_time:
+            raise DeadlineExceeded(f"{stage}剩余预算不足（{self.remaining():.2f}s）")
+
+    def clip(self, timeout: float) -> float:
+        """把单次请求的超时裁剪到剩余预算内（不低于 min_timeout）"""
+        return min(timeout, max(self.remaining(), self.min_timeout))
+
+    def allows_retry(self, delay: float) -> bool:
+        """退避 delay 秒后是否仍有预算再试一次"""
+        return self.remaining() > delay
+
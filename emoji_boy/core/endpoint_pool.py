@@ -0,0 +1,587 @@
+"""
+端点池模块 - 在多个API端点/密钥之间分配LLM请求
+
+1. 负载均衡：按端点延迟（p50）、在途请求数、近期错误率和权重打分，选择得分最低的端点
+2. 限流：每个密钥可配置每分钟请求数（rpm），达到上限的端点暂不参与选择
+3. 故障转移：端点失败或熔断时换下一个端点，而不是在同一端点上退避等待
+4. 对冲请求：请求超过该端点 p95 延迟仍未返回时，向另一个端点发送相同请求，先成功者胜出
+
+端点的熔断状态和延迟分位数复用 core/resilience.py 的统计，按端点条目（地址 + 密钥 + 模型）区分：
+同一地址下某个密钥失效或被限流时，只熔断该条目。
+"""
+
+import asyncio
+import hashlib
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple, TypeVar
+
+import requests
+
+import config
+from .cancellation import (CancellationToken, OperationCancelled, acancellable_sleep, await_cancellable,
+                           cancellable_sleep, check_cancelled, child_token)
+from .config_manager import config_manager
+from .deadline import Deadline
+from .rate_limiter import rate_limiter
+from .resilience import CircuitOpenError, is_retryable, resilience
+
+
+T = TypeVar("T")
+
+# 换一个密钥可能就能成功的状态码：鉴权失败、密钥被限流
+_KEY_SPECIFIC_STATUS = (401, 403, 429)
+
+
+class LLMEndpoint:
+    """单个API端点（地址 + 密钥）"""
+
+    def __init__(self, api_base: str, api_key: str, model_name: Optional[str] = None,
+                 weight: float = 1.0, rpm: Optional[int] = None, name: Optional[str] = None):
+        """
+        Args:
+            api_base: API基础URL
+            api_key: API密钥
+            model_name: 模型名称，为空时沿用请求中的模型
+            weight: 权重，越大分到的请求越多
+            rpm: 每分钟请求数上限，为空表示不限
+            name: 端点名称（用于统计展示）
+        """
+        self.api_base = (api_base or "").rstrip("/")
+        self.api_key = api_key
+        self.model_name = model_name
+        self.weight = max(float(weight or 1.0), 0.01)
+        self.rpm = int(rpm) if rpm else None
+        self.name = name or f"{self.api_base}#{(api_key or '')[-4:]}"
+        # 熔断器和延迟统计的标识（见 resilience.endpoint_key），不暴露密钥本身
+        fingerprint = hashlib.blake2b(f"{api_key}|{model_name or ''}".encode("utf-8"), digest_size=4).hexdigest()
+        self.health_key = f"{self.api_base}#{fingerprint}"
+
+        self.in_flight = 0
+        self.error_rate = 0.0
+        self._window: Deque[float] = deque()
+        self.stats = {
+            "requests": 0,
+            "failures": 0,
+            "rate_limited": 0,
+            "hedges": 0,
+            "hedge_wins": 0
+        }
+
+    @classmethod
+    def from_dict(cls, spec: Dict[str, Any]) -> "LLMEndpoint":
+        """由配置字典创建端点"""
+        return cls(
+            api_base=spec.get("api_base", ""),
+            api_key=spec.get("api_key", ""),
+            model_name=spec.get("model_name"),
+            weight=spec.get("weight", 1.0),
+            rpm=spec.get("rpm"),
+            name=spec.get("name")
+        )
+
+    def wait_time(self, now: float) -> float:
+        """距离下一个可用请求名额的秒数（0 表示当前可用）"""
+        while self._window and now - self._window[0] >= 60:
+            self._window.popleft()
+        if self.rpm and len(self._window) >= self.rpm:
+            return self._window[0] + 60 - now
+        return 0.0
+
+    def prepare(self, url: str, headers: Dict[str, str], data: Dict[str, Any],
+                primary_base: str) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+        """把针对主端点构建的请求改写为发往本端点的请求"""
+        if url.startswith(primary_base):
+            url = self.api_base + url[len(primary_base):]
+        headers = dict(headers)
+        headers["Authorization"] = f"Bearer {self.api_key}"
+        if self.model_name and "model" in data:
+            data = dict(data, model=self.model_name)
+        return url, headers, data
+
+
+class EndpointPool:
+    """端点池：负载均衡、限流、故障转移和对冲请求"""
+
+    def __init__(self, endpoints: List[Dict[str, Any]] = None, hedge: bool = None,
+                 hedge_min_delay: float = None, error_decay: float = 0.2):
+        """
+        Args:
+            endpoints: 主端点之外的其他端点配置
+            hedge: 是否启用对冲请求
+            hedge_min_delay: 发送对冲请求前的最短等待（秒）
+            error_decay: 错误率滑动平均的衰减系数
+        """
+        self.hedge = getattr(config, "LLM_HEDGE_REQUESTS", True) if hedge is None else hedge
+        self.hedge_min_delay = hedge_min_delay if hedge_min_delay is not None else getattr(config, "LLM_HEDGE_MIN_DELAY", 0.5)
+        self.error_decay = error_decay
+
+        self._primary: Optional[LLMEndpoint] = None
+        self._extra = [LLMEndpoint.from_dict(spec) for spec in (endpoints or [])]
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self._stats = {
+            "failovers": 0,
+            "hedged_requests": 0,
+            "hedge_wins": 0
+        }
+
+    @classmethod
+    def from_config(cls) -> "EndpointPool":
+        """由 config.LLM_ENDPOINTS 和配置文件中的 endpoints 字段创建端点池"""
+        specs = list(getattr(config, "LLM_ENDPOINTS", []) or []) + config_manager.get_endpoints()
+        return cls(specs)
+
+    def set_primary(self, api_base: str, api_key: str):
+        """设置主端点（当前配置的地址和密钥），未变化时保留其统计和限流状态"""
+        with self._lock:
+            primary = self._primary
+            if primary is not None and primary.api_base == (api_base or "").rstrip("/") and primary.api_key == api_key:
+                return
+            self._primary = LLMEndpoint(api_base, api_key, name="primary")
+
+    @property
+    def endpoints(self) -> List[LLMEndpoint]:
+        """全部端点（主端点在前）"""
+        primary = [self._primary] if self._primary is not None and self._primary.api_base else []
+        return primary + [endpoint for endpoint in self._extra if endpoint.api_base]
+
+    def _score(self, endpoint: LLMEndpoint, kind: str, default_latency: float) -> float:
+        """端点得分，越低越优先"""
+        latency = resilience.latency_percentile(endpoint.health_key, 50, kind)
+        if latency is None:
+            latency = default_latency
+        return latency * (1 + endpoint.in_flight) * (1 + 4 * endpoint.error_rate) / endpoint.weight
+
+    def _pick(self, tried: Set[LLMEndpoint], kind: str) -> Tuple[Optional[LLMEndpoint], float]:
+        """
+        选择本轮尚未尝试、未熔断且有请求名额的最优端点，并占用一个名额
+
+        Returns:
+            （端点, 需等待秒数）：全部端点都被限流时返回 (None, 最短等待)；
+            没有未尝试的端点、或未尝试的端点都已熔断时返回 (None, 0)
+
+        Raises:
+            CircuitOpenError: 池中全部端点都已熔断（在占用限流令牌之前快速失败）
+        """
+        endpoints = self.endpoints
+        candidates = [endpoint for endpoint in endpoints if endpoint not in tried]
+        if not candidates:
+            return None, 0.0
+
+        available = [endpoint for endpoint in candidates if resilience.is_available(endpoint.health_key)]
+        if not available:
+            if not any(resilience.is_available(endpoint.health_key) for endpoint in endpoints):
+                retry_after = min(resilience.retry_after(endpoint.health_key) for endpoint in endpoints)
+                raise CircuitOpenError("全部端点", retry_after)
+            return None, 0.0
+
+        # 没有足够延迟样本的端点按已知最快的端点估计，让新端点也能分到流量
+        known = [latency for latency in (resilience.latency_percentile(endpoint.health_key, 50, kind)
+                                         for endpoint in available) if latency is not None]
+        default_latency = min(known) if known else 1.0
+        # 得分相同时优先选择累计请求较少的端点
+        scores = {endpoint: (self._score(endpoint, kind, default_latency), endpoint.stats["requests"] / endpoint.weight)
+                  for endpoint in available}
+        with self._lock:
+            now = time.monotonic()
+            waits = {endpoint: endpoint.wait_time(now) for endpoint in available}
+            ready = [endpoint for endpoint in available if not waits[endpoint]]
+            for endpoint in available:
+                if waits[endpoint]:
+                    endpoint.stats["rate_limited"] += 1
+            if not ready:
+                return None, min(waits.values())
+
+            endpoint = min(ready, key=scores.get)
+            endpoint._window.append(now)
+            return endpoint, 0.0
+
+    def _choose(self, tried: Set[LLMEndpoint], kind: str,
+                cancel_token: Optional[CancellationToken] = None) -> Optional[LLMEndpoint]:
+        """选择端点，全部被限流时等待名额"""
+        while True:
+            endpoint, wait_time = self._pick(tried, kind)
+            if not wait_time:
+                return endpoint
+            cancellable_sleep(wait_time, cancel_token)
+
+    async def _achoose(self, tried: Set[LLMEndpoint], kind: str,
+                       cancel_token: Optional[CancellationToken] = None) -> Optional[LLMEndpoint]:
+        """_choose 的 asyncio 版本"""
+        while True:
+            endpoint, wait_time = self._pick(tried, kind)
+            if not wait_time:
+                return endpoint
+            await acancellable_sleep(wait_time, cancel_token)
+
+    def _begin(self, endpoint: LLMEndpoint):
+        with self._lock:
+            endpoint.in_flight += 1
+            endpoint.stats["requests"] += 1
+
+    def _finish(self, endpoint: LLMEndpoint, failed: bool):
+        with self._lock:
+            endpoint.in_flight -= 1
+            endpoint.error_rate += self.error_decay * ((1.0 if failed else 0.0) - endpoint.error_rate)
+            if failed:
+                endpoint.stats["failures"] += 1
+
+    def _can_failover(self, error: BaseException, endpoint: LLMEndpoint, multiple: bool) -> bool:
+        """失败后是否继续尝试（同一端点重试或换端点）"""
+        if isinstance(error, CircuitOpenError):
+            return multiple
+        if not is_retryable(error):
+            # 密钥失效或被限流时，换一个密钥可能成功
+            response = getattr(error, "response", None)
+            return multiple and isinstance(error, requests.exceptions.HTTPError) and response is not None \
+                and response.status_code in _KEY_SPECIFIC_STATUS
+        return multiple or resilience.is_available(endpoint.health_key)
+
+    def _hedge_delay(self, endpoint: LLMEndpoint, kind: str) -> Optional[float]:
+        """对冲等待时间（端点 p95 延迟），不满足对冲条件时返回None"""
+        # 流式请求建连后即开始输出，不做对冲，避免重复的流占用连接
+        if not self.hedge or kind != "complete" or len(self.endpoints) < 2:
+            return None
+        p95 = resilience.latency_percentile(endpoint.health_key, 95, kind)
+        if p95 is None:
+            return None
+        return max(p95, self.hedge_min_delay)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """对冲请求使用的线程池"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge")
+        return self._executor
+
+    def _send_once(self, endpoint: LLMEndpoint, request: Tuple[str, Dict[str, str], Dict[str, Any]],
+                   primary_base: str, send: Callable[..., T], default_timeout: float, kind: str,
+                   priority: Optional[str], cancel_token: Optional[CancellationToken] = None,
+                   deadline: Optional[Deadline] = None) -> T:
+        """向指定端点发送一次请求并记录结果"""
+        url, headers, data = endpoint.prepare(*request, primary_base)
+        rate_limiter.acquire(url, priority, cancel_token)
+        check_cancelled(cancel_token)
+        if deadline is not None:
+            deadline.check("请求")
+        timeout = resilience.before_attempt(endpoint.health_key, default_timeout, kind)
+        if deadline is not None:
+            timeout = deadline.clip(timeout)
+        self._begin(endpoint)
+        start_time = time.monotonic()
+        try:
+            result = send(url, headers, data, timeout, cancel_token)
+        except OperationCancelled:
+            # 主动取消不计入端点故障
+            self._finish(endpoint, False)
+            resilience.release(endpoint.health_key)
+            raise
+        except Exception as e:
+            self._finish(endpoint, True)
+            resilience.record_failure(endpoint.health_key, e)
+            raise
+        self._finish(endpoint, False)
+        self._record_latency(endpoint, time.monotonic() - start_time, kind, priority)
+        return result
+
+    async def _asend_once(self, endpoint: LLMEndpoint, request: Tuple[str, Dict[str, str], Dict[str, Any]],
+                          primary_base: str, send: Callable[..., Awaitable[T]], default_timeout: float, kind: str,
+                          priority: Optional[str], cancel_token: Optional[CancellationToken] = None,
+                          deadline: Optional[Deadline] = None) -> T:
+        """_send_once 的 asyncio 版本"""
+        url, headers, data = endpoint.prepare(*request, primary_base)
+        await rate_limiter.aacquire(url, priority, cancel_token)
+        check_cancelled(cancel_token)
+        if deadline is not None:
+            deadline.check("请求")
+        timeout = resilience.before_attempt(endpoint.health_key, default_timeout, kind)
+        if deadline is not None:
+            timeout = deadline.clip(timeout)
+        self._begin(endpoint)
+        start_time = time.monotonic()
+        try:
+            result = await await_cancellable(send(url, headers, data, timeout), cancel_token)
+        except (asyncio.CancelledError, OperationCancelled):
+            self._finish(endpoint, False)
+            resilience.release(endpoint.health_key)
+            raise
+        except Exception as e:
+            self._finish(endpoint, True)
+            resilience.record_failure(endpoint.health_key, e)
+            raise
+        self._finish(endpoint, False)
+        resilience.record_success(endpoint.health_key, time.monotonic() - start_time, kind)
+        await rate_limiter.arecord_latency(time.monotonic() - start_time, priority)
+        return result
+
+    @staticmethod
+    def _record_latency(endpoint: LLMEndpoint, latency: float, kind: str, priority: Optional[str]):
+        """记录成功请求的延迟（端点健康统计 + 交互延迟反馈给限流器）"""
+        resilience.record_success(endpoint.health_key, latency, kind)
+        rate_limiter.record_latency(latency, priority)
+
+    def _record_hedge(self, endpoint: LLMEndpoint, won: bool):
+        with self._lock:
+            if won:
+                endpoint.stats["hedge_wins"] += 1
+                self._stats["hedge_wins"] += 1
+            else:
+                endpoint.stats["hedges"] += 1
+                self._stats["hedged_requests"] += 1
+
+    @staticmethod
+    def _round_delay(tried: Set[LLMEndpoint], attempt: int, url: str, deadline: Optional[Deadline]) -> float:
+        """开始新一轮：清空已尝试的端点，返回本轮开始前的退避时间"""
+        tried.clear()
+        delay = resilience.backoff(url, max(attempt - 1, 0))
+        if deadline is not None:
+            delay = min(delay, deadline.remaining())
+        return delay
+
+    def _next_endpoint(self, tried: Set[LLMEndpoint], attempt: int, url: str, kind: str,
+                       cancel_token: Optional[CancellationToken] = None,
+                       deadline: Optional[Deadline] = None) -> LLMEndpoint:
+        """
+        选择下一次尝试的端点；所有端点都试过一轮（或本轮剩余端点都已熔断）后退避并开始新一轮
+
+        Raises:
+            CircuitOpenError: 全部端点都已熔断
+        """
+        check_cancelled(cancel_token)
+        if attempt and len(tried) >= len(self.endpoints):
+            cancellable_sleep(self._round_delay(tried, attempt, url, deadline), cancel_token)
+        endpoint = self._choose(tried, kind, cancel_token)
+        if endpoint is None:
+            cancellable_sleep(self._round_delay(tried, attempt, url, deadline), cancel_token)
+            endpoint = self._choose(tried, kind, cancel_token)
+        return endpoint
+
+    async def _anext_endpoint(self, tried: Set[LLMEndpoint], attempt: int, url: str, kind: str,
+                              cancel_token: Optional[CancellationToken] = None,
+                              deadline: Optional[Deadline] = None) -> LLMEndpoint:
+        """_next_endpoint 的 asyncio 版本"""
+        check_cancelled(cancel_token)
+        if attempt and len(tried) >= len(self.endpoints):
+            await acancellable_sleep(self._round_delay(tried, attempt, url, deadline), cancel_token)
+        endpoint = await self._achoose(tried, kind, cancel_token)
+        if endpoint is None:
+            await acancellable_sleep(self._round_delay(tried, attempt, url, deadline), cancel_token)
+            endpoint = await self._achoose(tried, kind, cancel_token)
+        return endpoint
+
+    def call(self, url: str, headers: Dict[str, str], data: Dict[str, Any],
+             send: Callable[[str, Dict[str, str], Dict[str, Any], float, Optional[CancellationToken]], T],
+             default_timeout: float = 30.0, max_retries: int = 3, kind: str = "complete",
+             priority: Optional[str] = None, cancel_token: Optional[CancellationToken] = None,
+             deadline: Optional[Deadline] = None) -> T:
+        """
+        在端点池中发送请求
+
+        Args:
+            url: 针对主端点构建的请求地址
+            headers: 请求头
+            data: 请求体
+            send: 发送函数，参数为（地址, 请求头, 请求体, 超时, 取消令牌），返回解析后的结果；
+                取消令牌是本次尝试专属的（cancel_token 的子令牌），对冲失败的一方通过它中断请求
+            default_timeout: 延迟样本不足时使用的超时
+            max_retries: 最大尝试次数（至少会把每个端点各试一次）
+            kind: 请求类型（complete / stream）
+            priority: 限流优先级（interactive / background）
+            cancel_token: 取消令牌，取消后不再重试或对冲（send 自身应在取消时中断请求）
+            deadline: 本轮截止时间，超时裁剪到剩余预算内，预算用完后不再重试或换端点
+
+        Returns:
+            send 的返回值
+        """
+        endpoints = self.endpoints
+        if not endpoints:
+            rate_limiter.acquire(url, priority, cancel_token)
+            return resilience.call(url, lambda timeout: send(url, headers, data, timeout, cancel_token),
+                                   default_timeout=default_timeout, max_retries=max_retries, kind=kind,
+                                   cancel_token=cancel_token, deadline=deadline)
+
+        primary_base = endpoints[0].api_base
+        request = (url, headers, data)
+        multiple = len(endpoints) > 1
+        tried: Set[LLMEndpoint] = set()
+        last_error: Optional[Exception] = None
+
+        for attempt in range(max(max_retries, len(endpoints))):
+            endpoint = self._next_endpoint(tried, attempt, url, kind, cancel_token, deadline)
+            tried.add(endpoint)
+            try:
+                delay = self._hedge_delay(endpoint, kind)
+                if delay is None:
+                    return self._send_once(endpoint, request, primary_base, send, default_timeout, kind,
+                                           priority, cancel_token, deadline)
+                return self._hedged_call(endpoint, delay, tried, request, primary_base, send, default_timeout, kind,
+                                         priority, cancel_token, deadline)
+            except Exception as e:
+                last_error = e
+                if not self._can_failover(e, endpoint, multiple):
+                    raise
+                if deadline is not None and deadline.expired:
+                    raise
+                if multiple:
+                    with self._lock:
+                        self._stats["failovers"] += 1
+
+        raise last_error
+
+    def _hedged_call(self, endpoint: LLMEndpoint, delay: float, tried: Set[LLMEndpoint],
+                     request: Tuple[str, Dict[str, str], Dict[str, Any]], primary_base: str,
+                     send: Callable[..., T], default_timeout: float, kind: str,
+                     priority: Optional[str], cancel_token: Optional[CancellationToken] = None,
+                     deadline: Optional[Deadline] = None) -> T:
+        """
+        发送请求，超过 delay 仍未返回时向另一端点发送对冲请求，先成功者胜出
+
+        每个请求使用各自的子令牌：胜出者返回后取消落后请求的令牌，关闭其连接；本轮取消时两者一并中断。
+        """
+        executor = self._get_executor()
+        tokens: Dict[Future, CancellationToken] = {}
+
+        def _submit(target: LLMEndpoint) -> Future:
+            token = child_token(cancel_token)
+            future = executor.submit(self._send_once, target, request, primary_base, send, default_timeout, kind,
+                                     priority, token, deadline)
+            tokens[future] = token
+            return future
+
+        futures = {_submit(endpoint): endpoint}
+
+        done, _ = wait(futures, timeout=delay)
+        if not done and not (cancel_token is not None and cancel_token.cancelled):
+            backup, wait_time = self._pick_backup(tried, kind)
+            if backup is not None and not wait_time:
+                tried.add(backup)
+                self._record_hedge(backup, won=False)
+                futures[_submit(backup)] = backup
+
+        pending = set(futures)
+        error: Optional[Exception] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                # 中断落后的请求，不再占用连接和线程
+                for other in pending:
+                    other.cancel()
+                    tokens[other].cancel("对冲请求已有结果")
+                if futures[future] is not endpoint:
+                    self._record_hedge(futures[future], won=True)
+                return result
+        raise error
+
+    def _pick_backup(self, tried: Set[LLMEndpoint], kind: str) -> Tuple[Optional[LLMEndpoint], float]:
+        """选择对冲请求的端点；全部端点都熔断时不发送对冲请求"""
+        try:
+            return self._pick(tried, kind)
+        except CircuitOpenError:
+            return None, 0.0
+
+    async def acall(self, url: str, headers: Dict[str, str], data: Dict[str, Any],
+                    send: Callable[[str, Dict[str, str], Dict[str, Any], float], Awaitable[T]],
+                    default_timeout: float = 30.0, max_retries: int = 3, kind: str = "complete",
+                    priority: Optional[str] = None, cancel_token: Optional[CancellationToken] = None,
+                    deadline: Optional[Deadline] = None) -> T:
+        """
+        call 的 asyncio 版本，对冲时落后的请求任务会被取消
+
+        send 为协程函数，参数为（地址, 请求头, 请求体, 超时），任务被取消时应中断请求；其余参数含义同 call
+        """
+        endpoints = self.endpoints
+        if not endpoints:
+            await rate_limiter.aacquire(url, priority, cancel_token)
+            return await resilience.acall(url, lambda timeout: send(url, headers, data, timeout),
+                                          default_timeout=default_timeout, max_retries=max_retries, kind=kind,
+                                          cancel_token=cancel_token, deadline=deadline)
+
+        primary_base = endpoints[0].api_base
+        request = (url, headers, data)
+        multiple = len(endpoints) > 1
+        tried: Set[LLMEndpoint] = set()
+        last_error: Optional[Exception] = None
+
+        for attempt in range(max(max_retries, len(endpoints))):
+            endpoint = await self._anext_endpoint(tried, attempt, url, kind, cancel_token, deadline)
+            tried.add(endpoint)
+            try:
+                delay = self._hedge_delay(endpoint, kind)
+                if delay is None:
+                    return await self._asend_once(endpoint, request, primary_base, send, default_timeout, kind,
+                                                  priority, cancel_token, deadline)
+                return await self._ahedged_call(endpoint, delay, tried, request, primary_base, send, default_timeout,
+                                                kind, priority, cancel_token, deadline)
+            except Exception as e:
+                last_error = e
+                if not self._can_failover(e, endpoint, multiple):
+                    raise
+                if deadline is not None and deadline.expired:
+                    raise
+                if multiple:
+                    with self._lock:
+                        self._stats["failovers"] += 1
+
+        raise last_error
+
+    async def _ahedged_call(self, endpoint: LLMEndpoint, delay: float, tried: Set[LLMEndpoint],
+                            request: Tuple[str, Dict[str, str], Dict[str, Any]], primary_base: str,
+                            send: Callable[..., Awaitable[T]], default_timeout: float, kind: str,
+                            priority: Optional[str], cancel_token: Optional[CancellationToken] = None,
+                            deadline: Optional[Deadline] = None) -> T:
+        """_hedged_call 的 asyncio 版本"""
+        tasks = {asyncio.ensure_future(
+            self._asend_once(endpoint, request, primary_base, send, default_timeout, kind, priority,
+                             cancel_token, deadline)
+        ): endpoint}
+
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and not (cancel_token is not None and cancel_token.cancelled):
+                backup, wait_time = self._pick_backup(tried, kind)
+                if backup is not None and not wait_time:
+                    tried.add(backup)
+                    self._record_hedge(backup, won=False)
+                    tasks[asyncio.ensure_future(
+                        self._asend_once(backup, request, primary_base, send, default_timeout, kind, priority,
+                                         cancel_token, deadline)
+                    )] = backup
+
+            pending = set(tasks)
+            error: Optional[Exception] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    if tasks[task] is not endpoint:
+                        self._record_hedge(tasks[task], won=True)
+                    return task.result()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取端点池统计信息"""
+        with self._lock:
+            stats = self._stats.copy()
+            stats["endpoints"] = [
+                dict(endpoint.stats, name=endpoint.name, in_flight=endpoint.in_flight,
+                     error_rate=round(endpoint.error_rate, 3), rpm=endpoint.rpm, weight=endpoint.weight)
+                for endpoint in self.endpoints
+            ]
+        stats["hedge"] = self.hedge
+        return stats
@@ -0,0 +1,345 @@
+"""
+HTTP传输模块 - 所有LLM请求共享的长连接池
+
+按端点（scheme://host:port）维护 keep-alive 连接池，避免每轮对话重复进行
+TCP/TLS 握手，并提供启动预热和连接复用统计。
+
+可取消的请求会记录本次使用的连接：取消时直接关闭其套接字，服务器还没返回时
+等待中的读取立即失败，请求不会在后台继续占用线程和连接直到服务器处理完。
+"""
+
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterable, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+import config
+from .cancellation import CancellationToken, OperationCancelled
+
+
+# 当前线程正在发送的可取消请求（由 _RequestHandle 记录其使用的连接）
+_active_request = threading.local()
+
+
+def _shutdown_socket(sock):
+    """关闭套接字读写，唤醒其他线程中阻塞在该套接字上的读取"""
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class _RequestHandle:
+    """一次可取消请求使用的连接；中断后，之后才建立或取出的连接也会被立即关闭"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connections = []
+        self.aborted = False
+
+    def attach(self, connection):
+        with self._lock:
+            if not self.aborted:
+                self._connections.append(connection)
+                return
+        _shutdown_socket(getattr(connection, "sock", None))
+
+    def abort(self):
+        with self._lock:
+            self.aborted = True
+            connections = list(self._connections)
+        for connection in connections:
+            _shutdown_socket(getattr(connection, "sock", None))
+
+
+def _attach_to_active_request(connection):
+    handle = getattr(_active_request, "handle", None)
+    if handle is not None:
+        handle.attach(connection)
+
+
+class _TrackedHTTPConnection(HTTPConnection):
+    def connect(self):
+        super().connect()
+        _attach_to_active_request(self)
+
+
+class _TrackedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        super().connect()
+        _attach_to_active_request(self)
+
+
+class _TrackedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TrackedHTTPConnection
+
+    def _get_conn(self, timeout=None):
+        connection = super()._get_conn(timeout)
+        _attach_to_active_request(connection)
+        return connection
+
+
+class _TrackedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TrackedHTTPSConnection
+
+    def _get_conn(self, timeout=None):
+        connection = super()._get_conn(timeout)
+        _attach_to_active_request(connection)
+        return connection
+
+
+class _TrackedHTTPAdapter(HTTPAdapter):
+    """连接池使用可记录连接的连接类，供可取消请求中断"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TrackedHTTPConnectionPool,
+            "https": _TrackedHTTPSConnectionPool
+        }
+
+
+class HTTPTransport:
+    """共享HTTP传输层"""
+
+    def __init__(self, pool_connections: int = None, pool_maxsize: int = None):
+        """
+        初始化传输层
+
+        Args:
+            pool_connections: 每个端点缓存的连接池数量
+            pool_maxsize: 每个连接池保持的最大连接数
+        """
+        self.pool_connections = pool_connections or getattr(config, "HTTP_POOL_CONNECTIONS", 4)
+        self.pool_maxsize = pool_maxsize or getattr(config, "HTTP_POOL_MAXSIZE", 10)
+
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self._stats = {
+            "total_requests": 0,
+            "failed_requests": 0,
+            "cancelled_requests": 0,
+            "warmed_endpoints": 0
+        }
+
+    @staticmethod
+    def _endpoint_key(url: str) -> str:
+        """提取端点标识（scheme://netloc）"""
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def _create_session(self) -> requests.Session:
+        """创建带连接池的会话"""
+        session = requests.Session()
+        adapter = _TrackedHTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def get_session(self, url: str) -> requests.Session:
+        """获取端点对应的共享会话（不存在则创建）"""
+        key = self._endpoint_key(url)
+        session = self._sessions.get(key)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is None:
+                    session = self._create_session()
+                    self._sessions[key] = session
+        return session
+
+    def post(self, url: str, cancel_token: Optional[CancellationToken] = None, **kwargs) -> requests.Response:
+        """
+        通过共享连接池发送POST请求
+
+        Args:
+            url: 请求地址
+            cancel_token: 取消令牌；取消时关闭请求的连接并立即抛出 OperationCancelled
+            **kwargs: 透传给 requests.Session.post 的参数
+
+        Returns:
+            requests.Response
+        """
+        session = self.get_session(url)
+        with self._lock:
+            self._stats["total_requests"] += 1
+
+        try:
+            if cancel_token is None:
+                return session.post(url, **kwargs)
+            return self._post_cancellable(session, url, cancel_token, **kwargs)
+        except requests.exceptions.RequestException:
+            with self._lock:
+                self._stats["failed_requests"] += 1
+            raise
+
+    def _post_cancellable(self, session: requests.Session, url: str, cancel_token: CancellationToken,
+                          **kwargs) -> requests.Response:
+        """
+        在工作线程中发送请求，调用方等待时可被取消
+
+        取消时关闭请求使用的连接，工作线程中等待响应头或读取响应体的操作随即失败退出。
+        非流式请求的响应体也在工作线程中读取，读取期间同样可以中断。
+        """
+        cancel_token.raise_if_cancelled()
+        stream = kwargs.pop("stream", False)
+        handle = _RequestHandle()
+
+        def _send() -> requests.Response:
+            _active_request.handle = handle
+            try:
+                response = session.post(url, stream=True, **kwargs)
+                if not stream:
+                    try:
+                        response.content
+                    except BaseException:
+                        response.close()
+                        raise
+                return response
+            finally:
+                _active_request.handle = None
+
+        future = self._get_executor().submit(_send)
+        callback = cancel_token.register(handle.abort)
+        try:
+            return cancel_token.wait_future(future)
+        except OperationCancelled:
+            with self._lock:
+                self._stats["cancelled_requests"] += 1
+            # 连接已关闭；若响应已到达，同样关闭
+            future.add_done_callback(lambda f: f.exception() is None and f.result().close())
+            raise
+        except Exception:
+            # 连接被关闭导致的请求失败先于取消信号返回
+            if cancel_token.cancelled:
+                with self._lock:
+                    self._stats["cancelled_requests"] += 1
+                raise OperationCancelled(cancel_token.reason) from None
+            raise
+        finally:
+            cancel_token.unregister(callback)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """可取消请求使用的线程池"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.pool_maxsize, thread_name_prefix="http-transport"
+                    )
+        return self._executor
+
+    @staticmethod
+    def abort(response: requests.Response):
+        """
+        中断流式响应：先关闭底层套接字的读写，使其他线程中阻塞的读取立即返回，再关闭响应
+
+        仅 response.close() 无法唤醒正在等待数据的读取。
+        """
+        connection = getattr(response.raw, "_connection", None)
+        _shutdown_socket(getattr(connection, "sock", None))
+        response.close()
+
+    def warm_up(self, urls: Iterable[str], timeout: float = 5, background: bool = True):
+        """
+        预热连接：提前完成TCP/TLS握手并放入连接池
+
+        Args:
+            urls: 需要预热的端点地址
+            timeout: 单个端点的预热超时时间（秒）
+            background: 是否在后台线程中执行
+        """
+        endpoints = []
+        for url in urls:
+            if url and url.startswith(("http://", "https://")):
+                key = self._endpoint_key(url)
+                if key not in endpoints:
+                    endpoints.append(key)
+
+        if not endpoints:
+            return
+
+        def _warm():
+            for endpoint in endpoints:
+                start_time = time.time()
+                try:
+                    # 只关心连接建立，不关心响应状态码
+                    self.get_session(endpoint).head(endpoint, timeout=timeout)
+                    with self._lock:
+                        self._stats["warmed_endpoints"] += 1
+                    print(f"🔥 连接预热完成: {endpoint} ({time.time() - start_time:.2f}s)")
+                except requests.exceptions.RequestException as e:
+                    print(f"⚠️ 连接预热失败: {endpoint}: {e}")
+
+        if background:
+            threading.Thread(target=_warm, name="http-warm-up", daemon=True).start()
+        else:
+            _warm()
+
+    def configure(self, pool_connections: Optional[int] = None, pool_maxsize: Optional[int] = None):
+        """
+        调整连接池大小，已有会话会被关闭并在下次请求时按新配置重建
+
+        Args:
+            pool_connections: 每个端点缓存的连接池数量
+            pool_maxsize: 每个连接池保持的最大连接数
+        """
+        if pool_connections:
+            self.pool_connections = pool_connections
+        if pool_maxsize:
+            self.pool_maxsize = pool_maxsize
+        self.close()
+
+    def close(self):
+        """关闭所有会话及其连接"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+
+        for session in sessions:
+            session.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取连接复用统计"""
+        with self._lock:
+            stats = self._stats.copy()
+            sessions = dict(self._sessions)
+
+        new_connections = 0
+        pooled_requests = 0
+        for session in sessions.values():
+            for adapter in set(session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for key in list(pools.keys()):
+                    pool = pools.get(key)
+                    if pool is None:
+                        continue
+                    new_connections += pool.num_connections
+                    pooled_requests += pool.num_requests
+
+        stats["endpoints"] = list(sessions.keys())
+        stats["pool_connections"] = self.pool_connections
+        stats["pool_maxsize"] = self.pool_maxsize
+        stats["new_connections"] = new_connections
+        stats["reused_connections"] = max(pooled_requests - new_connections, 0)
+        stats["connection_reuse_rate"] = (
+            stats["reused_connections"] / pooled_requests if pooled_requests else 0.0
+        )
+        return stats
+
+
+# 全局HTTP传输实例
+http_transport = HTTPTransport()
@@ -5,24 +5,131 @@
 import os
 import json
 import time
+import queue
+import asyncio
+import threading
 import requests
-from typing import Optional, Dict, Any, List
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Iterator, AsyncIterator, Tuple
 import config
 from .config_manager import config_manager
+from .http_transport import http_transport
+from .async_transport import async_transport
+from .response_cache import response_cache
+from .context_manager import ContextManager, TokenUsageTracker
+from .conversation_summary import ConversationSummarizer
+from .resilience import resilience
+from .endpoint_pool import EndpointPool
+from .single_flight import single_flight
+from .cancellation import CancellationToken, OperationCancelled, await_cancellable, check_cancelled, child_token
+from .deadline import Deadline
+from .rate_limiter import rate_limiter, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from .model_router import model_router, TASK_CHAT, TASK_SUMMARY, TASK_BACKGROUND
+from .prompt_cache import system_prompt_cache, SYSTEM_PROMPT_PATH, MEMC_PATH
+
+
+# SSE 流结束标记
+SSE_DONE = object()
+
+
+class SpeculativeResponse:
+    """推测执行的完整回复：后台生成，被丢弃时取消其专属令牌，中断进行中的请求并关闭连接"""
+    
+    def __init__(self, fn, executor: ThreadPoolExecutor, cancel_token: CancellationToken):
+        """
+        启动后台生成
+        
+        Args:
+            fn: 生成回复的函数，返回（回复, 耗时）
+            executor: 执行生成任务的线程池
+            cancel_token: 推测请求专属的取消令牌（本轮令牌的子令牌）
+        """
+        self.cancel_token = cancel_token
+        self._future = executor.submit(fn)
+    
+    def result(self) -> Tuple[str, float]:
+        """等待并返回（回复, 耗时）"""
+        return self._future.result()
+    
+    def cancel(self):
+        """丢弃推测结果：尚未开始则直接取消，已开始则中断请求"""
+        self._future.cancel()
+        self.cancel_token.cancel("推测回复已丢弃")
+
+
+class SpeculativeStream:
+    """推测执行的流式回复：后台预先拉取文本片段，被采纳时按序回放，被丢弃时停止拉取并关闭连接"""
+    
+    _END = object()
+    
+    def __init__(self, stream: Iterator[str], executor: ThreadPoolExecutor,
+                 cancel_token: Optional[CancellationToken] = None):
+        """
+        启动后台拉取
+        
+        Args:
+            stream: 流式回复生成器（尚未开始迭代）
+            executor: 执行拉取任务的线程池
+            cancel_token: 推测请求专属的取消令牌，丢弃时取消以关闭连接（含尚未返回首个片段的请求）
+        """
+        self.started_at = time.time()
+        self.first_chunk_at = None
+        self.cancel_token = cancel_token
+        self._queue = queue.Queue()
+        self._cancelled = threading.Event()
+        self._future = executor.submit(self._produce, stream)
+    
+    def _produce(self, stream: Iterator[str]):
+        """后台线程：逐段拉取并放入队列"""
+        try:
+            for chunk in stream:
+                if self._cancelled.is_set():
+                    break
+                if self.first_chunk_at is None:
+                    self.first_chunk_at = time.time()
+                self._queue.put(chunk)
+        except (Exception, OperationCancelled) as e:
+            # 本轮被取消时把取消转交给回放方
+            self._queue.put(e)
+        finally:
+            # 关闭生成器，触发其 finally 中的连接关闭
+            stream.close()
+            self._queue.put(self._END)
+    
+    def cancel(self):
+        """丢弃推测结果：尚未开始则直接取消，已开始则中断连接"""
+        self._cancelled.set()
+        self._future.cancel()
+        if self.cancel_token is not None:
+            self.cancel_token.cancel("推测回复已丢弃")
+    
+    def __iter__(self) -> Iterator[str]:
+        while True:
+            item = self._queue.get()
+            if item is self._END:
+                return
+            if isinstance(item, (Exception, OperationCancelled)):
+                raise item
+            yield item
 
 
 class LLMClient:
     """大模型客户端"""
     
-    def __init__(self, api_type="openai", model_name=None):
+    def __init__(self, api_type="openai", model_name=None, session_id: Optional[str] = None,
+                 priority: str = PRIORITY_INTERACTIVE):
         """
         初始化LLM客户端
         
         Args:
             api_type: API类型 ("openai", "huggingface", "mock")
             model_name: 模型名称
+            session_id: 会话标识；指定后移出历史窗口的对话会折叠进按会话持久化的滚动摘要
+            priority: 限流优先级；记忆编码等后台任务使用 PRIORITY_BACKGROUND，为用户对话让路
         """
         self.api_type = api_type
+        self.priority = priority
         
         # 配置缓存 - 必须在其他方法调用之前初始化
         self._config_cache = None
@@ -35,17 +142,49 @@ class LLMClient:
         self.api_key = self._get_api_key()
         self.api_base = self._get_api_base()
         
-        # 请求配置
+        # 请求配置：timeout 为延迟样本不足时的默认超时，之后按端点延迟分位数自适应；
+        # 重试采用指数退避 + 抖动，端点连续失败时熔断（见 core/resilience.py）
         self.timeout = 30
         self.max_retries = 3
-        self.retry_delay = 1
+        
+        # 单轮预算：意图各阶段共享 turn_deadline - turn_reply_reserve，超出时降级为普通聊天；
+        # 最终回复在预算用完后不再重试
+        self.turn_deadline = getattr(config, "TURN_DEADLINE", 8.0)
+        self.turn_reply_reserve = getattr(config, "TURN_REPLY_RESERVE", 3.0)
+        
+        # 端点池：配置了多个端点/密钥时按健康和延迟分配请求，并支持故障转移和对冲请求
+        self.endpoint_pool = EndpointPool.from_config()
+        
+        # 采样参数（temperature 为 0 时自动启用响应缓存）
+        self.temperature = 0.7
+        self.top_p = 0.9
+        self.max_tokens = 500
         
         # 会话历史
         self.conversation_history = []
         self.max_history = 10
         
-        # system_prompt 不再在init时静态赋值
-        # self.system_prompt = self._get_system_prompt()
+        # 上下文预算：系统提示词、潜意识和历史按优先级装入token预算
+        self.context_manager = ContextManager()
+        self.token_usage = TokenUsageTracker()
+        
+        # 滚动摘要：被移出历史窗口的对话在后台折叠进摘要
+        self.summarizer = ConversationSummarizer(session_id, self._summarize) if session_id else None
+        
+        # 推测执行：意图处理期间并行生成普通聊天回复，意图不需要工具输出时直接采用
+        self.speculative_response = getattr(config, "LLM_SPECULATIVE_RESPONSE", True)
+        self._speculation_executor = None
+        self._speculation_stats = {
+            "launched": 0,
+            "kept": 0,
+            "discarded": 0,
+            "failed": 0,
+            "saved_seconds": 0.0
+        }
+        
+        # system_prompt 不再在init时静态赋值，由 system_prompt_cache 按文件变化重新加载
+        # 仅在 set_system_prompt 显式指定时使用覆盖值
+        self._system_prompt_override = None
     
     def _get_default_model(self) -> str:
         """获取默认模型名称"""
@@ -99,34 +238,35 @@ class LLMClient:
     
     def _get_system_prompt(self) -> str:
         """获取完整的系统提示词，包含AI灵魂（systemprompt.txt）和潜意识（memC.txt）"""
-        import os
-        import sys
+        # 1. 从缓存获取AI灵魂和潜意识，文件未变化时不产生任何读取
+        system_prompt, memc_content = system_prompt_cache.get(self._load_prompt_parts)
         
+        # 2. 组合完整的系统提示词
+        if memc_content:
+            return f"{system_prompt}\n\n# 潜意识记忆\n{memc_content}"
+        return system_prompt
+    
+    def _load_prompt_parts(self) -> Tuple[str, str]:
+        """从磁盘加载AI灵魂和潜意识（仅在缓存失效时调用）"""
         # 1. 加载AI灵魂（系统提示词）
         system_prompt = self._load_ai_soul()
         
         # 2. 加载AI潜意识（memC记忆）
         memc_content = self._load_ai_subconscious()
         
-        # 3. 组合完整的系统提示词
         if memc_content:
-            complete_prompt = f"{system_prompt}\n\n# 潜意识记忆\n{memc_content}"
             print(f"✅ 完整系统提示词: AI灵魂({len(system_prompt)}字符) + 潜意识({len(memc_content)}字符)")
         else:
-            complete_prompt = system_prompt
             print(f"✅ 系统提示词: AI灵魂({len(system_prompt)}字符) + 无潜意识记忆")
         
-        return complete_prompt
+        return system_prompt, memc_content
     
     def _load_ai_soul(self) -> str:
         """加载AI灵魂（系统提示词）"""
-        import os
         import sys
         
-        system_prompt_path = os.path.join(os.path.dirname(__file__), '../MemABC/systemprompt.txt')
-        
         try:
-            with open(system_prompt_path, 'r', encoding='utf-8') as f:
+            with open(SYSTEM_PROMPT_PATH, 'r', encoding='utf-8') as f:
                 system_prompt = f.read().strip()
             
             if system_prompt:
@@ -148,12 +288,8 @@ class LLMClient:
     
     def _load_ai_subconscious(self) -> str:
         """加载AI潜意识（memC记忆）"""
-        import os
-        
-        memc_path = os.path.join(os.path.dirname(__file__), '../MemABC/memC/memC.txt')
-        
         try:
-            with open(memc_path, 'r', encoding='utf-8') as f:
+            with open(MEMC_PATH, 'r', encoding='utf-8') as f:
                 memc_content = f.read().strip()
             
             if memc_content:
@@ -175,139 +311,608 @@ class LLMClient:
     @property
     def system_prompt(self):
         """
-        每次访问都动态读取memC内容，保证潜意识最新
+        系统提示词，文件变化后自动重新加载，保证潜意识最新
         """
+        if self._system_prompt_override is not None:
+            return self._system_prompt_override
         return self._get_system_prompt()
     
-    def get_response(self, message: str) -> str:
+    @system_prompt.setter
+    def system_prompt(self, prompt: Optional[str]):
+        """显式覆盖系统提示词，设置为None时恢复从文件加载"""
+        self._system_prompt_override = prompt
+    
+    def get_response(self, message: str, cacheable: Optional[bool] = None,
+                     cancel_token: Optional[CancellationToken] = None, deadline: Optional[Deadline] = None,
+                     intent_type: Optional[str] = None) -> str:
         """
         获取模型响应
         
         Args:
             message: 用户消息
+            cacheable: 是否使用响应缓存；默认仅在 temperature 为 0 时使用
+            cancel_token: 取消令牌，取消时抛出 OperationCancelled（不返回备用响应）
+            deadline: 本轮截止时间，限制超时和重试
+            intent_type: 意图类型，供模型路由选择档位；未经意图识别时为None
             
         Returns:
             模型响应文本
         """
         try:
-            if self.api_type == "openai":
-                return self._call_openai_api(message)
-            elif self.api_type == "huggingface":
-                return self._call_huggingface_api(message)
-            elif self.api_type == "mock":
-                return self._get_mock_response(message)
-            else:
-                raise ValueError(f"不支持的API类型: {self.api_type}")
+            return self._complete(message, cacheable=cacheable, cancel_token=cancel_token, deadline=deadline,
+                                  intent_type=intent_type)
                 
         except Exception as e:
             print(f"❌ 获取模型响应失败: {e}")
             return self._get_fallback_response(message)
     
-    def _call_openai_api(self, message: str) -> str:
-        """调用OpenAI API"""
-        if not self.api_key:
-            raise ValueError("OpenAI API密钥未设置")
+    def _complete(self, message: str, update_history: bool = True, cacheable: Optional[bool] = None,
+                  cancel_token: Optional[CancellationToken] = None, deadline: Optional[Deadline] = None,
+                  intent_type: Optional[str] = None) -> str:
+        """
+        按API类型获取完整回复，失败时抛出异常
         
-        # 构建消息列表
-        messages = [{"role": "system", "content": self.system_prompt}]
+        Args:
+            message: 用户消息
+            update_history: 是否写入对话历史（推测执行时由采纳方决定）
+            cacheable: 是否使用响应缓存
+            cancel_token: 取消令牌
+            deadline: 本轮截止时间
+            intent_type: 意图类型（模型路由）
+        """
+        check_cancelled(cancel_token)
+        if self.api_type == "mock":
+            return self._get_mock_response(message)
+        return self._call_api(message, update_history, cacheable, cancel_token, deadline, intent_type)
+    
+    def _use_response_cache(self, cacheable: Optional[bool]) -> bool:
+        """判断本次调用是否使用响应缓存：显式声明优先，否则仅确定性采样（temperature=0）时使用"""
+        if cacheable is not None:
+            return cacheable
+        return self.temperature == 0
+    
+    def _response_cache_key(self, url: str, data: Dict[str, Any]) -> str:
+        """缓存键：请求体已包含模型、系统提示词、历史窗口、用户消息和采样参数"""
+        return response_cache.make_key(api_type=self.api_type, url=url, data=data)
+    
+    def _lookup_cached_response(self, message: str, key: Optional[str], update_history: bool) -> Optional[str]:
+        """查询响应缓存，命中时按需更新对话历史"""
+        if key is None:
+            return None
+        
+        cached = response_cache.get(key)
+        if cached is not None:
+            print("💾 命中响应缓存")
+            if update_history:
+                self._update_conversation_history(message, cached)
+        return cached
+    
+    def stream_response(self, message: str, cancel_token: Optional[CancellationToken] = None,
+                        deadline: Optional[Deadline] = None, intent_type: Optional[str] = None) -> Iterator[str]:
+        """
+        流式获取模型响应，逐段产出生成的文本
+        
+        对话历史在生成结束后只更新一次（完整文本）。
+        
+        Args:
+            message: 用户消息
+            cancel_token: 取消令牌，取消时关闭连接并抛出 OperationCancelled（不写入对话历史）
+            deadline: 本轮截止时间，限制建立连接的超时和重试
+            intent_type: 意图类型，供模型路由选择档位
+            
+        Yields:
+            模型生成的文本片段
+        """
+        yielded = False
+        try:
+            for chunk in self._open_response_stream(message, cancel_token=cancel_token, deadline=deadline,
+                                                    intent_type=intent_type):
+                yielded = True
+                yield chunk
+            
+            if not yielded:
+                raise ValueError("流式响应为空")
+                
+        except Exception as e:
+            print(f"❌ 流式获取模型响应失败: {e}")
+            # 已经输出部分内容时不再追加备用响应，避免气泡内容错乱
+            if not yielded:
+                yield self._get_fallback_response(message)
+    
+    def _open_response_stream(self, message: str, update_history: bool = True,
+                              cancel_token: Optional[CancellationToken] = None,
+                              deadline: Optional[Deadline] = None,
+                              intent_type: Optional[str] = None) -> Iterator[str]:
+        """按API类型创建流式回复生成器"""
+        if self.api_type == "mock":
+            return self._stream_mock_response(message, update_history, cancel_token)
+        return self._stream_api(message, update_history, cancel_token, deadline, intent_type)
+    
+    def _get_prompt_parts(self) -> Tuple[str, str]:
+        """获取（AI灵魂, 潜意识）；显式覆盖系统提示词时不再附加潜意识"""
+        if self._system_prompt_override is not None:
+            return self._system_prompt_override, ""
+        return system_prompt_cache.get(self._load_prompt_parts)
+    
+    def _pack_context(self, message: str, history: List[Dict[str, str]], completion_tokens: int,
+                      max_context_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """按token预算组装系统提示词、潜意识、历史和当前消息，并记录本次用量"""
+        soul, memc_content = self._get_prompt_parts()
+        summary = self.summarizer.summary if self.summarizer is not None else ""
+        packed = self.context_manager.pack(
+            soul, memc_content, history, message, completion_tokens, summary=summary,
+            max_context_tokens=max_context_tokens
+        )
+        
+        usage = packed["usage"]
+        if usage["truncated"]:
+            print(f"✂️ 上下文超出预算，已截断: {', '.join(usage['truncated'])}")
+        self.token_usage.record_prompt(usage)
+        return packed
+    
+    def _build_openai_messages(self, message: str, max_context_tokens: Optional[int] = None) -> List[Dict[str, str]]:
+        """构建OpenAI消息列表（系统提示词 + 对话摘要 + 历史对话 + 当前消息），总量受token预算约束"""
+        packed = self._pack_context(message, self.conversation_history, self.max_tokens, max_context_tokens)
+        
+        messages = [{"role": "system", "content": packed["system"]}]
+        
+        # 早先对话的滚动摘要作为单独一条消息注入
+        if packed["summary"]:
+            messages.append({"role": "system", "content": f"# 早先对话摘要\n{packed['summary']}"})
         
         # 添加历史对话
-        for hist in self.conversation_history[-self.max_history:]:
-            messages.append(hist)
+        messages.extend(packed["history"])
         
         # 添加当前消息
-        messages.append({"role": "user", "content": message})
+        messages.append({"role": "user", "content": packed["message"]})
+        return messages
+    
+    def _route_model(self, url: str, message: str, intent_type: Optional[str] = None,
+                     deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """按意图类型、消息长度、所需上下文和近期延迟为本次请求选择模型（见 core/model_router.py）"""
+        soul, memc_content = self._get_prompt_parts()
+        summary = self.summarizer.summary if self.summarizer is not None else ""
+        required = self.context_manager.required_tokens(soul, memc_content, message, self.max_tokens, summary=summary)
+        route = model_router.route(
+            self.model_name, url, message,
+            task=TASK_BACKGROUND if self.priority == PRIORITY_BACKGROUND else TASK_CHAT,
+            intent_type=intent_type, required_tokens=required,
+            default_context=self.context_manager.max_context_tokens,
+            latency_budget=max(deadline.remaining(), deadline.min_timeout) if deadline is not None else None
+        )
+        if route["model"] != self.model_name:
+            print(f"🧭 模型路由: {route['tier']} → {route['model']}（{route['reason']}）")
+        return route
+    
+    def _build_openai_request(self, message: str, stream: bool = False, intent_type: Optional[str] = None,
+                              deadline: Optional[Deadline] = None) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+        """构建OpenAI请求（地址、请求头、请求体），同步与异步接口共用"""
+        if not self.api_key:
+            raise ValueError("OpenAI API密钥未设置")
+        
+        url = f"{self.api_base}/chat/completions"
+        route = self._route_model(url, message, intent_type, deadline)
         
         # 构建请求数据
         data = {
-            "model": self.model_name,
-            "messages": messages,
-            "max_tokens": 500,
-            "temperature": 0.7,
-            "top_p": 0.9
+            "model": route["model"],
+            "messages": self._build_openai_messages(message, route["context_tokens"]),
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "top_p": self.top_p
         }
         
-        # 发送请求
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
         
-        for attempt in range(self.max_retries):
-            try:
-                response = requests.post(
-                    f"{self.api_base}/chat/completions",
-                    headers=headers,
-                    json=data,
-                    timeout=self.timeout
-                )
-                response.raise_for_status()
-                
-                result = response.json()
-                assistant_message = result["choices"][0]["message"]["content"]
-                
-                # 更新对话历史
-                self._update_conversation_history(message, assistant_message)
-                
-                return assistant_message
-                
-            except requests.exceptions.RequestException as e:
-                if attempt == self.max_retries - 1:
-                    raise e
-                time.sleep(self.retry_delay * (attempt + 1))
+        if stream:
+            data["stream"] = True
+            headers["Accept"] = "text/event-stream"
+        
+        return url, headers, data
     
-    def _call_huggingface_api(self, message: str) -> str:
-        """调用HuggingFace API"""
+    def _build_huggingface_request(self, message: str, stream: bool = False) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+        """构建HuggingFace请求（地址、请求头、请求体），同步与异步接口共用"""
         if not self.api_key:
             raise ValueError("HuggingFace API密钥未设置")
         
         # 构建提示词
-        prompt = f"{self.system_prompt}\n\n用户: {message}\n小喵:"
+        packed = self._pack_context(message, [], 200)
+        summary = f"\n\n# 早先对话摘要\n{packed['summary']}" if packed["summary"] else ""
+        prompt = f"{packed['system']}{summary}\n\n用户: {packed['message']}\n小喵:"
         
         # 构建请求数据
         data = {
             "inputs": prompt,
             "parameters": {
                 "max_new_tokens": 200,
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "do_sample": True
+                "top_p": self.top_p,
+                "do_sample": self.temperature > 0
             }
         }
+        # HuggingFace 不接受 temperature=0，贪心解码通过 do_sample=False 表达
+        if self.temperature > 0:
+            data["parameters"]["temperature"] = self.temperature
         
-        # 发送请求
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
         
-        for attempt in range(self.max_retries):
+        if stream:
+            data["parameters"]["return_full_text"] = False
+            data["stream"] = True
+            headers["Accept"] = "text/event-stream"
+        
+        return f"{self.api_base}/models/{self.model_name}", headers, data
+    
+    def _build_request(self, message: str, stream: bool = False, intent_type: Optional[str] = None,
+                       deadline: Optional[Deadline] = None) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+        """按API类型构建请求（OpenAI 请求按模型路由选择模型）"""
+        if self.api_type == "openai":
+            return self._build_openai_request(message, stream, intent_type, deadline)
+        elif self.api_type == "huggingface":
+            return self._build_huggingface_request(message, stream)
+        else:
+            raise ValueError(f"不支持的API类型: {self.api_type}")
+    
+    def _parse_response(self, result: Any) -> str:
+        """从完整响应中提取回复文本"""
+        if self.api_type == "openai":
+            return result["choices"][0]["message"]["content"]
+        
+        assistant_message = result[0]["generated_text"]
+        
+        # 提取回复部分
+        if "小喵:" in assistant_message:
+            assistant_message = assistant_message.split("小喵:")[-1].strip()
+        return assistant_message
+    
+    def _record_completion_usage(self, assistant_message: str, result: Any = None):
+        """记录回复用量，服务端返回 usage 时以服务端数据为准"""
+        provider_usage = result.get("usage") if isinstance(result, dict) else None
+        self.token_usage.record_completion(assistant_message, provider_usage)
+    
+    def _parse_stream_chunk(self, payload: Dict[str, Any]) -> Optional[str]:
+        """从SSE事件中提取文本片段"""
+        if self.api_type == "openai":
+            choices = payload.get("choices") or []
+            if not choices:
+                return None
+            return (choices[0].get("delta") or {}).get("content")
+        
+        token = payload.get("token") or {}
+        if token.get("special"):
+            return None
+        return token.get("text")
+    
+    def _finish_stream_text(self, chunks: List[str]) -> str:
+        """拼接流式片段作为写入对话历史的完整回复"""
+        text = "".join(chunks)
+        return text.strip() if self.api_type == "huggingface" else text
+    
+    def _call_api(self, message: str, update_history: bool = True, cacheable: Optional[bool] = None,
+                  cancel_token: Optional[CancellationToken] = None, deadline: Optional[Deadline] = None,
+                  intent_type: Optional[str] = None) -> str:
+        """发送请求（失败时按退避重试），解析回复并更新对话历史"""
+        url, headers, data = self._build_request(message, intent_type=intent_type, deadline=deadline)
+        
+        cache_key = self._response_cache_key(url, data) if self._use_response_cache(cacheable) else None
+        cached = self._lookup_cached_response(message, cache_key, update_history)
+        if cached is not None:
+            return cached
+        
+        # 相同请求正在进行时直接等待其结果
+        result = single_flight.do(
+            single_flight.make_key(url=url, data=data),
+            lambda: self._get_endpoint_pool().call(
+                url, headers, data, self._timed_send(self._post_json),
+                default_timeout=self.timeout, max_retries=self.max_retries,
+                priority=self.priority, cancel_token=cancel_token, deadline=deadline
+            ),
+            cancel_token=cancel_token
+        )
+        assistant_message = self._parse_response(result)
+        self._record_completion_usage(assistant_message, result)
+        if cache_key is not None:
+            response_cache.put(cache_key, assistant_message)
+        
+        # 更新对话历史
+        if update_history:
+            self._update_conversation_history(message, assistant_message)
+        
+        return assistant_message
+    
+    def _stream_api(self, message: str, update_history: bool = True,
+                    cancel_token: Optional[CancellationToken] = None,
+                    deadline: Optional[Deadline] = None, intent_type: Optional[str] = None) -> Iterator[str]:
+        """以SSE流式方式调用API，生成结束后一次性更新对话历史"""
+        url, headers, data = self._build_request(message, stream=True, intent_type=intent_type, deadline=deadline)
+        
+        response = self._open_stream(url, headers, data, cancel_token, deadline)
+        # 取消时中断连接，阻塞中的读取立即返回
+        handle = cancel_token.register(lambda: http_transport.abort(response)) if cancel_token is not None else None
+        chunks = []
+        try:
+            for payload in self._iter_sse_payloads(response):
+                check_cancelled(cancel_token)
+                text = self._parse_stream_chunk(payload)
+                if text:
+                    chunks.append(text)
+                    yield text
+        except Exception:
+            # 连接被取消回调关闭导致的读取错误按取消处理
+            check_cancelled(cancel_token)
+            raise
+        finally:
+            if cancel_token is not None:
+                cancel_token.unregister(handle)
+            response.close()
+        
+        # 被取消的回复不完整，不计入用量也不写入对话历史
+        check_cancelled(cancel_token)
+        self._record_completion_usage("".join(chunks))
+        
+        # 生成结束后一次性更新对话历史
+        if update_history:
+            self._update_conversation_history(message, self._finish_stream_text(chunks))
+    
+    def _stream_mock_response(self, message: str, update_history: bool = True,
+                              cancel_token: Optional[CancellationToken] = None) -> Iterator[str]:
+        """模拟流式响应，逐字产出"""
+        response = self._get_mock_response(message)
+        for char in response:
+            check_cancelled(cancel_token)
+            yield char
+        if update_history:
+            self._update_conversation_history(message, response)
+    
+    def _open_stream(self, url: str, headers: Dict[str, str], data: Dict[str, Any],
+                     cancel_token: Optional[CancellationToken] = None, deadline: Optional[Deadline] = None):
+        """建立流式连接，仅在收到首个字节前重试"""
+        def _send(url: str, headers: Dict[str, str], data: Dict[str, Any], timeout: float,
+                  attempt_token: Optional[CancellationToken] = None):
+            response = http_transport.post(
+                url, cancel_token=attempt_token, headers=headers, json=data, timeout=timeout, stream=True
+            )
             try:
-                response = requests.post(
-                    f"{self.api_base}/models/{self.model_name}",
-                    headers=headers,
-                    json=data,
-                    timeout=self.timeout
-                )
                 response.raise_for_status()
+            except requests.exceptions.HTTPError:
+                response.close()
+                raise
+            return response
+        
+        return self._get_endpoint_pool().call(
+            url, headers, data, self._timed_send(_send), default_timeout=self.timeout, max_retries=self.max_retries, kind="stream",
+            priority=self.priority, cancel_token=cancel_token, deadline=deadline
+        )
+    
+    def _get_endpoint_pool(self) -> EndpointPool:
+        """获取端点池，并同步当前配置的主端点"""
+        self.endpoint_pool.set_primary(self.api_base, self.api_key)
+        return self.endpoint_pool
+    
+    @staticmethod
+    @contextmanager
+    def _track_model_latency(data: Dict[str, Any], timeout: float):
+        """记录本次尝试实际请求的模型（端点可能覆盖模型）的延迟，供模型路由参考；失败的尝试仅超时时计入"""
+        model = data.get("model")
+        start_time = time.time()
+        try:
+            yield
+        except BaseException:
+            elapsed = time.time() - start_time
+            if model and elapsed >= timeout:
+                model_router.record_latency(model, elapsed)
+            raise
+        if model:
+            model_router.record_latency(model, time.time() - start_time)
+    
+    @classmethod
+    def _timed_send(cls, send):
+        """包装端点池的发送函数，记录每次尝试的模型延迟（流式请求为首字节延迟）"""
+        def _send(url: str, headers: Dict[str, str], data: Dict[str, Any], timeout: float,
+                  cancel_token: Optional[CancellationToken] = None):
+            with cls._track_model_latency(data, timeout):
+                return send(url, headers, data, timeout, cancel_token)
+        return _send
+    
+    @staticmethod
+    def _post_json(url: str, headers: Dict[str, str], data: Dict[str, Any], timeout: float,
+                   cancel_token: Optional[CancellationToken] = None) -> Any:
+        """发送非流式请求并返回JSON结果"""
+        response = http_transport.post(url, cancel_token=cancel_token, headers=headers, json=data, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+    
+    @staticmethod
+    def _parse_sse_line(line: str) -> Any:
+        """
+        解析一行SSE事件
+        
+        Returns:
+            data字段中的JSON对象；流结束返回 SSE_DONE；非数据行或无法解析时返回None
+        """
+        if not line or not line.startswith("data:"):
+            return None
+        
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            return SSE_DONE
+        
+        try:
+            return json.loads(payload)
+        except json.JSONDecodeError:
+            return None
+    
+    @classmethod
+    def _iter_sse_payloads(cls, response) -> Iterator[Dict[str, Any]]:
+        """解析SSE事件流，逐个返回data字段中的JSON对象"""
+        for line in response.iter_lines(decode_unicode=True):
+            payload = cls._parse_sse_line(line)
+            if payload is SSE_DONE:
+                break
+            if payload is not None:
+                yield payload
+    
+    async def aget_response(self, message: str, cacheable: Optional[bool] = None,
+                            intent_type: Optional[str] = None, cancel_token: Optional[CancellationToken] = None,
+                            deadline: Optional[Deadline] = None) -> str:
+        """
+        异步获取模型响应（get_response 的 asyncio 版本）
+        
+        取消任务时 asyncio.CancelledError 会直接向上传播，并中断正在进行的请求和退避等待。
+        
+        Args:
+            message: 用户消息
+            cacheable: 是否使用响应缓存；默认仅在 temperature 为 0 时使用
+            intent_type: 意图类型，供模型路由选择档位
+            cancel_token: 取消令牌，取消时中断请求并抛出 OperationCancelled（不返回备用响应）
+            deadline: 本轮截止时间，限制超时和重试
+            
+        Returns:
+            模型响应文本
+        """
+        try:
+            return await self._acomplete(message, cacheable=cacheable, cancel_token=cancel_token, deadline=deadline,
+                                         intent_type=intent_type)
                 
-                result = response.json()
-                assistant_message = result[0]["generated_text"]
-                
-                # 提取回复部分
-                if "小喵:" in assistant_message:
-                    assistant_message = assistant_message.split("小喵:")[-1].strip()
-                
-                # 更新对话历史
-                self._update_conversation_history(message, assistant_message)
-                
-                return assistant_message
+        except Exception as e:
+            print(f"❌ 获取模型响应失败: {e}")
+            return self._get_fallback_response(message)
+    
+    async def _acomplete(self, message: str, update_history: bool = True, cacheable: Optional[bool] = None,
+                         cancel_token: Optional[CancellationToken] = None, deadline: Optional[Deadline] = None,
+                         intent_type: Optional[str] = None) -> str:
+        """异步按API类型获取完整回复，失败时抛出异常（响应缓存的 SQLite 读写在线程中进行）"""
+        check_cancelled(cancel_token)
+        if self.api_type == "mock":
+            return self._get_mock_response(message)
+        
+        url, headers, data = self._build_request(message, intent_type=intent_type, deadline=deadline)
+        
+        cache_key = self._response_cache_key(url, data) if self._use_response_cache(cacheable) else None
+        cached = await asyncio.to_thread(self._lookup_cached_response, message, cache_key, update_history)
+        if cached is not None:
+            return cached
+        
+        async def _send(url: str, headers: Dict[str, str], data: Dict[str, Any], timeout: float):
+            with self._track_model_latency(data, timeout):
+                return await async_transport.post_json(url, headers=headers, json=data, timeout=timeout)
+        
+        # 协作式退避：等待期间不占用线程，可被取消；相同请求正在进行时直接等待其结果。
+        # 取消令牌只作用于本调用者的等待，所有等待者都放弃后上游请求才被取消
+        result = await single_flight.ado(
+            single_flight.make_key(url=url, data=data),
+            lambda: self._get_endpoint_pool().acall(
+                url, headers, data, _send, default_timeout=self.timeout, max_retries=self.max_retries,
+                priority=self.priority, deadline=deadline
+            ),
+            cancel_token=cancel_token
+        )
+        assistant_message = self._parse_response(result)
+        self._record_completion_usage(assistant_message, result)
+        if cache_key is not None:
+            await asyncio.to_thread(response_cache.put, cache_key, assistant_message)
+        
+        if update_history:
+            self._update_conversation_history(message, assistant_message)
+        
+        return assistant_message
+    
+    async def astream_response(self, message: str, intent_type: Optional[str] = None,
+                               cancel_token: Optional[CancellationToken] = None,
+                               deadline: Optional[Deadline] = None) -> AsyncIterator[str]:
+        """
+        异步流式获取模型响应（stream_response 的 asyncio 版本）
+        
+        Args:
+            message: 用户消息
+            intent_type: 意图类型，供模型路由选择档位
+            cancel_token: 取消令牌，取消时关闭连接并抛出 OperationCancelled（不写入对话历史）
+            deadline: 本轮截止时间，限制建立连接的超时和重试
+            
+        Yields:
+            模型生成的文本片段
+        """
+        yielded = False
+        try:
+            async for chunk in self._aopen_response_stream(message, intent_type, cancel_token, deadline):
+                yielded = True
+                yield chunk
+            
+            if not yielded:
+                raise ValueError("流式响应为空")
                 
-            except requests.exceptions.RequestException as e:
-                if attempt == self.max_retries - 1:
-                    raise e
-                time.sleep(self.retry_delay * (attempt + 1))
+        except Exception as e:
+            print(f"❌ 流式获取模型响应失败: {e}")
+            if not yielded:
+                yield self._get_fallback_response(message)
+    
+    async def _aopen_response_stream(self, message: str, intent_type: Optional[str] = None,
+                                     cancel_token: Optional[CancellationToken] = None,
+                                     deadline: Optional[Deadline] = None) -> AsyncIterator[str]:
+        """异步流式请求，仅在收到首个片段前重试，生成结束后一次性更新对话历史"""
+        check_cancelled(cancel_token)
+        if self.api_type == "mock":
+            for chunk in self._stream_mock_response(message):
+                yield chunk
+            return
+        
+        url, headers, data = self._build_request(message, stream=True, intent_type=intent_type, deadline=deadline)
+        
+        async def _connect(url: str, headers: Dict[str, str], data: Dict[str, Any], timeout: float):
+            # 读到首行即视为连接成功，之后的失败不再重试（已输出的片段无法撤回）
+            lines = async_transport.stream_lines(url, headers=headers, json=data, timeout=timeout)
+            try:
+                with self._track_model_latency(data, timeout):
+                    first_line = await lines.__anext__()
+            except StopAsyncIteration:
+                first_line = None
+            except BaseException:
+                await lines.aclose()
+                raise
+            return lines, first_line
+        
+        lines, first_line = await self._get_endpoint_pool().acall(
+            url, headers, data, _connect, default_timeout=self.timeout, max_retries=self.max_retries, kind="stream",
+            priority=self.priority, cancel_token=cancel_token, deadline=deadline
+        )
+        
+        async def _next_line():
+            try:
+                return await lines.__anext__()
+            except StopAsyncIteration:
+                return None
+        
+        async def _replay():
+            line = first_line
+            while line is not None:
+                yield line
+                # 等待下一行期间被取消时立即中断读取（生成卡住时也能及时停止）
+                line = await await_cancellable(_next_line(), cancel_token)
+        
+        chunks = []
+        try:
+            async for line in _replay():
+                payload = self._parse_sse_line(line)
+                if payload is SSE_DONE:
+                    break
+                if payload is None:
+                    continue
+                text = self._parse_stream_chunk(payload)
+                if text:
+                    chunks.append(text)
+                    yield text
+        finally:
+            await lines.aclose()
+        
+        self._record_completion_usage("".join(chunks))
+        self._update_conversation_history(message, self._finish_stream_text(chunks))
     
+
     def _get_mock_response(self, message: str) -> str:
         """获取模拟响应"""
         import random
@@ -347,13 +952,51 @@ class LLMClient:
             {"role": "assistant", "content": assistant_message}
         ])
         
-        # 保持历史记录在限制范围内
+        # 保持历史记录在限制范围内，移出窗口的轮次交给后台折叠进摘要
         if len(self.conversation_history) > self.max_history * 2:
+            evicted = self.conversation_history[:-self.max_history * 2]
             self.conversation_history = self.conversation_history[-self.max_history * 2:]
+            if self.summarizer is not None:
+                self.summarizer.submit(evicted)
+    
+    def _summarize(self, prompt: str) -> str:
+        """调用模型生成对话摘要（不带人设和历史，不写入对话历史），供后台摘要线程使用"""
+        if self.api_type == "openai":
+            url = f"{self.api_base}/chat/completions"
+            # 摘要不需要人设和历史，由快速档位生成
+            route = model_router.route(
+                self.model_name, url, prompt, task=TASK_SUMMARY,
+                required_tokens=self.context_manager.required_tokens("", "", prompt, 400),
+                default_context=self.context_manager.max_context_tokens
+            )
+            data = {
+                "model": route["model"],
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": 400,
+                "temperature": 0.3
+            }
+        elif self.api_type == "huggingface":
+            url = f"{self.api_base}/models/{self.model_name}"
+            data = {"inputs": prompt, "parameters": {"max_new_tokens": 400, "return_full_text": False}}
+        else:
+            raise ValueError(f"{self.api_type} 模式不支持生成摘要")
+        
+        if not self.api_key:
+            raise ValueError("API密钥未设置")
+        
+        headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        # 摘要在后台生成，不与用户对话争抢配额
+        result = self._get_endpoint_pool().call(
+            url, headers, data, self._timed_send(self._post_json), default_timeout=self.timeout,
+            max_retries=self.max_retries, priority=PRIORITY_BACKGROUND
+        )
+        return self._parse_response(result)
     
     def clear_history(self):
-        """清空对话历史"""
+        """清空对话历史（包括滚动摘要）"""
         self.conversation_history.clear()
+        if self.summarizer is not None:
+            self.summarizer.reset()
     
     def set_system_prompt(self, prompt: str):
         """设置系统提示词"""
@@ -366,9 +1009,31 @@ class LLMClient:
             "model_name": self.model_name,
             "has_api_key": bool(self.api_key),
             "history_length": len(self.conversation_history),
-            "max_history": self.max_history
+            "max_history": self.max_history,
+            "context_budget": self.context_manager.max_context_tokens,
+            "token_usage": self.token_usage.get_stats(),
+            "summary": self.summarizer.get_stats() if self.summarizer is not None else None,
+            "speculation": self.get_speculation_stats(),
+            "transport": http_transport.get_stats(),
+            "resilience": resilience.get_stats(),
+            "endpoint_pool": self.endpoint_pool.get_stats(),
+            "single_flight": single_flight.get_stats(),
+            "rate_limiter": rate_limiter.get_stats(),
+            "model_router": model_router.get_stats(),
+            "async_transport": async_transport.get_stats(),
+            "response_cache": response_cache.get_stats(),
+            "prompt_cache": system_prompt_cache.get_stats()
         }
     
+    def warm_up(self):
+        """在后台预热LLM与意图识别端点的连接"""
+        if self.api_type == "mock":
+            return
+        
+        from brain_agent.intent_engine import DEFAULT_INTENT_API_BASE
+        endpoints = [endpoint.api_base for endpoint in self._get_endpoint_pool().endpoints]
+        http_transport.warm_up(endpoints + [DEFAULT_INTENT_API_BASE])
+    
     def test_connection(self) -> Dict[str, Any]:
         """
         测试API连接
@@ -432,7 +1097,7 @@ class LLMClient:
                 "max_tokens": 10
             }
             
-            response = requests.post(
+            response = http_transport.post(
                 f"{self.api_base}/chat/completions",
                 headers=headers,
                 json=data,
@@ -476,7 +1141,7 @@ class LLMClient:
                 }
             }
             
-            response = requests.post(
+            response = http_transport.post(
                 f"{self.api_base}/models/{self.model_name}",
                 headers=headers,
                 json=data,
@@ -515,8 +1180,12 @@ class LLMClient:
         # 清除配置缓存，强制重新加载
         self._config_cache = None
         self._config_loaded = False
+        
+        # 同步更新共享意图引擎的密钥，保留其记忆缓存
+        if api_type != "mock":
+            self._get_intent_engine()
     
-    def get_response_with_intent(self, message: str) -> str:
+    def get_response_with_intent(self, message: str, cancel_token: Optional[CancellationToken] = None) -> str:
         """
         获取模型响应，支持意图识别和执行功能
         
@@ -524,32 +1193,382 @@ class LLMClient:
         
         Args:
             message: 用户消息
+            cancel_token: 取消令牌，取消时各阶段停止并抛出 OperationCancelled
             
         Returns:
             模型响应文本
         """
+        # 技能模块可在本地直接回答（如时间查询）时不发起任何网络请求
+        final_response, probe = self._answer_directly(message)
+        if final_response is not None:
+            return final_response
+        
+        deadline = self._new_turn_deadline()
+        
+        # 推测执行：与意图处理并行生成普通聊天回复
+        speculation = self._start_speculation(message, cancel_token, deadline)
+        intent_start = time.time()
+        
         try:
-            print(f"📝 用户输入: {message}")
+            enhanced_message, final_answer, intent_type = self._prepare_intent_message(
+                message, cancel_token, self._intent_deadline(deadline), probe
+            )
+        except OperationCancelled:
+            if speculation is not None:
+                speculation.cancel()
+            raise
+        
+        if final_answer is not None:
+            if speculation is not None:
+                self._discard_speculation(speculation)
+            return self._finish_direct_answer(message, final_answer)
+        
+        final_response = None
+        if speculation is not None:
+            final_response = self._resolve_speculation(
+                speculation, message, enhanced_message, time.time() - intent_start
+            )
+        
+        # 第三步：使用增强的输入生成LLM回复
+        if final_response is None:
+            final_response = self.get_response(
+                enhanced_message, cancel_token=cancel_token, deadline=deadline, intent_type=intent_type
+            )
+        
+        print(f"💬 生成回复: {final_response[:100]}...")
+        return final_response
+    
+    def stream_response_with_intent(self, message: str,
+                                    cancel_token: Optional[CancellationToken] = None) -> Iterator[str]:
+        """
+        流式获取模型响应，支持意图识别和执行功能
+        
+        意图识别与功能执行完成后，最终回复以流式方式逐段产出。
+        
+        Args:
+            message: 用户消息
+            cancel_token: 取消令牌，取消时各阶段停止、关闭连接并抛出 OperationCancelled
             
-            # 第一步：使用新的意图引擎进行意图识别和执行
-            import sys
-            import os
+        Yields:
+            模型生成的文本片段
+        """
+        direct_answer, probe = self._answer_directly(message)
+        if direct_answer is not None:
+            yield direct_answer
+            return
+        
+        deadline = self._new_turn_deadline()
+        speculation = self._start_stream_speculation(message, cancel_token, deadline)
+        intent_start = time.time()
+        
+        try:
+            enhanced_message, final_answer, intent_type = self._prepare_intent_message(
+                message, cancel_token, self._intent_deadline(deadline), probe
+            )
+        except OperationCancelled:
+            if speculation is not None:
+                speculation.cancel()
+            raise
+        
+        if final_answer is not None:
+            if speculation is not None:
+                self._discard_speculation(speculation)
+            yield self._finish_direct_answer(message, final_answer)
+            return
+        
+        if speculation is not None:
+            if enhanced_message == message:
+                yield from self._consume_stream_speculation(
+                    speculation, message, time.time() - intent_start, cancel_token, deadline
+                )
+                return
+            self._discard_speculation(speculation)
+        
+        yield from self.stream_response(enhanced_message, cancel_token, deadline, intent_type)
+    
+    async def aget_response_with_intent(self, message: str,
+                                        cancel_token: Optional[CancellationToken] = None) -> str:
+        """
+        异步获取模型响应，支持意图识别和执行功能（get_response_with_intent 的 asyncio 版本）
+        
+        意图引擎、技能插件和本地探测为同步实现，放在线程中运行，不阻塞事件循环；
+        普通聊天回复作为推测任务并发生成，意图需要工具输出时直接取消该任务。
+        
+        Args:
+            message: 用户消息
+            cancel_token: 取消令牌，取消时各阶段停止并抛出 OperationCancelled
             
-            # 添加brain_agent到Python路径
-            brain_agent_path = os.path.join(os.path.dirname(__file__), '..', 'brain_agent')
-            if brain_agent_path not in sys.path:
-                sys.path.insert(0, brain_agent_path)
+        Returns:
+            模型响应文本
+        """
+        final_response, probe = await asyncio.to_thread(self._answer_directly, message)
+        if final_response is not None:
+            return final_response
+        
+        deadline = self._new_turn_deadline()
+        speculation = None
+        if self.speculative_response:
+            self._speculation_stats["launched"] += 1
+            speculation = asyncio.create_task(self._aspeculate(message, cancel_token, deadline))
+        intent_start = time.time()
+        
+        try:
+            enhanced_message, final_answer, intent_type = await asyncio.to_thread(
+                self._prepare_intent_message, message, cancel_token, self._intent_deadline(deadline), probe
+            )
+        except BaseException:
+            # 本轮被取消时一并取消推测任务
+            if speculation is not None:
+                speculation.cancel()
+            raise
+        
+        if final_answer is not None:
+            if speculation is not None:
+                self._discard_speculation(speculation)
+            return self._finish_direct_answer(message, final_answer)
+        
+        final_response = None
+        if speculation is not None:
+            if enhanced_message != message:
+                self._discard_speculation(speculation)
+            else:
+                try:
+                    final_response, speculation_elapsed = await speculation
+                    if final_response:
+                        self._update_conversation_history(message, final_response)
+                    self._record_speculation_win(time.time() - intent_start, speculation_elapsed)
+                except Exception as e:
+                    self._speculation_stats["failed"] += 1
+                    print(f"⚠️ 推测回复失败: {e}")
+        
+        if final_response is None:
+            final_response = await self.aget_response(enhanced_message, intent_type=intent_type,
+                                                      cancel_token=cancel_token, deadline=deadline)
+        
+        print(f"💬 生成回复: {final_response[:100]}...")
+        return final_response
+    
+    async def astream_response_with_intent(self, message: str,
+                                           cancel_token: Optional[CancellationToken] = None) -> AsyncIterator[str]:
+        """
+        异步流式获取模型响应，支持意图识别和执行功能（stream_response_with_intent 的 asyncio 版本）
+        
+        Args:
+            message: 用户消息
+            cancel_token: 取消令牌，取消时各阶段停止、关闭连接并抛出 OperationCancelled
+            
+        Yields:
+            模型生成的文本片段
+        """
+        direct_answer, probe = await asyncio.to_thread(self._answer_directly, message)
+        if direct_answer is not None:
+            yield direct_answer
+            return
+        
+        deadline = self._new_turn_deadline()
+        enhanced_message, final_answer, intent_type = await asyncio.to_thread(
+            self._prepare_intent_message, message, cancel_token, self._intent_deadline(deadline), probe
+        )
+        if final_answer is not None:
+            yield self._finish_direct_answer(message, final_answer)
+            return
+        
+        async for chunk in self.astream_response(enhanced_message, intent_type, cancel_token, deadline):
+            yield chunk
+    
+    async def _aspeculate(self, message: str, cancel_token: Optional[CancellationToken] = None,
+                          deadline: Optional[Deadline] = None) -> Tuple[str, float]:
+        """异步推测任务：生成普通聊天回复（不写入对话历史），返回回复和耗时"""
+        start_time = time.time()
+        response = await self._acomplete(message, update_history=False, cancel_token=cancel_token,
+                                         deadline=deadline, intent_type="chat")
+        return response, time.time() - start_time
+    
+    def _get_speculation_executor(self) -> ThreadPoolExecutor:
+        """获取推测执行线程池（首次使用时创建）"""
+        if self._speculation_executor is None:
+            self._speculation_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="llm-speculation")
+        return self._speculation_executor
+    
+    def _new_turn_deadline(self) -> Optional[Deadline]:
+        """创建本轮预算（未配置时不限时）；最终回复每次尝试至少保留默认超时，预算只限制重试"""
+        if not self.turn_deadline:
+            return None
+        return Deadline(self.turn_deadline, min_timeout=self.timeout)
+    
+    def _intent_deadline(self, deadline: Optional[Deadline]) -> Optional[Deadline]:
+        """意图处理的子预算：为最终回复保留 turn_reply_reserve 秒"""
+        if deadline is None:
+            return None
+        return deadline.reserve(self.turn_reply_reserve)
+    
+    def _start_speculation(self, message: str, cancel_token: Optional[CancellationToken] = None,
+                           deadline: Optional[Deadline] = None) -> Optional[SpeculativeResponse]:
+        """在后台提前生成普通聊天回复（不写入对话历史）"""
+        if not self.speculative_response:
+            return None
+        
+        # 推测请求使用本轮令牌的子令牌：丢弃推测时只中断推测请求，本轮取消时一并中断
+        speculation_token = child_token(cancel_token)
+        
+        def _speculate():
+            start_time = time.time()
+            response = self._complete(
+                message, update_history=False, cancel_token=speculation_token, deadline=deadline,
+                intent_type="chat"
+            )
+            return response, time.time() - start_time
+        
+        self._speculation_stats["launched"] += 1
+        return SpeculativeResponse(_speculate, self._get_speculation_executor(), speculation_token)
+    
+    def _start_stream_speculation(self, message: str, cancel_token: Optional[CancellationToken] = None,
+                                  deadline: Optional[Deadline] = None) -> Optional[SpeculativeStream]:
+        """在后台提前拉取普通聊天的流式回复（不写入对话历史）"""
+        if not self.speculative_response:
+            return None
+        
+        speculation_token = child_token(cancel_token)
+        self._speculation_stats["launched"] += 1
+        return SpeculativeStream(
+            self._open_response_stream(
+                message, update_history=False, cancel_token=speculation_token, deadline=deadline, intent_type="chat"
+            ),
+            self._get_speculation_executor(),
+            speculation_token
+        )
+    
+    def _discard_speculation(self, speculation):
+        """意图需要工具输出，丢弃推测回复"""
+        speculation.cancel()
+        self._speculation_stats["discarded"] += 1
+        print("🗑️ 意图需要工具输出，丢弃推测回复")
+    
+    def _record_speculation_win(self, intent_elapsed: float, speculation_elapsed: float):
+        """记录推测命中；节省的时间为意图处理与推测生成重叠的部分"""
+        saved = min(intent_elapsed, speculation_elapsed)
+        self._speculation_stats["kept"] += 1
+        self._speculation_stats["saved_seconds"] += saved
+        print(f"⚡ 采用推测回复，节省 {saved:.2f}s")
+    
+    def _resolve_speculation(self, speculation: SpeculativeResponse, message: str, enhanced_message: str,
+                             intent_elapsed: float) -> Optional[str]:
+        """
+        根据意图处理结果决定是否采用推测回复
+        
+        Returns:
+            采用时返回推测回复，丢弃或推测失败时返回None
+        """
+        if enhanced_message != message:
+            self._discard_speculation(speculation)
+            return None
+        
+        try:
+            response, speculation_elapsed = speculation.result()
+        except Exception as e:
+            self._speculation_stats["failed"] += 1
+            print(f"⚠️ 推测回复失败: {e}")
+            return None
+        
+        if response:
+            self._update_conversation_history(message, response)
+        self._record_speculation_win(intent_elapsed, speculation_elapsed)
+        return response
+    
+    def _consume_stream_speculation(self, speculation: SpeculativeStream, message: str, intent_elapsed: float,
+                                    cancel_token: Optional[CancellationToken] = None,
+                                    deadline: Optional[Deadline] = None) -> Iterator[str]:
+        """回放推测的流式回复，推测失败且尚未输出时回退到正常流式请求"""
+        chunks = []
+        try:
+            for chunk in speculation:
+                chunks.append(chunk)
+                yield chunk
+        except Exception as e:
+            print(f"⚠️ 推测回复失败: {e}")
+        finally:
+            # 调用方中途放弃迭代时停止后台拉取
+            speculation.cancel()
+        
+        if not chunks:
+            self._speculation_stats["failed"] += 1
+            yield from self.stream_response(message, cancel_token, deadline, "chat")
+            return
+        
+        self._update_conversation_history(message, "".join(chunks))
+        
+        # 流式回复以首个片段到达时间衡量推测节省的延迟
+        first_chunk_at = speculation.first_chunk_at or time.time()
+        self._record_speculation_win(intent_elapsed, first_chunk_at - speculation.started_at)
+    
+    def get_speculation_stats(self) -> Dict[str, Any]:
+        """获取推测执行统计"""
+        stats = self._speculation_stats.copy()
+        decided = stats["kept"] + stats["discarded"] + stats["failed"]
+        stats["enabled"] = self.speculative_response
+        stats["win_rate"] = stats["kept"] / decided if decided else 0.0
+        stats["average_saved_seconds"] = stats["saved_seconds"] / stats["kept"] if stats["kept"] else 0.0
+        return stats
+    
+    def _get_intent_engine(self):
+        """获取进程级共享的意图引擎（跨轮次、跨线程复用）"""
+        from brain_agent.intent_engine import get_intent_engine
+        
+        # 优先使用当前LLM客户端的API密钥，如果没有则从环境变量获取
+        api_key = self.api_key or os.getenv("DOUBAO_API_KEY")
+        return get_intent_engine(api_key=api_key)
+    
+    def _answer_directly(self, message: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        意图可由技能模块在本地直接回答时返回最终回复（仅用记忆和条件反射识别意图，不发起网络请求）
+        
+        Returns:
+            (最终回复, 本地探查结果)；最终回复已写入对话历史，无法直接回答时为None，
+            此时探查结果传给意图处理，避免同一轮重复回忆
+        """
+        try:
+            probe = self._get_intent_engine().probe_local(message)
+        except Exception as e:
+            print(f"⚠️ 本地直接回答失败: {e}")
+            return None, None
+        
+        result = probe["direct_result"]
+        if result is None:
+            return None, probe
+        return self._finish_direct_answer(message, result["response"]), probe
+    
+    def _finish_direct_answer(self, message: str, answer: str) -> str:
+        """技能模块的回答即为最终回复：写入对话历史，跳过LLM调用"""
+        self._update_conversation_history(message, answer)
+        print(f"⚡ 技能直接回答，跳过LLM调用: {answer[:100]}")
+        return answer
+    
+    def _prepare_intent_message(self, message: str, cancel_token: Optional[CancellationToken] = None,
+                                deadline: Optional[Deadline] = None,
+                                probe: Optional[Dict[str, Any]] = None) -> Tuple[str, Optional[str], str]:
+        """
+        意图识别 + 功能执行，返回带执行结果的增强输入
+        
+        Args:
+            message: 用户消息
+            cancel_token: 取消令牌
+            deadline: 意图处理的预算，超出时降级为普通聊天（返回原始消息）
+            probe: 本轮的本地探查结果（_answer_directly 返回），意图处理不再重复回忆
             
-            # 导入意图引擎
-            from intent_engine import IntentEngine
+        Returns:
+            (增强后的输入, 技能模块给出的最终回复, 意图类型)；意图处理失败时返回原始消息和 unknown，
+            技能结果需要LLM整理时最终回复为None；意图类型供最终回复的模型路由使用
+        """
+        try:
+            print(f"📝 用户输入: {message}")
             
-            # 创建意图引擎实例
-            # 优先使用当前LLM客户端的API密钥，如果没有则从环境变量获取
-            api_key = self.api_key or os.getenv("DOUBAO_API_KEY")
-            intent_engine = IntentEngine(api_key=api_key)
+            # 第一步：使用共享的意图引擎进行意图识别和执行
+            intent_engine = self._get_intent_engine()
             
             # 处理消息（意图识别 + 执行）
-            process_result = intent_engine.process_message(message)
+            process_result = intent_engine.process_message(
+                message, cancel_token=cancel_token, deadline=deadline, probe=probe
+            )
             
             intent_type = process_result.get('intent_data', {}).get('intent_type', 'unknown')
             confidence = process_result.get('intent_data', {}).get('confidence', 0.0)
@@ -559,6 +1578,14 @@ class LLMClient:
             print(f"🧠 意图识别: {intent_type} (置信度: {confidence:.2f})")
             print(f"⚡ 执行结果: {'成功' if success else '失败'}")
             
+            # 技能模块已给出完整回答（如时间、系统信息），无需再请求LLM润色
+            if process_result.get('response_type') == "final_answer":
+                return message, execution_result, intent_type
+            
+            # 闲聊/未知意图或无需技能时，执行结果不携带信息，直接使用原始输入
+            if not self._needs_tool_output(process_result):
+                return message, None, intent_type
+            
             # 第二步：构建增强的输入
             enhanced_message = message
             
@@ -572,17 +1599,21 @@ class LLMClient:
                 enhanced_message = f"{message}\n\n[系统执行失败]: {error_msg}"
                 print(f"⚠️ 执行失败: {error_msg}")
             
-            # 第三步：使用增强的输入生成LLM回复
-            final_response = self.get_response(enhanced_message)
-            
-            print(f"💬 生成回复: {final_response[:100]}...")
-            return final_response
+            return enhanced_message, None, intent_type
                 
         except Exception as e:
             print(f"❌ 意图识别响应失败: {e}")
             import traceback
             traceback.print_exc()
-            return self.get_response(message)
+            return message, None, "unknown"
+    
+    @staticmethod
+    def _needs_tool_output(process_result: Dict[str, Any]) -> bool:
+        """判断意图处理结果是否需要拼接到最终回复的输入中"""
+        intent_type = process_result.get('intent_data', {}).get('intent_type', 'unknown')
+        if intent_type in ("chat", "unknown"):
+            return False
+        return process_result.get('response_type') != "direct_answer"
     
     def _generate_comprehensive_response(self, user_message: str, intent_type: str, search_reference: str = None, search_content: List[Dict[str, str]] = None) -> str:
         """
@@ -602,14 +1633,15 @@ class LLMClient:
             enhanced_system_prompt = self._build_enhanced_system_prompt(intent_type, search_reference, search_content)
             
             # 临时设置增强的系统提示词
-            original_prompt = self.system_prompt
+            original_override = self._system_prompt_override
             self.system_prompt = enhanced_system_prompt
             
-            # 生成回复
-            response = self.get_response(user_message)
-            
-            # 恢复原始系统提示词
-            self.system_prompt = original_prompt
+            try:
+                # 生成回复
+                response = self.get_response(user_message)
+            finally:
+                # 恢复原始系统提示词（不把当前文件内容固化为覆盖值）
+                self._system_prompt_override = original_override
             
             return response
             
@@ -0,0 +1,184 @@
+"""
+模型路由模块 - 按请求选择模型档位
+
+LLMClient 原先所有请求都使用同一个 model_name。路由器为每次请求依次按以下依据选择档位：
+- 所需上下文：提示词 + 回复超过标准档位的上下文预算时，使用上下文足够的档位
+- 任务类型：记忆编码等后台任务使用长上下文档位，对话摘要和意图识别使用快速档位
+- 意图类型与消息长度：闲聊/未知意图的短消息使用快速档位，其余使用标准档位
+- 近期延迟：首选档位的模型近期延迟（滑动平均）超过上限或本轮剩余预算时，改用其他可用档位
+
+档位在 config.LLM_MODEL_TIERS 中配置。standard 档位始终是客户端配置的模型；
+其他档位未配置模型、或限定的 api_base 与请求地址不符时跳过，退回标准档位。
+"""
+
+import threading
+from typing import Any, Dict, List, Optional
+
+import config
+from .context_manager import estimate_tokens
+
+
+TIER_FAST = "fast"
+TIER_STANDARD = "standard"
+TIER_LONG = "long"
+
+TASK_CHAT = "chat"
+TASK_INTENT = "intent"
+TASK_SUMMARY = "summary"
+TASK_BACKGROUND = "background"
+
+# 结果不需要工具输出的意图，回复可由快速档位生成
+CHAT_INTENTS = ("chat", "unknown")
+
+
+class ModelRouter:
+    """按意图类型、消息长度、所需上下文和近期延迟选择模型"""
+
+    def __init__(self, tiers: Dict[str, Dict[str, Any]] = None, enabled: bool = None,
+                 short_message_tokens: int = None, slow_latency: float = None):
+        """
+        Args:
+            tiers: 档位配置 {档位: {"model", "context_tokens", "cost", "api_base"}}
+            enabled: 是否启用路由；关闭时所有请求使用客户端配置的模型
+            short_message_tokens: 不超过该token数的闲聊消息视为短消息
+            slow_latency: 模型近期延迟超过该值（秒）时改用其他档位
+        """
+        self.enabled = enabled if enabled is not None else getattr(config, "LLM_ROUTER_ENABLED", True)
+        self.tiers = tiers if tiers is not None else getattr(config, "LLM_MODEL_TIERS", {})
+        self.short_message_tokens = short_message_tokens or getattr(config, "LLM_ROUTER_SHORT_MESSAGE_TOKENS", 64)
+        self.slow_latency = slow_latency or getattr(config, "LLM_ROUTER_SLOW_LATENCY", 6.0)
+
+        self._lock = threading.Lock()
+        # 各模型近期延迟的滑动平均（秒）
+        self._latency: Dict[str, float] = {}
+        self._stats = {
+            "decisions": 0,
+            "by_tier": {},
+            "by_reason": {},
+            "latency_reroutes": 0,
+            "baseline_cost": 0.0,
+            "routed_cost": 0.0
+        }
+
+    def _tier_config(self, tier: str) -> Dict[str, Any]:
+        return self.tiers.get(tier) or {}
+
+    def _resolve(self, tier: str, default_model: str, default_context: int, url: str) -> Optional[Dict[str, Any]]:
+        """
+        把档位解析为具体模型
+
+        Returns:
+            {"tier", "model", "context_tokens", "cost"}；档位不可用时返回None
+        """
+        spec = self._tier_config(tier)
+        if tier == TIER_STANDARD:
+            model = default_model
+        else:
+            model = spec.get("model")
+            api_base = spec.get("api_base")
+            if not model or (api_base and not url.startswith(api_base)):
+                return None
+        return {
+            "tier": tier,
+            "model": model,
+            "context_tokens": spec.get("context_tokens") or default_context,
+            "cost": spec.get("cost", 1.0)
+        }
+
+    def _preferences(self, task: str, intent_type: Optional[str], message_tokens: int) -> List[str]:
+        """按任务、意图类型和消息长度给出档位的优先顺序"""
+        if task == TASK_BACKGROUND:
+            return [TIER_LONG, TIER_STANDARD]
+        if task in (TASK_SUMMARY, TASK_INTENT):
+            return [TIER_FAST, TIER_STANDARD]
+        if intent_type in CHAT_INTENTS and message_tokens <= self.short_message_tokens:
+            return [TIER_FAST, TIER_STANDARD]
+        return [TIER_STANDARD, TIER_FAST]
+
+    def route(self, default_model: str, url: str, message: str = "", task: str = TASK_CHAT,
+              intent_type: Optional[str] = None, required_tokens: int = 0,
+              default_context: int = None, latency_budget: Optional[float] = None) -> Dict[str, Any]:
+        """
+        为一次请求选择模型
+
+        Args:
+            default_model: 客户端配置的模型（标准档位）
+            url: 请求地址，用于匹配档位限定的 api_base
+            message: 当前用户消息
+            task: 任务类型（chat / intent / summary / background）
+            intent_type: 意图类型；未经意图识别时为None
+            required_tokens: 不可丢弃部分（系统提示词、记忆、消息和回复）所需的token数
+            default_context: 标准档位的上下文预算
+            latency_budget: 本轮剩余预算（秒），近期延迟超过该值的模型不作首选
+
+        Returns:
+            Dict: tier、model、context_tokens（组装上下文使用的预算）、reason
+        """
+        default_context = default_context or getattr(config, "LLM_CONTEXT_TOKENS", 4096)
+        standard = self._resolve(TIER_STANDARD, default_model, default_context, url)
+        if not self.enabled:
+            return dict(standard, reason="disabled")
+
+        message_tokens = estimate_tokens(message)
+        preferences = self._preferences(task, intent_type, message_tokens)
+        reason = task if task != TASK_CHAT else ("short_chat" if preferences[0] == TIER_FAST else "default")
+
+        candidates = [c for c in (self._resolve(t, default_model, default_context, url) for t in preferences) if c]
+        # 上下文超出标准档位时，只考虑上下文足够的档位（按上下文从小到大，装得下即可）
+        if required_tokens > standard["context_tokens"]:
+            fitting = sorted(
+                (c for c in (self._resolve(t, default_model, default_context, url) for t in self.tiers) if c),
+                key=lambda c: c["context_tokens"]
+            )
+            fitting = [c for c in fitting if c["context_tokens"] >= required_tokens]
+            if fitting:
+                candidates = fitting
+                reason = "long_context"
+        candidates = [c for c in candidates if c["context_tokens"] >= min(required_tokens, standard["context_tokens"])]
+        if not candidates:
+            candidates = [standard]
+
+        chosen = candidates[0]
+        limit = self.slow_latency if latency_budget is None else min(self.slow_latency, latency_budget)
+        with self._lock:
+            if self._latency.get(chosen["model"], 0.0) > limit:
+                faster = [c for c in candidates[1:] if self._latency.get(c["model"], 0.0) <= limit]
+                if faster:
+                    # 被跳过的模型没有新样本，延迟估计逐次衰减，恢复后能重新被选中
+                    self._latency[chosen["model"]] *= 0.9
+                    chosen = faster[0]
+                    reason = "latency"
+                    self._stats["latency_reroutes"] += 1
+
+            # 按估算token量记录相对标准档位的成本
+            tokens = max(required_tokens, message_tokens)
+            self._stats["decisions"] += 1
+            self._stats["by_tier"][chosen["tier"]] = self._stats["by_tier"].get(chosen["tier"], 0) + 1
+            self._stats["by_reason"][reason] = self._stats["by_reason"].get(reason, 0) + 1
+            self._stats["baseline_cost"] += standard["cost"] * tokens / 1000
+            self._stats["routed_cost"] += chosen["cost"] * tokens / 1000
+
+        return dict(chosen, reason=reason)
+
+    def record_latency(self, model: str, latency: float):
+        """记录模型的响应延迟（滑动平均）"""
+        with self._lock:
+            previous = self._latency.get(model)
+            self._latency[model] = latency if previous is None else 0.8 * previous + 0.2 * latency
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取路由统计信息；成本为按估算token量和档位相对单价计算的相对值"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["by_tier"] = dict(self._stats["by_tier"])
+            stats["by_reason"] = dict(self._stats["by_reason"])
+            stats["latency"] = {model: round(latency, 3) for model, latency in self._latency.items()}
+        stats["saved_cost"] = round(stats["baseline_cost"] - stats["routed_cost"], 4)
+        stats["baseline_cost"] = round(stats["baseline_cost"], 4)
+        stats["routed_cost"] = round(stats["routed_cost"], 4)
+        stats["enabled"] = self.enabled
+        return stats
+
+
+# 全局模型路由器
+model_router = ModelRouter()
@@ -0,0 +1,111 @@
+"""
+提示词缓存模块 - 基于文件修改时间/大小校验的系统提示词缓存
+
+系统提示词由 MemABC/systemprompt.txt（AI灵魂）和 MemABC/memC/memC.txt（潜意识）
+组成。缓存只在文件的 mtime 或大小发生变化、或 MemABC 编码器主动通知后才重新读取，
+对话热路径上组装提示词不产生任何文件读取。
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# MemABC 提示词文件路径
+MEMABC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'MemABC'))
+SYSTEM_PROMPT_PATH = os.path.join(MEMABC_DIR, 'systemprompt.txt')
+MEMC_PATH = os.path.join(MEMABC_DIR, 'memC', 'memC.txt')
+
+
+class PromptCache:
+    """按文件签名（mtime + 大小）校验的缓存"""
+
+    def __init__(self, paths: List[str], check_interval: float = 2.0):
+        """
+        初始化缓存
+
+        Args:
+            paths: 缓存内容所依赖的文件路径
+            check_interval: 两次文件签名检查之间的最小间隔（秒），间隔内直接返回缓存
+        """
+        self.paths = list(paths)
+        self.check_interval = check_interval
+
+        self._value: Any = None
+        self._signature: Optional[Tuple] = None
+        self._checked_at = 0.0
+        self._valid = False
+        self._lock = threading.RLock()
+
+        self._stats = {
+            "hits": 0,
+            "reloads": 0,
+            "signature_checks": 0,
+            "invalidations": 0
+        }
+
+    def _get_signature(self) -> Tuple:
+        """计算依赖文件的签名，文件不存在时对应项为 None"""
+        signature = []
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def get(self, loader: Callable[[], Any]) -> Any:
+        """
+        获取缓存内容，文件变化时调用 loader 重新加载
+
+        Args:
+            loader: 加载函数，返回需要缓存的内容
+
+        Returns:
+            缓存内容
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._valid and now - self._checked_at < self.check_interval:
+                self._stats["hits"] += 1
+                return self._value
+
+            self._stats["signature_checks"] += 1
+            signature = self._get_signature()
+            self._checked_at = now
+
+            if self._valid and signature == self._signature:
+                self._stats["hits"] += 1
+                return self._value
+
+            self._value = loader()
+            # 以加载前的签名为准，加载期间文件若被改写，下次检查会再次加载
+            self._signature = signature
+            self._valid = True
+            self._stats["reloads"] += 1
+            return self._value
+
+    def invalidate(self):
+        """使缓存失效（例如编码器刚刚改写了 memC），下次访问时重新加载"""
+        with self._lock:
+            self._valid = False
+            self._stats["invalidations"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            stats = self._stats.copy()
+        stats["paths"] = self.paths
+        stats["check_interval"] = self.check_interval
+        return stats
+
+
+# 全局系统提示词缓存（AI灵魂 + 潜意识）
+system_prompt_cache = PromptCache([SYSTEM_PROMPT_PATH, MEMC_PATH])
+
+
+def invalidate_system_prompt():
+    """通知系统提示词缓存失效，供 MemABC 编码器改写 memC/systemprompt 后调用"""
+    system_prompt_cache.invalidate()
@@ -0,0 +1,333 @@
+"""
+限流模块 - 客户端令牌桶限流，区分交互请求与后台请求
+
+每个端点一个令牌桶，状态放在映射到 ~/.emoji_assistant/rate_limiter.bin 的共享内存（mmap）中，
+桌面程序和 MemABC 编码子进程映射同一区域，取令牌只在内存里读写，由文件锁（fcntl）互斥；
+落盘交给操作系统的脏页回写，进程退出时再刷新一次。不支持 fcntl 的平台退化为进程内限流。
+
+优先级：
+- interactive（交互）：用户对话，令牌可用时立即发送
+- background（后台）：记忆编码、对话摘要等，不能动用为交互请求保留的令牌；
+  有交互请求在等待令牌、或近期交互延迟升高时主动退避
+"""
+
+import asyncio
+import atexit
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+import config
+from .cancellation import CancellationToken, acancellable_sleep, cancellable_sleep, check_cancelled
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BACKGROUND = "background"
+
+
+class _LocalState:
+    """进程内限流状态（不支持 fcntl 时使用）"""
+
+    def __init__(self):
+        self._fields: Dict[str, float] = {}
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def get(self, name: str) -> float:
+        return self._fields.get(name, 0.0)
+
+    def set(self, name: str, value: float):
+        self._fields[name] = value
+
+    def get_bucket(self, key: str) -> Optional[Tuple[float, float]]:
+        return self._buckets.get(key)
+
+    def set_bucket(self, key: str, tokens: float, updated_at: float):
+        self._buckets[key] = (tokens, updated_at)
+
+    def flush(self):
+        pass
+
+
+class _MappedState:
+    """
+    映射到文件的共享限流状态
+
+    布局：文件头（魔数、槽位数、interactive_at、interactive_waiting_until、interactive_latency），
+    之后是固定数量的桶槽位（端点键哈希、令牌数、更新时间），按哈希开放寻址。
+    """
+
+    MAGIC = b"RLv1"
+    HEADER = struct.Struct("<4sIddd")
+    SLOT = struct.Struct("<Qdd")
+    SLOTS = 64
+    FIELDS = {"interactive_at": 8, "interactive_waiting_until": 16, "interactive_latency": 24}
+    SIZE = HEADER.size + SLOT.size * SLOTS
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self.fd).st_size < self.SIZE:
+                os.ftruncate(self.fd, self.SIZE)
+            self.region = mmap.mmap(self.fd, self.SIZE)
+            magic, slots = self.HEADER.unpack_from(self.region, 0)[:2]
+            if magic != self.MAGIC or slots != self.SLOTS:
+                # 新文件或布局不兼容：清空重建
+                self.region[:] = bytes(self.SIZE)
+                self.HEADER.pack_into(self.region, 0, self.MAGIC, self.SLOTS, 0.0, 0.0, 0.0)
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    @contextmanager
+    def locked(self) -> Iterator["_MappedState"]:
+        """跨进程加锁（只锁已打开的文件描述符，不做文件读写）"""
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            yield self
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def get(self, name: str) -> float:
+        return struct.unpack_from("<d", self.region, self.FIELDS[name])[0]
+
+    def set(self, name: str, value: float):
+        struct.pack_into("<d", self.region, self.FIELDS[name], value)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        # 0 表示空槽位
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") or 1
+
+    def _find_slot(self, key: str) -> Tuple[int, int, bool]:
+        """返回 (槽位偏移, 键哈希, 是否已存在)；槽位用尽时复用哈希位置"""
+        key_hash = self._hash(key)
+        start = key_hash % self.SLOTS
+        for i in range(self.SLOTS):
+            offset = self.HEADER.size + ((start + i) % self.SLOTS) * self.SLOT.size
+            slot_hash = self.SLOT.unpack_from(self.region, offset)[0]
+            if slot_hash == key_hash:
+                return offset, key_hash, True
+            if slot_hash == 0:
+                return offset, key_hash, False
+        return self.HEADER.size + start * self.SLOT.size, key_hash, False
+
+    def get_bucket(self, key: str) -> Optional[Tuple[float, float]]:
+        offset, _, found = self._find_slot(key)
+        if not found:
+            return None
+        return self.SLOT.unpack_from(self.region, offset)[1:]
+
+    def set_bucket(self, key: str, tokens: float, updated_at: float):
+        offset, key_hash, _ = self._find_slot(key)
+        self.SLOT.pack_into(self.region, offset, key_hash, tokens, updated_at)
+
+    def flush(self):
+        try:
+            self.region.flush()
+        except (OSError, ValueError):
+            pass
+
+
+class RateLimiter:
+    """跨进程共享的按端点令牌桶"""
+
+    def __init__(self, rate: float = None, burst: float = None, reserve: float = None,
+                 latency_threshold: float = None, background_backoff: float = None,
+                 state_path: str = None):
+        """
+        Args:
+            rate: 每秒补充的令牌数
+            burst: 令牌桶容量
+            reserve: 为交互请求保留的令牌数
+            latency_threshold: 近期交互延迟超过该值（秒）时后台请求退避
+            background_backoff: 后台请求因交互繁忙退避的时长（秒）
+            state_path: 共享状态映射文件路径
+        """
+        self.enabled = getattr(config, "LLM_RATE_LIMIT_ENABLED", True)
+        self.rate = rate or getattr(config, "LLM_RATE_LIMIT_RATE", 2.0)
+        self.burst = burst or getattr(config, "LLM_RATE_LIMIT_BURST", 10)
+        self.reserve = reserve if reserve is not None else getattr(config, "LLM_RATE_LIMIT_RESERVE", 3)
+        self.latency_threshold = latency_threshold or getattr(config, "LLM_BACKGROUND_LATENCY_THRESHOLD", 8.0)
+        self.background_backoff = background_backoff or getattr(config, "LLM_BACKGROUND_BACKOFF", 5.0)
+        self.state_path = state_path or os.path.join(os.path.expanduser("~/.emoji_assistant"), "rate_limiter.bin")
+
+        # 近期交互请求的判定窗口：超过该时长没有交互请求时，不再因延迟让后台退避
+        self.interactive_window = 60.0
+
+        self._lock = threading.Lock()
+        self._state = None
+        self._latency_lock = threading.Lock()
+        self._interactive_latency: Optional[float] = None
+        self._stats = {
+            PRIORITY_INTERACTIVE: {"requests": 0, "waits": 0, "wait_seconds": 0.0},
+            PRIORITY_BACKGROUND: {"requests": 0, "waits": 0, "wait_seconds": 0.0, "yields": 0}
+        }
+
+    def _open_state(self):
+        """首次使用时映射共享状态，失败时退化为进程内状态"""
+        if self._state is None:
+            if fcntl is not None:
+                try:
+                    self._state = _MappedState(self.state_path)
+                except OSError as e:
+                    print(f"⚠️ 限流共享状态映射失败，改为进程内限流: {e}")
+            if self._state is None:
+                self._state = _LocalState()
+            atexit.register(self._state.flush)
+        return self._state
+
+    @contextmanager
+    def _shared_state(self) -> Iterator[Any]:
+        """加锁访问共享状态（纯内存读写）"""
+        with self._lock:
+            state = self._open_state()
+            if isinstance(state, _MappedState):
+                with state.locked():
+                    yield state
+            else:
+                yield state
+
+    @staticmethod
+    def _endpoint_key(url: str) -> str:
+        """提取端点标识（scheme://netloc）"""
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def _try_acquire(self, url: str, priority: str) -> float:
+        """
+        尝试取一个令牌
+
+        Returns:
+            0 表示已取得令牌，否则为建议等待的秒数
+        """
+        now = time.time()
+        key = self._endpoint_key(url)
+        with self._shared_state() as state:
+            bucket = state.get_bucket(key)
+            tokens, updated_at = bucket if bucket is not None else (self.burst, now)
+            tokens = min(self.burst, tokens + max(0.0, now - updated_at) * self.rate)
+
+            if priority == PRIORITY_INTERACTIVE:
+                state.set("interactive_at", now)
+                if tokens >= 1:
+                    state.set_bucket(key, tokens - 1, now)
+                    return 0.0
+                state.set_bucket(key, tokens, now)
+                wait = (1 - tokens) / self.rate
+                # 告知后台请求：有交互请求在排队，先让路
+                state.set("interactive_waiting_until", max(state.get("interactive_waiting_until"), now + wait))
+                return wait
+
+            interactive_recent = now - state.get("interactive_at") < self.interactive_window
+            congested = interactive_recent and state.get("interactive_latency") > self.latency_threshold
+            if congested or state.get("interactive_waiting_until") > now:
+                self._stats[PRIORITY_BACKGROUND]["yields"] += 1
+                return self.background_backoff
+            if tokens >= 1 + self.reserve:
+                state.set_bucket(key, tokens - 1, now)
+                return 0.0
+            state.set_bucket(key, tokens, now)
+            return (1 + self.reserve - tokens) / self.rate
+
+    def _record_acquire(self, priority: str, waited: float):
+        with self._lock:
+            stats = self._stats[priority]
+            stats["requests"] += 1
+            if waited:
+                stats["waits"] += 1
+                stats["wait_seconds"] += waited
+
+    def acquire(self, url: str, priority: Optional[str] = None,
+                cancel_token: Optional[CancellationToken] = None) -> float:
+        """
+        等待并取得发往该端点的请求令牌
+
+        Args:
+            url: 请求地址
+            priority: 优先级（interactive / background），默认 interactive
+            cancel_token: 取消令牌，取消时停止等待
+
+        Returns:
+            等待的秒数
+        """
+        priority = priority or PRIORITY_INTERACTIVE
+        if not self.enabled:
+            return 0.0
+
+        waited = 0.0
+        while True:
+            wait = self._try_acquire(url, priority)
+            if not wait:
+                break
+            cancellable_sleep(wait, cancel_token)
+            waited += wait
+
+        self._record_acquire(priority, waited)
+        return waited
+
+    async def aacquire(self, url: str, priority: Optional[str] = None,
+                       cancel_token: Optional[CancellationToken] = None) -> float:
+        """
+        acquire 的 asyncio 版本，等待期间不占用线程
+
+        取令牌在线程中进行，跨进程文件锁的等待不阻塞事件循环。
+        """
+        priority = priority or PRIORITY_INTERACTIVE
+        if not self.enabled:
+            return 0.0
+
+        waited = 0.0
+        while True:
+            check_cancelled(cancel_token)
+            wait = await asyncio.to_thread(self._try_acquire, url, priority)
+            if not wait:
+                break
+            await acancellable_sleep(wait, cancel_token)
+            waited += wait
+
+        self._record_acquire(priority, waited)
+        return waited
+
+    def record_latency(self, latency: float, priority: Optional[str] = None):
+        """记录交互请求的延迟（滑动平均），供后台请求判断是否退避"""
+        if not self.enabled or (priority or PRIORITY_INTERACTIVE) != PRIORITY_INTERACTIVE:
+            return
+        with self._latency_lock:
+            previous = self._interactive_latency
+            self._interactive_latency = latency if previous is None else 0.8 * previous + 0.2 * latency
+            average = self._interactive_latency
+        with self._lock:
+            state = self._open_state()
+        # 滑动平均在进程内计算，共享区域只发布结果：单个 8 字节写入，不需要跨进程锁
+        state.set("interactive_latency", average)
+
+    async def arecord_latency(self, latency: float, priority: Optional[str] = None):
+        """record_latency 的 asyncio 版本（只写内存，不会阻塞事件循环）"""
+        self.record_latency(latency, priority)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取限流统计信息"""
+        with self._lock:
+            stats = {priority: values.copy() for priority, values in self._stats.items()}
+        stats["enabled"] = self.enabled
+        stats["rate"] = self.rate
+        stats["burst"] = self.burst
+        stats["reserve"] = self.reserve
+        stats["shared"] = isinstance(self._state, _MappedState)
+        return stats
+
+
+# 全局限流器
+rate_limiter = RateLimiter()
@@ -0,0 +1,438 @@
+"""
+弹性调用模块 - LLM请求共享的重试、超时和熔断策略
+
+1. 指数退避 + 全抖动：避免服务端抖动时所有请求同时重试
+2. 自适应超时：按端点观测到的延迟分位数调整超时，而不是固定 30s/10s
+3. 熔断器：端点连续失败后熔断，熔断期间直接快速失败，冷却后放行一个探测请求
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+from urllib.parse import urlsplit
+
+import requests
+
+import config
+from .cancellation import (CancellationToken, OperationCancelled, acancellable_sleep, await_cancellable,
+                           cancellable_sleep, check_cancelled)
+from .deadline import Deadline
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """端点处于熔断状态，请求被快速拒绝"""
+
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(f"端点 {endpoint} 已熔断，{retry_after:.1f}s 后重试")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+def endpoint_key(url: str) -> str:
+    """
+    提取端点标识（scheme://netloc）
+
+    端点池按条目区分健康状态，传入的标识形如 "地址#条目指纹"，片段部分原样保留
+    （请求地址本身不含片段）。
+    """
+    parts = urlsplit(url)
+    key = f"{parts.scheme}://{parts.netloc}"
+    return f"{key}#{parts.fragment}" if parts.fragment else key
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    判断异常是否值得重试（并计入端点故障）
+
+    连接错误、超时、429 和 5xx 可重试；其余 4xx（如密钥错误）重试也不会成功。
+    """
+    status = None
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        status = error.response.status_code
+    elif aiohttp is not None and isinstance(error, aiohttp.ClientResponseError):
+        status = error.status
+
+    if status is not None:
+        return status == 429 or status >= 500
+
+    retryable = (requests.exceptions.RequestException, asyncio.TimeoutError, TimeoutError, ConnectionError)
+    if aiohttp is not None:
+        retryable += (aiohttp.ClientError,)
+    return isinstance(error, retryable)
+
+
+class RetryPolicy:
+    """指数退避 + 全抖动"""
+
+    def __init__(self, max_retries: int = None, base_delay: float = None, max_delay: float = None):
+        """
+        Args:
+            max_retries: 最大尝试次数（含首次）
+            base_delay: 退避基数（秒）
+            max_delay: 单次退避上限（秒）
+        """
+        self.max_retries = max_retries or getattr(config, "LLM_MAX_RETRIES", 3)
+        self.base_delay = base_delay or getattr(config, "LLM_RETRY_BASE_DELAY", 0.5)
+        self.max_delay = max_delay or getattr(config, "LLM_RETRY_MAX_DELAY", 8.0)
+
+    def delay(self, attempt: int) -> float:
+        """第 attempt 次失败后的等待时间：[0, min(上限, 基数 * 2^attempt)] 内均匀随机"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class LatencyTracker:
+    """按端点记录成功请求的延迟，并据此给出超时时间"""
+
+    def __init__(self, default_timeout: float, min_timeout: float, max_timeout: float,
+                 window: int = 100, min_samples: int = 10, multiplier: float = 3.0):
+        """
+        Args:
+            default_timeout: 样本不足时使用的超时
+            min_timeout: 超时下限
+            max_timeout: 超时上限
+            window: 统计窗口大小
+            min_samples: 启用自适应超时所需的最少样本数
+            multiplier: 超时 = p99 * multiplier
+        """
+        self.default_timeout = default_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.min_samples = min_samples
+        self.multiplier = multiplier
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, latency: float):
+        """记录一次成功请求的延迟"""
+        self._samples.append(latency)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """延迟分位数（q 取 0~100），无样本时返回None"""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(int(round(q / 100 * (len(ordered) - 1))), len(ordered) - 1)
+        return ordered[index]
+
+    def timeout(self) -> float:
+        """当前建议的超时时间"""
+        if len(self._samples) < self.min_samples:
+            return self.default_timeout
+        p99 = self.percentile(99)
+        return min(max(p99 * self.multiplier, self.min_timeout), self.max_timeout)
+
+
+class CircuitBreaker:
+    """熔断器：closed → open（连续失败达到阈值）→ half_open（冷却结束，放行一个探测）→ closed/open"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        """
+        Args:
+            failure_threshold: 连续失败多少次后熔断
+            recovery_timeout: 熔断后的冷却时间（秒）
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self) -> float:
+        """
+        判断是否放行请求
+
+        Returns:
+            0 表示放行，否则为距离下次允许探测的秒数
+        """
+        if self.state == self.CLOSED:
+            return 0.0
+
+        remaining = self.opened_at + self.recovery_timeout - time.monotonic()
+        if self.state == self.OPEN and remaining <= 0:
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return 0.0
+
+        return max(remaining, 0.1)
+
+    def record_success(self):
+        """请求成功，关闭熔断器"""
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> bool:
+        """
+        请求失败
+
+        Returns:
+            本次失败是否导致熔断器打开
+        """
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            was_open = self.state == self.OPEN
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+            return not was_open
+        return False
+
+
+class EndpointHealth:
+    """单个端点的延迟统计和熔断状态"""
+
+    def __init__(self, endpoint: str, default_timeout: float):
+        self.endpoint = endpoint
+        self.default_timeout = default_timeout
+        # 按请求类型分别统计延迟：完整回复（complete）与流式首字节（stream）差异很大
+        self.latencies: Dict[str, LatencyTracker] = {}
+        self.breaker = CircuitBreaker(
+            failure_threshold=getattr(config, "CIRCUIT_FAILURE_THRESHOLD", 5),
+            recovery_timeout=getattr(config, "CIRCUIT_RECOVERY_TIMEOUT", 30.0)
+        )
+        self.stats = {
+            "requests": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "rejected": 0,
+            "circuit_opened": 0
+        }
+
+    def latency(self, kind: str = "complete") -> LatencyTracker:
+        """获取指定请求类型的延迟统计"""
+        tracker = self.latencies.get(kind)
+        if tracker is None:
+            tracker = LatencyTracker(
+                default_timeout=self.default_timeout,
+                min_timeout=getattr(config, "LLM_MIN_TIMEOUT", 5.0),
+                max_timeout=max(self.default_timeout, getattr(config, "LLM_MAX_TIMEOUT", 60.0))
+            )
+            self.latencies[kind] = tracker
+        return tracker
+
+
+class ResilienceManager:
+    """按端点管理重试、自适应超时和熔断"""
+
+    def __init__(self, retry_policy: RetryPolicy = None):
+        self.retry_policy = retry_policy or RetryPolicy()
+        self._endpoints: Dict[str, EndpointHealth] = {}
+        self._lock = threading.Lock()
+
+    def get_endpoint(self, url: str, default_timeout: float = 30.0) -> EndpointHealth:
+        """获取端点健康记录（不存在则创建）"""
+        key = endpoint_key(url)
+        with self._lock:
+            health = self._endpoints.get(key)
+            if health is None:
+                health = EndpointHealth(key, default_timeout)
+                self._endpoints[key] = health
+            return health
+
+    def timeout_for(self, url: str, default_timeout: float = 30.0, kind: str = "complete") -> float:
+        """端点当前的自适应超时"""
+        health = self.get_endpoint(url, default_timeout)
+        with self._lock:
+            return health.latency(kind).timeout()
+
+    def latency_percentile(self, url: str, q: float, kind: str = "complete") -> Optional[float]:
+        """端点延迟分位数（q 取 0~100），样本不足以得出可靠估计时返回None"""
+        health = self.get_endpoint(url)
+        with self._lock:
+            tracker = health.latency(kind)
+            if len(tracker._samples) < tracker.min_samples:
+                return None
+            return tracker.percentile(q)
+
+    def is_available(self, url: str) -> bool:
+        """端点当前是否未熔断（不占用半开探测名额）"""
+        health = self.get_endpoint(url)
+        with self._lock:
+            breaker = health.breaker
+            if breaker.state == CircuitBreaker.CLOSED:
+                return True
+            return time.monotonic() >= breaker.opened_at + breaker.recovery_timeout
+
+    def retry_after(self, url: str) -> float:
+        """熔断的端点距离允许探测还需等待的秒数（未熔断或已可探测时为 0）"""
+        health = self.get_endpoint(url)
+        with self._lock:
+            breaker = health.breaker
+            if breaker.state == CircuitBreaker.CLOSED:
+                return 0.0
+            return max(breaker.opened_at + breaker.recovery_timeout - time.monotonic(), 0.0)
+
+    def before_attempt(self, url: str, default_timeout: float = 30.0, kind: str = "complete") -> float:
+        """
+        发送前检查熔断器并返回本次尝试的超时
+
+        Raises:
+            CircuitOpenError: 端点处于熔断状态
+        """
+        health = self.get_endpoint(url, default_timeout)
+        with self._lock:
+            retry_after = health.breaker.allow()
+            if retry_after:
+                health.stats["rejected"] += 1
+                raise CircuitOpenError(health.endpoint, retry_after)
+            health.stats["requests"] += 1
+            return health.latency(kind).timeout()
+
+    def record_success(self, url: str, latency: float, kind: str = "complete"):
+        """记录一次成功请求"""
+        health = self.get_endpoint(url)
+        with self._lock:
+            health.stats["successes"] += 1
+            health.latency(kind).record(latency)
+            health.breaker.record_success()
+
+    def record_failure(self, url: str, error: BaseException) -> bool:
+        """
+        记录一次失败请求
+
+        Returns:
+            是否值得重试（可重试的错误且端点未熔断）
+        """
+        health = self.get_endpoint(url)
+        retryable = is_retryable(error)
+        with self._lock:
+            health.stats["failures"] += 1
+            if not retryable:
+                # 4xx 说明端点可达，只是请求本身有问题，不计入熔断
+                health.breaker.record_success()
+                return False
+            if health.breaker.record_failure():
+                health.stats["circuit_opened"] += 1
+                print(f"🔌 端点 {health.endpoint} 连续失败，熔断 {health.breaker.recovery_timeout:.0f}s")
+            return health.breaker.state != CircuitBreaker.OPEN
+
+    def release(self, url: str):
+        """尝试被主动放弃（取消），不计成功或失败，只归还半开状态的探测名额"""
+        health = self.get_endpoint(url)
+        with self._lock:
+            health.breaker._probe_in_flight = False
+
+    def backoff(self, url: str, attempt: int) -> float:
+        """记录一次重试并返回退避时间"""
+        health = self.get_endpoint(url)
+        with self._lock:
+            health.stats["retries"] += 1
+        return self.retry_policy.delay(attempt)
+
+    def call(self, url: str, send: Callable[[float], T], default_timeout: float = 30.0,
+             max_retries: int = None, kind: str = "complete",
+             cancel_token: Optional[CancellationToken] = None, deadline: Optional[Deadline] = None) -> T:
+        """
+        带重试、自适应超时和熔断的同步调用
+
+        Args:
+            url: 请求地址（用于区分端点）
+            send: 发送函数，参数为本次尝试的超时时间
+            default_timeout: 延迟样本不足时使用的超时
+            max_retries: 最大尝试次数，默认使用重试策略的配置
+            kind: 请求类型（complete / stream），分别统计延迟
+            cancel_token: 取消令牌，取消后不再重试，退避等待立即结束
+            deadline: 本轮截止时间，超时裁剪到剩余预算内，预算不足时不再重试
+
+        Returns:
+            send 的返回值
+
+        Raises:
+            DeadlineExceeded: 首次尝试前预算已用完
+        """
+        attempts = max_retries or self.retry_policy.max_retries
+
+        for attempt in range(attempts):
+            check_cancelled(cancel_token)
+            if deadline is not None:
+                deadline.check("请求")
+            timeout = self.before_attempt(url, default_timeout, kind)
+            if deadline is not None:
+                timeout = deadline.clip(timeout)
+            start_time = time.monotonic()
+            try:
+                result = send(timeout)
+            except OperationCancelled:
+                self.release(url)
+                raise
+            except Exception as e:
+                if not self.record_failure(url, e) or attempt == attempts - 1:
+                    raise
+                delay = self.backoff(url, attempt)
+                if deadline is not None and not deadline.allows_retry(delay):
+                    raise
+                cancellable_sleep(delay, cancel_token)
+                continue
+
+            self.record_success(url, time.monotonic() - start_time, kind)
+            return result
+
+    async def acall(self, url: str, send: Callable[[float], Awaitable[T]], default_timeout: float = 30.0,
+                    max_retries: int = None, kind: str = "complete",
+                    cancel_token: Optional[CancellationToken] = None, deadline: Optional[Deadline] = None) -> T:
+        """call 的 asyncio 版本，退避等待不占用线程；任务或令牌被取消时中断请求和退避等待"""
+        attempts = max_retries or self.retry_policy.max_retries
+
+        for attempt in range(attempts):
+            check_cancelled(cancel_token)
+            if deadline is not None:
+                deadline.check("请求")
+            timeout = self.before_attempt(url, default_timeout, kind)
+            if deadline is not None:
+                timeout = deadline.clip(timeout)
+            start_time = time.monotonic()
+            try:
+                result = await await_cancellable(send(timeout), cancel_token)
+            except (asyncio.CancelledError, OperationCancelled):
+                self.release(url)
+                raise
+            except Exception as e:
+                if not self.record_failure(url, e) or attempt == attempts - 1:
+                    raise
+                delay = self.backoff(url, attempt)
+                if deadline is not None and not deadline.allows_retry(delay):
+                    raise
+                await acancellable_sleep(delay, cancel_token)
+                continue
+
+            self.record_success(url, time.monotonic() - start_time, kind)
+            return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取各端点的统计信息"""
+        with self._lock:
+            stats = {}
+            for key, health in self._endpoints.items():
+                endpoint_stats = health.stats.copy()
+                endpoint_stats["state"] = health.breaker.state
+                for kind, tracker in health.latencies.items():
+                    latency_stats = {"timeout": round(tracker.timeout(), 2)}
+                    for q in (50, 95, 99):
+                        value = tracker.percentile(q)
+                        latency_stats[f"p{q}"] = round(value, 3) if value is not None else None
+                    endpoint_stats[kind] = latency_stats
+                stats[key] = endpoint_stats
+            return stats
+
+
+# 全局弹性调用管理器
+resilience = ResilienceManager()
@@ -0,0 +1,202 @@
+"""
+响应缓存模块 - 精确匹配的LLM响应缓存
+
+请求（API类型、端点、模型、系统提示词、历史窗口、用户消息、采样参数）经规范化
+JSON 序列化后取 SHA-256 作为键。内存 LRU 在前，SQLite 持久层在后，
+按 TTL 和条目数淘汰。仅用于 temperature=0 或显式声明可缓存的调用。
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import config
+
+
+class ResponseCache:
+    """内存 LRU + SQLite 两级响应缓存"""
+
+    def __init__(self, db_path: str = None, memory_size: int = None,
+                 ttl: float = None, max_entries: int = None):
+        """
+        初始化缓存（数据库在首次使用时才打开）
+
+        Args:
+            db_path: SQLite 数据库路径
+            memory_size: 内存 LRU 的最大条目数
+            ttl: 缓存有效期（秒）
+            max_entries: 持久层最大条目数，超出时淘汰最久未访问的条目
+        """
+        self.db_path = db_path or os.path.join(os.path.expanduser("~/.emoji_assistant"), "response_cache.sqlite3")
+        self.memory_size = memory_size or getattr(config, "RESPONSE_CACHE_MEMORY_SIZE", 128)
+        self.ttl = ttl or getattr(config, "RESPONSE_CACHE_TTL", 7 * 24 * 3600)
+        self.max_entries = max_entries or getattr(config, "RESPONSE_CACHE_MAX_ENTRIES", 2000)
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "evictions": 0,
+            "errors": 0
+        }
+
+    @staticmethod
+    def make_key(**parts: Any) -> str:
+        """
+        由请求各组成部分计算稳定的缓存键
+
+        Args:
+            **parts: 参与计算的请求要素（需可JSON序列化）
+
+        Returns:
+            SHA-256 十六进制摘要
+        """
+        canonical = json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """打开（或复用）数据库连接并建表"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, key: str, response: str, created_at: float):
+        """写入内存 LRU"""
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        查询缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存的响应，未命中或已过期时返回None
+        """
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                if now - cached[1] < self.ttl:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return cached[0]
+                del self._memory[key]
+
+            try:
+                conn = self._get_connection()
+                row = conn.execute(
+                    "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None or now - row[1] >= self.ttl:
+                    self._stats["misses"] += 1
+                    return None
+
+                conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                conn.commit()
+            except sqlite3.Error as e:
+                self._stats["errors"] += 1
+                print(f"⚠️ 读取响应缓存失败: {e}")
+                return None
+
+            self._remember(key, row[0], row[1])
+            self._stats["disk_hits"] += 1
+            return row[0]
+
+    def put(self, key: str, response: str):
+        """
+        写入缓存，并按TTL和条目数淘汰旧条目
+
+        Args:
+            key: 缓存键
+            response: 响应文本
+        """
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            try:
+                conn = self._get_connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, response, now, now)
+                )
+                self._evict(conn, now)
+                conn.commit()
+                self._stats["writes"] += 1
+            except sqlite3.Error as e:
+                self._stats["errors"] += 1
+                print(f"⚠️ 写入响应缓存失败: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """淘汰过期条目，以及超出容量时最久未访问的条目"""
+        evicted = conn.execute("DELETE FROM responses WHERE created_at <= ?", (now - self.ttl,)).rowcount
+
+        count = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            evicted += conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed_at ASC LIMIT ?)",
+                (count - self.max_entries,)
+            ).rowcount
+
+        self._stats["evictions"] += max(evicted, 0)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._memory.clear()
+            try:
+                conn = self._get_connection()
+                conn.execute("DELETE FROM responses")
+                conn.commit()
+            except sqlite3.Error as e:
+                self._stats["errors"] += 1
+                print(f"⚠️ 清空响应缓存失败: {e}")
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            stats = self._stats.copy()
+            stats["memory_entries"] = len(self._memory)
+
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        stats["db_path"] = self.db_path
+        stats["ttl"] = self.ttl
+        stats["max_entries"] = self.max_entries
+        return stats
+
+
+# 全局响应缓存
+response_cache = ResponseCache()
@@ -0,0 +1,143 @@
+"""
+单飞模块 - 合并并发的相同LLM请求
+
+多个窗口或客户端同时发出相同请求（如启动问候、热门问题的意图识别）时，
+只有第一个调用真正发往上游，其余调用等待并共享同一结果。
+键由规范化的请求（地址 + 请求体）计算，与响应缓存使用相同的方法。
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from .cancellation import CancellationToken, OperationCancelled, await_cancellable, check_cancelled
+from .response_cache import ResponseCache
+
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """按请求键合并进行中的调用"""
+
+    # 与响应缓存相同的规范化键
+    make_key = staticmethod(ResponseCache.make_key)
+
+    def __init__(self):
+        # 进行中的同步调用：Future 由发起者（leader）完成，等待者共享
+        self._calls: Dict[str, Future] = {}
+        # 异步调用按事件循环区分：值为 [上游任务, 等待者数量]
+        self._tasks: Dict[Tuple[int, str], List[Any]] = {}
+        self._lock = threading.Lock()
+
+        self._stats = {
+            "calls": 0,
+            "executions": 0,
+            "coalesced": 0,
+            "errors": 0
+        }
+
+    def do(self, key: str, fn: Callable[[], T], cancel_token: Optional[CancellationToken] = None) -> T:
+        """
+        执行调用；相同键的调用正在进行时等待其结果
+
+        Args:
+            key: 请求键
+            fn: 实际发起请求的函数
+            cancel_token: 调用者的取消令牌；等待者被取消时只停止自己的等待，
+                发起者被取消时，未取消的等待者重新发起请求
+
+        Returns:
+            fn 的返回值（所有合并的调用者共享同一对象，不应修改）
+        """
+        with self._lock:
+            self._stats["calls"] += 1
+
+        while True:
+            check_cancelled(cancel_token)
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = Future()
+                    self._calls[key] = call
+                    self._stats["executions"] += 1
+                else:
+                    self._stats["coalesced"] += 1
+
+            if leader:
+                break
+
+            try:
+                return cancel_token.wait_future(call) if cancel_token is not None else call.result()
+            except OperationCancelled:
+                # 自己被取消则退出；仅发起者被取消时重新竞争发起者
+                check_cancelled(cancel_token)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                del self._calls[key]
+                if not isinstance(e, OperationCancelled):
+                    self._stats["errors"] += 1
+            call.set_exception(e)
+            raise
+        with self._lock:
+            del self._calls[key]
+        call.set_result(result)
+        return result
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[T]],
+                  cancel_token: Optional[CancellationToken] = None) -> T:
+        """
+        do 的 asyncio 版本
+
+        上游请求在独立任务中运行：单个调用者被取消（任务取消或 cancel_token）不影响其他等待者，
+        所有等待者都取消后才取消上游请求。
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+
+        with self._lock:
+            self._stats["calls"] += 1
+            entry = self._tasks.get(flight_key)
+            if entry is None:
+                entry = [loop.create_task(fn()), 0]
+                self._tasks[flight_key] = entry
+                self._stats["executions"] += 1
+                entry[0].add_done_callback(lambda task: self._finish_task(flight_key, entry))
+            else:
+                self._stats["coalesced"] += 1
+            entry[1] += 1
+
+        try:
+            return await await_cancellable(asyncio.shield(entry[0]), cancel_token)
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                abandoned = entry[1] == 0 and not entry[0].done()
+            if abandoned:
+                entry[0].cancel()
+
+    def _finish_task(self, flight_key: Tuple[int, str], entry: List[Any]):
+        """上游任务结束后移除记录"""
+        task = entry[0]
+        with self._lock:
+            if self._tasks.get(flight_key) is entry:
+                del self._tasks[flight_key]
+            if not task.cancelled() and task.exception() is not None:
+                self._stats["errors"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取合并统计信息"""
+        with self._lock:
+            stats = self._stats.copy()
+            stats["in_flight"] = len(self._calls) + len(self._tasks)
+        stats["coalesce_rate"] = stats["coalesced"] / stats["calls"] if stats["calls"] else 0.0
+        return stats
+
+
+# 全局单飞实例
+single_flight = SingleFlight()
@@ -13,6 +13,7 @@ import re
 from .chat_state_machine import ChatStateMachine, ChatState
 from core.config_manager import config_manager
 from core.chat_memory import chat_memory
+from core.cancellation import CancellationToken, OperationCancelled
 
 
 class MessageWidget(QWidget):
@@ -118,6 +119,16 @@ class MessageWidget(QWidget):
                     self.bubble.setMaximumWidth(max_bubble_width)
             self.bubble.adjustSize()
 
+    def set_text(self, text):
+        """替换气泡内容（流式输出时使用）"""
+        self.text = text
+        self.bubble.setText(text)
+        self.update_bubble_width()
+
+    def append_text(self, text):
+        """在气泡末尾追加内容（流式输出时使用）"""
+        self.set_text(self.text + text)
+
     def resizeEvent(self, event):
         self.update_bubble_width()
         super().resizeEvent(event)
@@ -145,8 +156,11 @@ class ChatDialog(QDialog):
         super().__init__(parent)
         self.llm_client = llm_client
         self.response_thread = None
+        self._cancelled_threads = []  # 已取消但尚未退出的线程（保持引用直到结束）
+        self._close_pending = False  # 关闭因线程未退出而推迟
         self.messages = []  # 存储消息历史
         self.temp_message_widget = None  # 临时状态消息组件
+        self.streaming_message_widget = None  # 正在流式输出的助手消息组件
         self.drag_pos = None  # 拖动支持
         
         # 让主窗口全透明
@@ -415,6 +429,7 @@ class ChatDialog(QDialog):
         
         # 滚动到底部
         QTimer.singleShot(100, self.scroll_to_bottom)
+        return message_widget
     
     def scroll_to_bottom(self):
         """滚动到消息历史底部"""
@@ -644,6 +659,7 @@ model="doubao-seed-1-6-flash-250615"
             self.show_temp_message("正在生成个性化问候...")
             
             # 创建响应线程来生成初始问候
+            self._cancel_response_thread()
             self.response_thread = InitialGreetingThread(self.llm_client)
             self.response_thread.response_received.connect(self._on_initial_greeting_received)
             self.response_thread.error_occurred.connect(self._on_initial_greeting_error)
@@ -774,8 +790,10 @@ model="doubao-seed-1-6-flash-250615"
             # 正常对话状态
             self.show_temp_message("🤔...")
             
-            # 发送消息到LLM
+            # 发送消息到LLM（仍在进行的上一轮，如初始问候，先取消）
+            self._cancel_response_thread()
             self.response_thread = ResponseThread(self.llm_client, message)
+            self.response_thread.token_received.connect(self.on_token_received)
             self.response_thread.response_received.connect(self.on_response_received)
             self.response_thread.error_occurred.connect(self.on_error_occurred)
             self.response_thread.start()
@@ -785,15 +803,30 @@ model="doubao-seed-1-6-flash-250615"
             self.input_text.setEnabled(True)
             self.input_text.setFocus()
 
+    def on_token_received(self, token):
+        """流式输出：收到新片段时逐步扩展助手气泡"""
+        if self.streaming_message_widget is None:
+            # 首个片段到达，用助手气泡替换临时状态消息
+            self.remove_temp_message()
+            self.streaming_message_widget = self.add_message("", False)
+        
+        self.streaming_message_widget.append_text(token)
+        self.scroll_to_bottom()
+
     def on_response_received(self, message, response):
         # 移除临时状态消息
         self.remove_temp_message()
         
-        # 记录AI回复到对话记录
+        # 记录AI回复到对话记录（完整文本只记录一次）
         chat_memory.record_ai_message(response)
         
-        # 添加AI回复
-        self.add_message(response, False)
+        # 添加AI回复，流式输出时只需用完整文本校正气泡
+        if self.streaming_message_widget is not None:
+            self.streaming_message_widget.set_text(response)
+            self.streaming_message_widget = None
+            QTimer.singleShot(100, self.scroll_to_bottom)
+        else:
+            self.add_message(response, False)
         
         # 重新启用输入框
         self.input_text.setEnabled(True)
@@ -802,6 +835,7 @@ model="doubao-seed-1-6-flash-250615"
     def on_error_occurred(self, error_message):
         # 移除临时状态消息
         self.remove_temp_message()
+        self.streaming_message_widget = None
         
         # 显示错误消息和操作提示
         error_text = f"""❌ 对话出现异常：{error_message}
@@ -820,11 +854,55 @@ model="doubao-seed-1-6-flash-250615"
         self.input_text.setEnabled(True)
         self.input_text.setFocus()
 
+    def _cancel_response_thread(self):
+        """协作式取消正在进行的响应线程：丢弃其后续信号，线程在下一个检查点退出"""
+        thread = self.response_thread
+        self.response_thread = None
+        if thread is None or not thread.isRunning():
+            return
+        
+        thread.cancel()
+        for signal in (thread.response_received, thread.error_occurred,
+                       getattr(thread, "token_received", None)):
+            if signal is None:
+                continue
+            try:
+                signal.disconnect()
+            except TypeError:
+                pass
+        
+        # 线程退出前保持引用，避免 QThread 在运行中被销毁
+        self._cancelled_threads.append(thread)
+        thread.finished.connect(lambda: self._cancelled_threads.remove(thread))
+        self.streaming_message_widget = None
+    
     def closeEvent(self, event):
-        if self.response_thread and self.response_thread.isRunning():
-            self.response_thread.terminate()
-            self.response_thread.wait()
+        # 取消令牌会中断等待中的请求并关闭流式连接，线程很快退出
+        self._cancel_response_thread()
+        if not self._close_pending:
+            for thread in list(self._cancelled_threads):
+                thread.cancel()
+                thread.wait(2000)
+        
+        running = [thread for thread in self._cancelled_threads if thread.isRunning()]
+        if running:
+            # 线程仍在运行时不能销毁对话框（QThread 随之销毁会崩溃）：先隐藏，等线程全部退出后再关闭
+            if not self._close_pending:
+                print("⚠️ 响应线程未能及时退出，等待其结束后再关闭对话框")
+                self._close_pending = True
+                for thread in running:
+                    thread.finished.connect(self._close_when_threads_finished)
+            self.hide()
+            event.ignore()
+            return
+        
+        self._close_pending = False
         event.accept()
+    
+    def _close_when_threads_finished(self):
+        """推迟的关闭：所有已取消的线程都退出后再次关闭"""
+        if self._close_pending and not any(thread.isRunning() for thread in self._cancelled_threads):
+            self.close()
 
     def adjust_input_text_height(self):
         doc = self.input_text.document()
@@ -847,6 +925,7 @@ ChatInputDialog = ChatDialog
 class ResponseThread(QThread):
     """响应线程"""
     
+    token_received = pyqtSignal(str)  # 流式输出的文本片段
     response_received = pyqtSignal(str, str)  # message, response
     error_occurred = pyqtSignal(str)  # error_message
     
@@ -854,13 +933,25 @@ class ResponseThread(QThread):
         super().__init__()
         self.llm_client = llm_client
         self.message = message
+        self.cancel_token = CancellationToken()
+    
+    def cancel(self):
+        """取消本轮对话（意图识别、技能执行和流式回复都会尽快停止）"""
+        self.cancel_token.cancel("对话已取消")
     
     def run(self):
         """运行线程"""
         try:
-            # 使用意图识别增强的响应方法
-            response = self.llm_client.get_response_with_intent(self.message)
+            # 使用意图识别增强的流式响应方法，逐段推送到气泡
+            chunks = []
+            for token in self.llm_client.stream_response_with_intent(self.message, cancel_token=self.cancel_token):
+                chunks.append(token)
+                self.token_received.emit(token)
+            
+            response = "".join(chunks)
             self.response_received.emit(self.message, response)
+        except OperationCancelled:
+            print("🛑 对话已取消")
         except Exception as e:
             self.error_occurred.emit(str(e)) 
 
@@ -874,13 +965,20 @@ class InitialGreetingThread(QThread):
     def __init__(self, llm_client):
         super().__init__()
         self.llm_client = llm_client
+        self.cancel_token = CancellationToken()
+    
+    def cancel(self):
+        """取消问候生成"""
+        self.cancel_token.cancel("问候生成已取消")
     
     def run(self):
         """运行线程"""
         try:
             # 生成个性化的初始问候
             greeting_prompt = "请根据你的人格特征和记忆，生成一个自然、个性化的开场白来问候用户。要体现你的性格特点，如果有记忆中的用户信息也要体现出来。保持温暖、友好的语气。"
-            greeting = self.llm_client.get_response(greeting_prompt)
+            greeting = self.llm_client.get_response(greeting_prompt, cancel_token=self.cancel_token)
             self.response_received.emit(greeting)
+        except OperationCancelled:
+            print("🛑 问候生成已取消")
         except Exception as e:
             self.error_occurred.emit(str(e))
\ No newline at end of file
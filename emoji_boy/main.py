@@ -85,7 +85,10 @@ class EmojiAssistant:
         """初始化组件"""
         try:
             # 初始化核心组件
-            self.llm_client = LLMClient()
+            self.llm_client = LLMClient(session_id="desktop")
+            
+            # 后台预热LLM连接，减少首轮对话的握手延迟
+            self.llm_client.warm_up()
             
             # 初始化UI组件
             self.floating_window = FloatingEmojiWindow(
@@ -0,0 +1,8 @@
+"""
+测试公共配置：把项目根目录加入导入路径，测试以 brain_agent.xxx / core.xxx 的方式导入模块
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
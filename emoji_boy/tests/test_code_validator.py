@@ -0,0 +1,78 @@
+"""生成代码静态检查测试"""
+
+import pytest
+
+from brain_agent.code_validator import CodeValidator
+
+
+@pytest.fixture
+def validator():
+    return CodeValidator()
+
+
+@pytest.mark.parametrize("code", [
+    "print(3 ** 10)",
+    "import math\nprint(math.sqrt(2))",
+    "from datetime import datetime\nprint(datetime.now().strftime('%H:%M'))",
+    "import platform\nprint(platform.system(), platform.python_version())",
+    "def fib(n):\n    return n if n < 2 else fib(n - 1) + fib(n - 2)\nprint([fib(i) for i in range(10)])",
+    "try:\n    x = 1 / 0\nexcept ZeroDivisionError as e:\n    print('err', e)",
+    "data = {'a': 1}\nfor k, v in sorted(data.items()):\n    print(f'{k}={v}')",
+])
+def test_safe_code_passes(validator, code):
+    assert validator.validate(code) == (True, "")
+
+
+@pytest.mark.parametrize("code", [
+    "import os\nos.system('ls')",
+    "import subprocess",
+    "from os import path",
+    "from . import sandbox",
+    "from math import *",
+    "open('/etc/passwd').read()",
+    "eval('1 + 1')",
+    "exec('print(1)')",
+    "getattr(print, '__self__')",
+    "__import__('os')",
+    "().__class__.__bases__[0].__subclasses__()",
+    "print.__self__",
+    "import platform\nplatform.os.system('ls')",
+    "import datetime\ndatetime.sys.modules",
+    "def g():\n    yield 1\nprint(next(g()).gi_frame.f_globals)",
+    "class A:\n    pass",
+    "with open('x') as f:\n    pass",
+    "global x",
+    "print(",
+])
+def test_unsafe_code_rejected(validator, code):
+    safe, reason = validator.validate(code)
+    assert not safe
+    assert reason
+
+
+def test_oversized_code_rejected():
+    validator = CodeValidator(max_nodes=50)
+    safe, reason = validator.validate("x = [" + ", ".join(["1"] * 100) + "]")
+    assert not safe
+    assert reason == "代码过长"
+
+
+def test_verdicts_are_cached(validator):
+    code = "print(1)"
+    validator.validate(code)
+    validator.validate(code)
+    validator.validate("import os")
+    stats = validator.get_stats()
+    assert stats["validations"] == 2
+    assert stats["cache_hits"] == 1
+    assert stats["rejected"] == 1
+    assert stats["cached_verdicts"] == 2
+
+
+def test_cache_is_bounded():
+    validator = CodeValidator(cache_size=2)
+    for i in range(5):
+        validator.validate(f"print({i})")
+    assert validator.get_stats()["cached_verdicts"] == 2
+    validator.clear()
+    assert validator.get_stats()["cached_verdicts"] == 0
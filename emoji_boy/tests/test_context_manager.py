@@ -0,0 +1,86 @@
+"""上下文组装测试：按优先级装入预算，历史整轮保留"""
+
+from core.context_manager import TRUNCATION_MARK, ContextManager, estimate_tokens, truncate_to_tokens
+
+
+def _history(turns: int, text: str = "你好" * 10):
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"{text}{i}"})
+        history.append({"role": "assistant", "content": f"{text}{i}"})
+    return history
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("你好世界") == 4
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens("你好世界" * 10) > estimate_tokens("你好世界")
+
+
+def test_truncate_keeps_head_or_both_ends():
+    text = "开头" + "中" * 200 + "结尾"
+    head = truncate_to_tokens(text, 50)
+    assert estimate_tokens(head) <= 50
+    assert head.startswith("开头") and head.endswith(TRUNCATION_MARK)
+
+    middle = truncate_to_tokens(text, 50, keep="middle")
+    assert estimate_tokens(middle) <= 50
+    assert middle.startswith("开头") and middle.endswith("结尾")
+    assert truncate_to_tokens("短文本", 50) == "短文本"
+
+
+def test_everything_fits_within_budget():
+    manager = ContextManager(max_context_tokens=4096)
+    history = _history(3)
+    packed = manager.pack("系统", "记忆", history, "消息", completion_tokens=500, summary="摘要")
+    assert packed["history"] == history
+    assert packed["message"] == "消息"
+    assert packed["summary"] == "摘要"
+    assert "记忆" in packed["system"]
+    usage = packed["usage"]
+    assert usage["truncated"] == []
+    assert usage["dropped_history_messages"] == 0
+    assert usage["prompt_tokens"] <= usage["budget"] == 4096 - 500
+
+
+def test_oldest_turns_dropped_whole():
+    manager = ContextManager(max_context_tokens=200)
+    history = _history(10)
+    packed = manager.pack("系统", "", history, "消息", completion_tokens=50)
+    kept = packed["history"]
+    assert 0 < len(kept) < len(history)
+    assert len(kept) % 2 == 0
+    assert kept[0]["role"] == "user"
+    # 保留的是最近的轮次
+    assert kept == history[-len(kept):]
+    usage = packed["usage"]
+    assert usage["dropped_history_messages"] == len(history) - len(kept)
+    assert usage["prompt_tokens"] <= usage["budget"]
+
+
+def test_low_priority_parts_truncated_first():
+    manager = ContextManager(max_context_tokens=300)
+    memory = "记" * 1000
+    packed = manager.pack("系统提示词", memory, _history(2), "当前消息", completion_tokens=100)
+    assert packed["system"].startswith("系统提示词")
+    assert packed["message"] == "当前消息"
+    assert "memory" in packed["usage"]["truncated"]
+    assert packed["history"] == []
+    assert packed["usage"]["prompt_tokens"] <= packed["usage"]["budget"]
+
+
+def test_custom_priorities_keep_history_before_memory():
+    manager = ContextManager(max_context_tokens=300, priorities={"history": 1, "memory": 5})
+    history = _history(2)
+    packed = manager.pack("系统", "记" * 1000, history, "消息", completion_tokens=100)
+    assert packed["history"] == history
+    assert "memory" in packed["usage"]["truncated"]
+
+
+def test_override_budget_for_long_context_model():
+    manager = ContextManager(max_context_tokens=200)
+    history = _history(10)
+    packed = manager.pack("系统", "", history, "消息", completion_tokens=50, max_context_tokens=8000)
+    assert packed["history"] == history
+    assert packed["usage"]["budget"] == 8000 - 50
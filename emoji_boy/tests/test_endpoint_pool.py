@@ -0,0 +1,79 @@
+"""端点池测试：按条目熔断、全部熔断时快速失败、对冲失败方被中断"""
+
+import threading
+
+import pytest
+import requests
+
+from core import endpoint_pool as endpoint_pool_module
+from core.cancellation import OperationCancelled
+from core.endpoint_pool import EndpointPool, LLMEndpoint
+from core.resilience import CircuitOpenError, resilience
+
+
+def _open_breaker(endpoint: LLMEndpoint):
+    breaker = resilience.get_endpoint(endpoint.health_key).breaker
+    for _ in range(breaker.failure_threshold):
+        resilience.record_failure(endpoint.health_key, requests.exceptions.ConnectionError())
+
+
+def _make_pool(base: str, extra_keys):
+    pool = EndpointPool(endpoints=[{"api_base": base, "api_key": key} for key in extra_keys], hedge=False)
+    pool.set_primary(base, "primary-key")
+    return pool
+
+
+@pytest.fixture(autouse=True)
+def _no_rate_limit(monkeypatch):
+    monkeypatch.setattr(endpoint_pool_module.rate_limiter, "enabled", False)
+
+
+def test_health_is_tracked_per_entry():
+    pool = _make_pool("http://same-host.test/v1", ["key-b"])
+    primary, other = pool.endpoints
+    assert primary.health_key != other.health_key
+
+    _open_breaker(primary)
+    assert not resilience.is_available(primary.health_key)
+    assert resilience.is_available(other.health_key)
+    assert pool._pick(set(), "complete")[0] is other
+
+
+def test_all_breakers_open_fails_before_rate_limit(monkeypatch):
+    pool = _make_pool("http://all-open.test/v1", ["key-b"])
+    for endpoint in pool.endpoints:
+        _open_breaker(endpoint)
+
+    acquired = []
+    monkeypatch.setattr(endpoint_pool_module.rate_limiter, "acquire", lambda *args, **kwargs: acquired.append(args))
+    sent = []
+
+    def send(url, headers, data, timeout, cancel_token=None):
+        sent.append(url)
+        return {}
+
+    with pytest.raises(CircuitOpenError):
+        pool.call("http://all-open.test/v1/chat/completions", {}, {"model": "m"}, send)
+    assert acquired == []
+    assert sent == []
+
+
+def test_losing_hedge_is_cancelled():
+    pool = _make_pool("http://hedge.test/v1", ["key-b"])
+    slow, fast = pool.endpoints
+    slow_cancelled = threading.Event()
+
+    def send(url, headers, data, timeout, cancel_token=None):
+        if headers["Authorization"].endswith("primary-key"):
+            try:
+                cancel_token.sleep(5)
+            except OperationCancelled:
+                slow_cancelled.set()
+                raise
+            return "slow"
+        return "fast"
+
+    request = ("http://hedge.test/v1/chat/completions", {}, {"model": "m"})
+    result = pool._hedged_call(slow, 0.05, {slow}, request, slow.api_base, send, 30.0, "complete", None)
+    assert result == "fast"
+    assert slow_cancelled.wait(1)
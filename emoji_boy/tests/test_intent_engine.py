@@ -0,0 +1,65 @@
+"""意图引擎测试：本轮预算在阶段中途耗尽时降级为普通聊天，而不是被各阶段的兜底结果吞掉"""
+
+import pytest
+
+from brain_agent.intent_engine import IntentEngine
+from core.deadline import Deadline, DeadlineExceeded
+from core.resilience import CircuitOpenError
+
+MESSAGE = "帮我查一下明天北京的天气"
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = IntentEngine(api_key="test", cache_path=str(tmp_path / "intent_cache.json"))
+    engine.semantic_cache_enabled = False
+    engine.skill_store_enabled = False
+    engine.fast_path_enabled = False
+    monkeypatch.setattr(engine.plugin_registry, "find_direct_answer_plugin", lambda intent_data: None)
+    return engine
+
+
+def _exhaust_budget(*args, **kwargs):
+    raise DeadlineExceeded("认知API剩余预算不足（0.00s）")
+
+
+def test_fused_planning_out_of_budget_downgrades(engine, monkeypatch):
+    monkeypatch.setattr(engine, "_call_llm_api", _exhaust_budget)
+    result = engine.process_message(MESSAGE, deadline=Deadline(30))
+    assert result["pipeline"] == "downgraded"
+    assert engine.stats["deadline_downgrades"] == 1
+    assert engine.stats["fused_fallbacks"] == 0
+
+
+@pytest.mark.parametrize("stage", ["intent", "skill", "code"])
+def test_staged_pipeline_out_of_budget_downgrades(engine, monkeypatch, stage):
+    engine.fused_mode = False
+    responses = {"intent": None, "skill": "search_plugin", "code": None}
+    order = ["intent", "skill", "code"]
+
+    def call(prompt, *args, **kwargs):
+        current = order.pop(0)
+        if current == stage:
+            raise DeadlineExceeded(f"{current}剩余预算不足")
+        return "search" if current == "intent" else responses[current]
+
+    executed = []
+    monkeypatch.setattr(engine, "_call_llm_api", call)
+    monkeypatch.setattr(engine.plugin_registry, "execute_intent", lambda *args: executed.append(args) or {})
+
+    result = engine.process_message(MESSAGE, deadline=Deadline(30))
+    assert result["pipeline"] == "downgraded"
+    assert engine.stats["deadline_downgrades"] == 1
+    # 代码生成超时不会再退回插件执行
+    assert executed == []
+
+
+def test_open_circuit_is_not_swallowed(engine, monkeypatch):
+    def circuit_open(*args, **kwargs):
+        raise CircuitOpenError("https://intent.test", 5.0)
+
+    monkeypatch.setattr(engine, "_call_llm_api", circuit_open)
+    with pytest.raises(CircuitOpenError):
+        engine.match_skill(MESSAGE, "search")
+    with pytest.raises(CircuitOpenError):
+        engine.generate_code(MESSAGE, "search_plugin")
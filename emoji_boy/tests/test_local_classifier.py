@@ -0,0 +1,85 @@
+"""
+本地意图分类器测试：关键词自动机与快速通道门控
+"""
+
+import pytest
+
+from brain_agent.intent_engine import INTENT_KEYWORDS
+from brain_agent.local_classifier import KeywordAutomaton, LocalIntentClassifier, normalize_text
+from brain_agent.plugins import get_all_plugins
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    # 与 IntentEngine._get_local_classifier 相同的词表：认知关键词 + 技能关键词
+    vocabularies = {intent: list(words) for intent, words in INTENT_KEYWORDS.items()}
+    for plugin in get_all_plugins():
+        for intent in plugin.get_intent_types():
+            vocabularies.setdefault(intent, []).extend(plugin.get_keywords())
+    return LocalIntentClassifier(vocabularies)
+
+
+def test_normalize_text_folds_width_case_and_punctuation():
+    assert normalize_text("ＡＢＣ，Hello World！") == "abchelloworld"
+    assert normalize_text("") == ""
+
+
+def test_automaton_finds_overlapping_keywords_in_one_pass():
+    automaton = KeywordAutomaton()
+    for keyword, label in (("几点", "system"), ("几点了", "system"), ("点了", "other")):
+        automaton.add(keyword, label)
+    matches = {(start, keyword) for start, keyword, _ in automaton.find_all("现在几点了")}
+    assert matches == {(2, "几点"), (2, "几点了"), (3, "点了")}
+
+
+def test_automaton_requires_whole_word_for_english_keywords():
+    automaton = KeywordAutomaton()
+    automaton.add("hi", "chat")
+    assert automaton.find_all("this is it") == []
+    assert [keyword for _, keyword, _ in automaton.find_all("Hi there")] == ["hi"]
+
+
+@pytest.mark.parametrize("message, intent_type", [
+    ("现在几点了", "system"),
+    ("今天几号", "system"),
+    ("今天是几号啊", "system"),
+    ("今天星期几", "system"),
+    ("你好", "chat"),
+    ("谢谢你呀", "chat"),
+    ("我今天心情不好", "chat"),
+    ("你好呀，今天好开心", "chat"),
+    ("开始冥想", "meditation"),
+    ("执行A2B编码", "meditation"),
+    ("帮助", "help"),
+])
+def test_fast_path_accepts_clear_messages(classifier, message, intent_type):
+    result = classifier.classify(message)
+    assert result["fast_path"], result
+    assert result["intent_type"] == intent_type
+    assert result["margin"] >= classifier.min_margin
+
+
+@pytest.mark.parametrize("message", [
+    "时间过得真快啊",
+    "什么时间吃饭比较好",
+    "我没有时间陪你玩",
+    "周几去爬山比较好？",
+    "帮我执行一下计划",
+    "A2B是什么",
+    "记忆力不好怎么办",
+    "帮我计算1+1等于多少",
+])
+def test_fast_path_rejects_single_keyword_in_longer_sentence(classifier, message):
+    result = classifier.classify(message)
+    assert not result["fast_path"], result
+    assert result["evidence"] is None
+
+
+def test_search_intent_never_takes_fast_path(classifier):
+    # 搜索需要LLM提取查询词，不在快速通道意图中
+    assert not classifier.classify("搜索Python教程")["fast_path"]
+
+
+def test_fast_path_requires_margin(classifier):
+    strict = LocalIntentClassifier(classifier.vocabularies, min_margin=1.0)
+    assert not strict.classify("现在几点了")["fast_path"]
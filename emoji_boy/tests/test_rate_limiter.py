@@ -0,0 +1,48 @@
+"""限流测试：令牌桶、交互保留额度和跨实例共享的内存映射状态"""
+
+import pytest
+
+from core.rate_limiter import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, RateLimiter
+
+
+@pytest.fixture
+def state_path(tmp_path):
+    return str(tmp_path / "rate_limiter.bin")
+
+
+def test_interactive_drains_bucket_then_waits(state_path):
+    limiter = RateLimiter(rate=1.0, burst=3, reserve=1, state_path=state_path)
+    waits = [limiter._try_acquire("http://a.test/v1", PRIORITY_INTERACTIVE) for _ in range(4)]
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert 0 < waits[3] <= 1.0
+
+
+def test_background_cannot_use_reserved_tokens(state_path):
+    limiter = RateLimiter(rate=1.0, burst=3, reserve=1, state_path=state_path)
+    assert limiter._try_acquire("http://b.test/v1", PRIORITY_BACKGROUND) == 0.0
+    assert limiter._try_acquire("http://b.test/v1", PRIORITY_BACKGROUND) == 0.0
+    # 只剩保留给交互请求的令牌
+    assert limiter._try_acquire("http://b.test/v1", PRIORITY_BACKGROUND) > 0
+    assert limiter._try_acquire("http://b.test/v1", PRIORITY_INTERACTIVE) == 0.0
+
+
+def test_background_yields_to_slow_interactive_traffic(state_path):
+    limiter = RateLimiter(rate=1.0, burst=10, latency_threshold=5.0, background_backoff=7.0,
+                          state_path=state_path)
+    limiter._try_acquire("http://c.test/v1", PRIORITY_INTERACTIVE)
+    limiter.record_latency(10.0)
+    assert limiter._try_acquire("http://c.test/v1", PRIORITY_BACKGROUND) == 7.0
+    assert limiter.get_stats()[PRIORITY_BACKGROUND]["yields"] == 1
+
+
+def test_state_is_shared_between_instances(state_path):
+    first = RateLimiter(rate=0.001, burst=2, reserve=0, state_path=state_path)
+    second = RateLimiter(rate=0.001, burst=2, reserve=0, state_path=state_path)
+    assert first._try_acquire("http://d.test/v1", PRIORITY_INTERACTIVE) == 0.0
+    assert second._try_acquire("http://d.test/v1", PRIORITY_INTERACTIVE) == 0.0
+    # 两个实例共用同一个桶，第三个请求需要等待
+    assert first._try_acquire("http://d.test/v1", PRIORITY_INTERACTIVE) > 0
+
+    first.record_latency(4.0)
+    assert second._open_state().get("interactive_latency") == 4.0
+    assert first.get_stats()["shared"]
@@ -0,0 +1,117 @@
+"""弹性调用测试：退避策略、熔断器和重试"""
+
+import pytest
+import requests
+
+from core.resilience import CircuitBreaker, CircuitOpenError, ResilienceManager, RetryPolicy, is_retryable
+
+
+def _http_error(status: int) -> requests.exceptions.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    return requests.exceptions.HTTPError(response=response)
+
+
+def test_retry_delay_is_bounded_full_jitter():
+    policy = RetryPolicy(max_retries=5, base_delay=0.5, max_delay=4.0)
+    for attempt in range(8):
+        cap = min(4.0, 0.5 * 2 ** attempt)
+        delays = [policy.delay(attempt) for _ in range(200)]
+        assert all(0 <= delay <= cap for delay in delays)
+    # 全抖动：同一次重试的等待时间各不相同
+    assert len({policy.delay(3) for _ in range(20)}) > 1
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (requests.exceptions.ConnectionError(), True),
+    (requests.exceptions.Timeout(), True),
+    (_http_error(429), True),
+    (_http_error(503), True),
+    (_http_error(401), False),
+    (_http_error(400), False),
+    (ValueError("bad json"), False),
+])
+def test_is_retryable(error, retryable):
+    assert is_retryable(error) is retryable
+
+
+def test_breaker_opens_after_threshold_and_probes_after_cooldown():
+    breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=30.0)
+    assert breaker.allow() == 0
+    assert not breaker.record_failure()
+    assert not breaker.record_failure()
+    assert breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow() > 0
+
+    # 冷却结束：只放行一个探测请求
+    breaker.opened_at -= 30.0
+    assert breaker.allow() == 0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow() > 0
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() == 0
+
+
+def test_failed_probe_reopens_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=30.0)
+    breaker.record_failure()
+    breaker.opened_at -= 30.0
+    assert breaker.allow() == 0
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow() > 0
+
+
+def test_success_resets_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_call_retries_transient_errors():
+    manager = ResilienceManager(RetryPolicy(max_retries=3, base_delay=0.001, max_delay=0.001))
+    attempts = []
+
+    def send(timeout):
+        attempts.append(timeout)
+        if len(attempts) < 3:
+            raise requests.exceptions.ConnectionError()
+        return "ok"
+
+    assert manager.call("http://retry.test/v1", send) == "ok"
+    assert len(attempts) == 3
+    assert manager.get_endpoint("http://retry.test").stats["retries"] == 2
+
+
+def test_call_does_not_retry_client_errors():
+    manager = ResilienceManager(RetryPolicy(max_retries=3, base_delay=0.001, max_delay=0.001))
+    attempts = []
+
+    def send(timeout):
+        attempts.append(timeout)
+        raise _http_error(401)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        manager.call("http://client-error.test/v1", send)
+    assert len(attempts) == 1
+    # 4xx 说明端点可达，不计入熔断
+    assert manager.is_available("http://client-error.test/v1")
+
+
+def test_open_breaker_rejects_without_sending():
+    manager = ResilienceManager(RetryPolicy(max_retries=1))
+    url = "http://open.test/v1"
+    breaker = manager.get_endpoint(url).breaker
+    for _ in range(breaker.failure_threshold):
+        manager.record_failure(url, requests.exceptions.ConnectionError())
+
+    sent = []
+    with pytest.raises(CircuitOpenError):
+        manager.call(url, lambda timeout: sent.append(timeout))
+    assert sent == []
+    assert manager.retry_after(url) > 0
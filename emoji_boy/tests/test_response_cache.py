@@ -0,0 +1,89 @@
+"""响应缓存测试：键的稳定性、内存 LRU、持久层 TTL 与容量淘汰"""
+
+import pytest
+
+import core.response_cache as response_cache_module
+from core.response_cache import ResponseCache
+
+
+class _Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(response_cache_module.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = ResponseCache(db_path=str(tmp_path / "cache.sqlite3"), memory_size=2, ttl=60, max_entries=3)
+    yield cache
+    cache.close()
+
+
+def test_make_key_is_canonical():
+    a = ResponseCache.make_key(url="u", data={"model": "m", "messages": [1, 2]})
+    b = ResponseCache.make_key(data={"messages": [1, 2], "model": "m"}, url="u")
+    c = ResponseCache.make_key(url="u", data={"model": "m", "messages": [2, 1]})
+    assert a == b
+    assert a != c
+
+
+def test_memory_then_disk_hits(cache):
+    cache.put("a", "A")
+    assert cache.get("a") == "A"
+    assert cache.get_stats()["memory_hits"] == 1
+
+    cache.put("b", "B")
+    cache.put("c", "C")
+    # 内存 LRU 只保留 2 条，最早的 a 需要从持久层读取
+    assert cache.get_stats()["memory_entries"] == 2
+    assert cache.get("a") == "A"
+    assert cache.get_stats()["disk_hits"] == 1
+    assert cache.get("missing") is None
+    assert cache.get_stats()["misses"] == 1
+
+
+def test_entries_expire_after_ttl(cache, clock):
+    cache.put("a", "A")
+    clock.now += 59
+    assert cache.get("a") == "A"
+    clock.now += 1
+    assert cache.get("a") is None
+
+
+def test_expired_rows_evicted_on_write(cache, clock):
+    cache.put("a", "A")
+    clock.now += 61
+    cache.put("b", "B")
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_least_recently_accessed_evicted_beyond_max_entries(tmp_path, clock):
+    cache = ResponseCache(db_path=str(tmp_path / "lru.sqlite3"), memory_size=1, ttl=3600, max_entries=3)
+    for key in ("a", "b", "c"):
+        cache.put(key, key.upper())
+        clock.now += 1
+    # 访问 a 后，最久未访问的是 b
+    assert cache.get("a") == "A"
+    clock.now += 1
+    cache.put("d", "D")
+    cache._memory.clear()
+
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in ("a", "c", "d")] == ["A", "C", "D"]
+    assert cache.get_stats()["evictions"] == 1
+    cache.close()
+
+
+def test_clear(cache):
+    cache.put("a", "A")
+    cache.clear()
+    assert cache.get("a") is None
@@ -0,0 +1,76 @@
+"""联想记忆测试：相近说法命中，字面相近但意思不同的说法不命中"""
+
+import pytest
+
+from brain_agent.semantic_cache import SemanticCache, embed_text
+
+
+def _similarity(a: str, b: str) -> float:
+    va, vb = embed_text(a, 2048), embed_text(b, 2048)
+    return sum(value * vb.get(index, 0.0) for index, value in va.items())
+
+
+@pytest.mark.parametrize("stored, query", [
+    ("现在几点了", "现在几点了啊"),
+    ("帮我查一下北京的天气", "帮我查一下北京天气"),
+    ("给我讲个笑话", "给我讲个笑话吧！"),
+])
+def test_paraphrase_hits(stored, query):
+    cache = SemanticCache()
+    cache.put(stored, {"intent_type": "x"}, label="x")
+    recalled = cache.lookup(query, label="x")
+    assert recalled is not None
+    value, score = recalled
+    assert value == {"intent_type": "x"}
+    assert score >= cache.threshold
+
+
+@pytest.mark.parametrize("stored, query", [
+    ("现在几点了", "现在几度了"),
+    ("帮我查一下北京的天气", "帮我查一下上海的天气"),
+    ("今天心情不好", "今天心情很好"),
+    ("你好呀", "你好"),
+    ("删除这个文件", "打开这个文件"),
+])
+def test_near_miss_rejected(stored, query):
+    cache = SemanticCache()
+    cache.put(stored, {"intent_type": "x"}, label="x")
+    assert cache.lookup(query, label="x") is None
+
+
+def test_label_must_match():
+    stored, query = "帮我写一首关于秋天的诗", "帮我写一首关于春天的诗"
+    cache = SemanticCache()
+    assert _similarity(stored, query) >= cache.threshold
+
+    cache.put(stored, "creative", label="chat")
+    assert cache.lookup(query, label="search") is None
+    assert cache.lookup(query, label="chat")[0] == "creative"
+
+
+def test_nearest_with_matching_label_wins():
+    cache = SemanticCache()
+    cache.put("现在几点了啊", "other", label="chat")
+    cache.put("现在几点了呢", "time", label="system")
+    assert cache.lookup("现在几点了", label="system")[0] == "time"
+
+
+def test_lru_evicts_least_recently_used():
+    cache = SemanticCache(capacity=2)
+    cache.put("打开记事本", 1)
+    cache.put("帮我搜索一下python教程", 2)
+    assert cache.lookup("打开记事本")[0] == 1
+    cache.put("给我讲个笑话", 3)
+    assert cache.lookup("帮我搜索一下python教程") is None
+    assert cache.lookup("打开记事本")[0] == 1
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_expired_memories_are_purged_first():
+    cache = SemanticCache(capacity=2, ttl=10)
+    cache.put("打开记事本", 1, timestamp=0)
+    cache.put("帮我搜索一下python教程", 2)
+    cache.put("给我讲个笑话", 3)
+    assert cache.lookup("打开记事本") is None
+    assert cache.lookup("帮我搜索一下python教程")[0] == 2
+    assert cache.get_stats()["evictions"] == 0
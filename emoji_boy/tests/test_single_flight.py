@@ -0,0 +1,125 @@
+"""单飞合并测试：并发的相同请求只发出一次，取消只影响自己的等待"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from core.cancellation import CancellationToken, OperationCancelled
+from core.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def fn():
+        calls.append(1)
+        release.wait(2)
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", fn))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    stats = flight.get_stats()
+    assert stats["executions"] == 1
+    assert stats["coalesced"] == 4
+    assert stats["in_flight"] == 0
+
+
+def test_different_keys_are_not_merged():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    assert flight.get_stats()["executions"] == 2
+
+
+def test_error_is_shared_and_not_remembered():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flight.do("key", fail)
+    # 失败不会留在进行中的记录里，下一次调用重新执行
+    assert flight.do("key", lambda: "ok") == "ok"
+    assert flight.get_stats()["errors"] == 1
+
+
+def test_cancelled_waiter_does_not_cancel_leader():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader_result = []
+
+    leader = threading.Thread(target=lambda: leader_result.append(flight.do("key", lambda: release.wait(2) and "done")))
+    leader.start()
+    time.sleep(0.05)
+
+    token = CancellationToken()
+    threading.Timer(0.05, token.cancel).start()
+    with pytest.raises(OperationCancelled):
+        flight.do("key", lambda: "never", cancel_token=token)
+
+    release.set()
+    leader.join(2)
+    assert leader_result == ["done"]
+
+
+def test_async_calls_share_one_task():
+    flight = SingleFlight()
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def main():
+        return await asyncio.gather(*(flight.ado("key", fn) for _ in range(4)))
+
+    assert asyncio.run(main()) == ["result"] * 4
+    assert len(calls) == 1
+
+
+def test_async_upstream_cancelled_only_when_all_waiters_leave():
+    flight = SingleFlight()
+    upstream_cancelled = []
+
+    async def fn():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            upstream_cancelled.append(1)
+            raise
+        return "never"
+
+    async def main():
+        token = CancellationToken()
+        first = asyncio.ensure_future(flight.ado("key", fn, cancel_token=token))
+        second = asyncio.ensure_future(flight.ado("key", fn))
+        await asyncio.sleep(0.05)
+
+        token.cancel()
+        with pytest.raises(OperationCancelled):
+            await first
+        await asyncio.sleep(0.05)
+        assert upstream_cancelled == []
+
+        second.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await second
+        await asyncio.sleep(0.05)
+        assert upstream_cancelled == [1]
+
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+"""技能结晶测试：重复保存不重置命中，变更延迟合并写入"""
+
+import json
+import os
+import time
+
+import pytest
+
+from brain_agent.skill_store import SkillStore
+
+CODE = "print(3 * 7)"
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / "skill_store.json")
+
+
+def test_identical_program_keeps_hits_and_skips_write(store_path):
+    store = SkillStore(store_path=store_path, save_delay=60)
+    assert store.put("calc", "算一下 3 乘 7", CODE)
+    store.find("算一下 3 乘 7")
+    store.flush()
+    mtime = os.stat(store_path).st_mtime_ns
+
+    assert store.put("calc", "算一下3乘7", CODE)
+    assert store.find("算一下 3 乘 7")["hits"] == 2
+    assert store.get_stats()["stored"] == 1
+    store.flush()
+    assert os.stat(store_path).st_mtime_ns == mtime
+
+
+def test_changed_program_replaces_entry(store_path):
+    store = SkillStore(store_path=store_path, save_delay=60)
+    store.put("calc", "算一下 3 乘 7", CODE)
+    store.find("算一下 3 乘 7")
+    store.put("calc", "算一下 3 乘 7", "print(21)")
+    program = store.find("算一下 3 乘 7")
+    assert program["code"] == "print(21)"
+    assert program["hits"] == 1
+
+
+def test_writes_are_debounced_until_flush(store_path):
+    store = SkillStore(store_path=store_path, save_delay=60)
+    for i in range(5):
+        store.put("calc", f"算一下 {i} 乘 7", f"print({i} * 7)")
+    # 延迟期内尚未写入
+    assert not os.path.exists(store_path)
+
+    store.flush()
+    with open(store_path, encoding="utf-8") as f:
+        assert len(json.load(f)["programs"]) == 5
+
+    reloaded = SkillStore(store_path=store_path)
+    assert reloaded.find("算一下 4 乘 7")["code"] == "print(4 * 7)"
+
+
+def test_timer_writes_after_delay(store_path):
+    store = SkillStore(store_path=store_path, save_delay=0.01)
+    store.put("calc", "算一下 3 乘 7", CODE)
+    deadline = time.monotonic() + 2
+    while not os.path.exists(store_path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert os.path.exists(store_path)
@@ -0,0 +1,63 @@
+"""
+SystemPlugin 直接回答判定测试
+"""
+
+import pytest
+
+from brain_agent.plugins.system_plugin import SystemPlugin
+
+
+@pytest.fixture
+def plugin():
+    return SystemPlugin()
+
+
+def _direct(plugin, message):
+    return plugin.can_answer_directly({"intent_type": "system", "user_message": message})
+
+
+@pytest.mark.parametrize("message", [
+    "现在几点",
+    "现在几点了？",
+    "几点了",
+    "今天几号",
+    "今天是几号啊",
+    "今天星期几",
+    "今天周几",
+    "现在时间",
+    "现在是什么时间",
+    "当前日期是什么",
+    "请问现在几点钟",
+])
+def test_explicit_time_questions_answer_directly(plugin, message):
+    assert _direct(plugin, message)
+
+
+@pytest.mark.parametrize("message", [
+    "时间过得真快啊",
+    "我没有时间陪你玩",
+    "什么时间吃饭比较好",
+    "周几去爬山比较好？",
+    "今天时间过得真快",
+    "这个日期格式怎么写",
+    "明天星期几",
+])
+def test_casual_time_words_do_not_answer_directly(plugin, message):
+    assert not _direct(plugin, message)
+
+
+@pytest.mark.parametrize("message", ["系统信息", "查看一下系统信息", "我的操作系统是什么？", "显示CPU信息"])
+def test_explicit_system_info_questions_answer_directly(plugin, message):
+    assert _direct(plugin, message)
+
+
+@pytest.mark.parametrize("message", ["我想了解一下操作系统的原理", "执行 uname", "内存信息泄露是怎么回事"])
+def test_other_system_messages_do_not_answer_directly(plugin, message):
+    assert not _direct(plugin, message)
+
+
+def test_time_question_handled_as_final_answer(plugin):
+    result = plugin.handle({"intent_type": "system", "user_message": "现在几点了"})
+    assert result["success"]
+    assert result["answer_mode"] in ("final", "template")
+    assert "time" in result["data"]